@@ -1,10 +1,19 @@
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterable, AsyncIterator, Deque, Dict, Iterable, Iterator, List, Optional, Union
+import asyncio
+import fnmatch
+import io
+import json
+import logging
+import math
+import os
+import threading
+import time
 import torch
 from torchvision import transforms
 from PIL import Image
 import numpy as np
-import matplotlib.pyplot as plt
-import json
-import os
 
 # Define model (same as in notebook)
 class DoubleConv(torch.nn.Module):
@@ -44,36 +53,381 @@ class UNet(torch.nn.Module):
         dc1 = self.dec1(torch.cat([u1, d1], dim=1))
         return self.final_conv(dc1)
 
+# Anything predict() accepts: a file path, encoded image bytes, a PIL image or an HxWx3 uint8 array
+ImageInput = Union[str, bytes, Image.Image, np.ndarray]
+_END = object()
+
+def _tile_starts(length: int, size: int, stride: int) -> List[int]:
+    """Window offsets covering length; the last window is aligned to the end"""
+    if length <= size:
+        return [0]
+    starts = list(range(0, length - size, stride))
+    return starts + [length - size]
+
+def _pad_tile(tile: np.ndarray, size: int) -> np.ndarray:
+    """Edge-pad a tile cut from an image smaller than the window"""
+    if tile.shape[0] == size and tile.shape[1] == size:
+        return tile
+    return np.pad(tile, ((0, size - tile.shape[0]), (0, size - tile.shape[1]), (0, 0)), mode="edge")
+
+class PlantHealthEngine:
+    """
+    Plant-health segmentation with the UNet loaded once.
+
+    The weights are read and the model put in eval mode at construction, and a
+    few warm-up passes run so the first real request doesn't pay for lazy
+    initialization. predict() thresholds the predicted mask and reports the
+    diseased share of the leaf with the time it took; apredict() does the same
+    on the engine's thread so the event loop isn't blocked.
+
+    For many images at once, iter_predictions() decodes and resizes them on a
+    pool of decode_workers threads while the model runs batched forward passes
+    of batch_size images, streaming results back in input order.
+    aiter_predictions() does the same for an async source such as an upload queue.
+
+    predict_tiled() keeps full resolution for large field images by running
+    overlapping image_size tiles through the model instead of resizing.
+    """
+
+    def __init__(
+        self,
+        model_weights: str = "unet_model.pth",
+        device: Optional[str] = None,
+        image_size: int = 256,
+        threshold: float = 0.5,
+        warmup_runs: int = 2,
+        batch_size: int = 16,
+        decode_workers: int = 4
+    ):
+        self.logger = logging.getLogger("plant_health_engine")
+        self.device = torch.device(device or ("cuda" if torch.cuda.is_available() else "cpu"))
+        self.image_size = image_size
+        self.batch_size = batch_size
+        # sigmoid(x) > threshold exactly when x > logit(threshold), so the mask is cut on the raw output
+        self.threshold = threshold
+        self.logit_threshold = math.log(threshold / (1 - threshold))
+        self.transform = transforms.Compose([
+            transforms.Resize((image_size, image_size)),
+            transforms.ToTensor()
+        ])
+        # Forward passes are serialized; torch already parallelizes within one
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="plant_health")
+        # Pillow releases the GIL while decoding and resizing, so threads decode in parallel
+        self._decode_executor = ThreadPoolExecutor(max_workers=decode_workers, thread_name_prefix="plant_health_decode")
+        self.stats = {
+            "images": 0,
+            "total_latency": 0.0,
+            "last_latency": 0.0
+        }
+
+        try:
+            self.model = UNet().to(self.device)
+            self.model.load_state_dict(torch.load(model_weights, map_location=self.device))
+            self.model.eval()
+            self.logger.info(f"Loaded plant health model from {model_weights} on {self.device}")
+        except Exception as e:
+            self.logger.error(f"Error loading plant health model: {str(e)}")
+            raise
+
+        self.warmup(warmup_runs)
+
+    def warmup(self, runs: int = 2) -> None:
+        """Run forward passes on a blank image to initialize kernels and allocators"""
+        blank = torch.zeros(1, 3, self.image_size, self.image_size, device=self.device)
+        start = time.perf_counter()
+        with self._lock, torch.inference_mode():
+            for _ in range(runs):
+                self.model(blank)
+        if runs:
+            self.logger.info(f"Warm-up: {(time.perf_counter() - start) / runs * 1000:.1f} ms per pass")
+
+    def _load_image(self, image: ImageInput) -> Image.Image:
+        if isinstance(image, str):
+            image = Image.open(image)
+        elif isinstance(image, bytes):
+            image = Image.open(io.BytesIO(image))
+        elif isinstance(image, np.ndarray):
+            image = Image.fromarray(image)
+        return image.convert("RGB")
+
+    def _prepare(self, image: ImageInput) -> torch.Tensor:
+        """Decode, resize and convert one image to a CHW tensor; runs on the decode pool"""
+        return self.transform(self._load_image(image))
+
+    def _diseased_percentages(self, batch: torch.Tensor) -> List[float]:
+        """Run one forward pass and return the diseased share of each image's mask"""
+        if self.device.type == "cuda":
+            batch = batch.pin_memory().to(self.device, non_blocking=True)
+        else:
+            batch = batch.to(self.device)
+        with self._lock, torch.inference_mode():
+            output = self.model(batch)
+            # === Pixel Quantification ===
+            diseased_pixels = (output > self.logit_threshold).flatten(1).sum(dim=1).tolist()
+        total_pixels = output[0].numel()
+        return [(diseased / total_pixels) * 100 for diseased in diseased_pixels]
+
+    def _record(self, images: int, latency: float) -> None:
+        with self._lock:
+            self.stats["images"] += images
+            self.stats["total_latency"] += latency
+            self.stats["last_latency"] = latency / images
+
+    def predict(self, image: ImageInput) -> Dict[str, Any]:
+        """Return the disease type, diseased percentage and latency for one image"""
+        try:
+            start = time.perf_counter()
+            disease_percent = self._diseased_percentages(self._prepare(image).unsqueeze(0))[0]
+            latency = time.perf_counter() - start
+            self._record(1, latency)
+            return {
+                "disease_type": "",
+                "disease_percentage": round(disease_percent, 2),
+                "latency_ms": round(latency * 1000, 2)
+            }
+
+        except Exception as e:
+            self.logger.error(f"Error running plant health inference: {str(e)}")
+            raise
+
+    def _batch_results(self, images: List[ImageInput], tensors: List[Any], start: float) -> List[Dict[str, Any]]:
+        """
+        Results for one batch; tensors holds each image's prepared tensor or the
+        exception that decoding raised. Latency is the batch's wall time per image.
+        """
+        results: List[Dict[str, Any]] = [{"disease_type": ""} for _ in images]
+        for image, result in zip(images, results):
+            if isinstance(image, str):
+                result["source"] = image
+
+        decoded = [i for i, tensor in enumerate(tensors) if isinstance(tensor, torch.Tensor)]
+        for i, tensor in enumerate(tensors):
+            if not isinstance(tensor, torch.Tensor):
+                # One unreadable upload shouldn't fail the rest of the batch
+                self.logger.warning(f"Skipping image {results[i].get('source', i)}: {str(tensor)}")
+                results[i]["error"] = str(tensor)
+
+        if decoded:
+            percentages = self._diseased_percentages(torch.stack([tensors[i] for i in decoded]))
+            latency = time.perf_counter() - start
+            self._record(len(decoded), latency)
+            for i, disease_percent in zip(decoded, percentages):
+                results[i]["disease_percentage"] = round(disease_percent, 2)
+                results[i]["latency_ms"] = round(latency / len(decoded) * 1000, 2)
+        return results
+
+    def _decode(self, image: ImageInput) -> Any:
+        try:
+            return self._prepare(image)
+        except Exception as e:
+            return e
+
+    def iter_predictions(self, images: Iterable[ImageInput], batch_size: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Predict a stream of images in batches, yielding one result per image in
+        input order. Decoding runs up to two batches ahead of the model, so memory
+        stays bounded however long the stream. Images that fail to decode yield
+        a result with an "error" instead of a percentage.
+        """
+        batch_size = batch_size or self.batch_size
+        pending: Deque = deque()
+        images = iter(images)
+        exhausted = False
+        try:
+            while True:
+                while not exhausted and len(pending) < 2 * batch_size:
+                    image = next(images, _END)
+                    if image is _END:
+                        exhausted = True
+                        break
+                    pending.append((image, self._decode_executor.submit(self._decode, image)))
+                if not pending:
+                    return
+
+                start = time.perf_counter()
+                batch = [pending.popleft() for _ in range(min(batch_size, len(pending)))]
+                tensors = [future.result() for _, future in batch]
+                yield from self._batch_results([image for image, _ in batch], tensors, start)
+
+        except Exception as e:
+            self.logger.error(f"Error running batched plant health inference: {str(e)}")
+            raise
+        finally:
+            for _, future in pending:
+                future.cancel()
+
+    def predict_batch(self, images: Iterable[ImageInput], batch_size: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Predict many images at once; see iter_predictions()"""
+        return list(self.iter_predictions(images, batch_size))
+
+    def predict_directory(self, directory: str, patterns: Iterable[str] = ("*.jpg", "*.jpeg", "*.png"), batch_size: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+        """Stream predictions for the matching images in a directory, in name order"""
+        patterns = [pattern.lower() for pattern in patterns]
+        paths = (
+            os.path.join(directory, name) for name in sorted(os.listdir(directory))
+            if any(fnmatch.fnmatch(name.lower(), pattern) for pattern in patterns)
+        )
+        return self.iter_predictions(paths, batch_size)
+
+    async def aiter_predictions(
+        self,
+        images: AsyncIterable[ImageInput],
+        batch_size: Optional[int] = None,
+        max_wait: float = 0.05
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Predict images from an async source such as an upload queue. A batch is
+        sent once batch_size images have arrived or max_wait seconds after its
+        first image, so a trickle of uploads isn't held back waiting for a full batch.
+        """
+        batch_size = batch_size or self.batch_size
+        loop = asyncio.get_running_loop()
+        source = images.__aiter__()
+        next_image: Optional[asyncio.Future] = None
+        exhausted = False
+
+        while not exhausted:
+            batch: List[ImageInput] = []
+            deadline = None
+            while len(batch) < batch_size:
+                if next_image is None:
+                    next_image = asyncio.ensure_future(source.__anext__())
+                timeout = None if deadline is None else max(0.0, deadline - loop.time())
+                done, _ = await asyncio.wait({next_image}, timeout=timeout)
+                if not done:
+                    # The wait for this image carries over into the next batch
+                    break
+                future, next_image = next_image, None
+                try:
+                    batch.append(future.result())
+                except StopAsyncIteration:
+                    exhausted = True
+                    break
+                if deadline is None:
+                    deadline = loop.time() + max_wait
+            if not batch:
+                continue
+
+            start = time.perf_counter()
+            tensors = await asyncio.gather(*(loop.run_in_executor(self._decode_executor, self._decode, image) for image in batch))
+            for result in await loop.run_in_executor(self._executor, self._batch_results, batch, tensors, start):
+                yield result
+
+    def _tile_batches(self, tiles: List[np.ndarray], batch_size: int) -> Iterator[np.ndarray]:
+        """Mask probabilities for HxWx3 uint8 tiles, batch_size at a time"""
+        for start in range(0, len(tiles), batch_size):
+            batch = torch.from_numpy(np.stack(tiles[start:start + batch_size])).permute(0, 3, 1, 2).float().div_(255)
+            batch = batch.to(self.device)
+            with self._lock, torch.inference_mode():
+                probabilities = torch.sigmoid(self.model(batch))[:, 0]
+            yield probabilities.cpu().numpy()
+
+    def predict_tiled(self, image: ImageInput, overlap: int = 32, batch_size: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Quantify disease at full resolution by sliding an image_size window with
+        the given overlap over the image. Overlapping predictions are blended with
+        weights that fall off linearly across the overlap, so tile seams don't show
+        in the mask. The mask is never built at full resolution: one band of tile
+        rows is accumulated at a time and its finished rows are counted and
+        discarded, so working memory is 2 x image_size x width floats on top of the
+        uint8 image. A memory-mapped HxWx3 uint8 array is only read band by band.
+        """
+        try:
+            start = time.perf_counter()
+            size = self.image_size
+            batch_size = batch_size or self.batch_size
+            if not 0 <= overlap < size // 2:
+                raise ValueError(f"overlap must be between 0 and {size // 2 - 1}")
+
+            pixels = image if isinstance(image, np.ndarray) else np.asarray(self._load_image(image))
+            height, width = pixels.shape[:2]
+            row_starts = _tile_starts(height, size, size - overlap)
+            column_starts = _tile_starts(width, size, size - overlap)
+
+            # Feathering window; weights stay positive so image borders normalize correctly
+            ramp = np.minimum(1.0, np.minimum(np.arange(1, size + 1), np.arange(size, 0, -1)) / (overlap + 1)).astype('float32')
+            window = np.outer(ramp, ramp)
+
+            # Blended probability sums and weights for rows [top, top + size)
+            band_width = max(width, size)
+            weighted = np.zeros((size, band_width), dtype='float32')
+            weights = np.zeros((size, band_width), dtype='float32')
+            diseased_pixels = 0
+            num_tiles = 0
+
+            for r, top in enumerate(row_starts):
+                band = np.asarray(pixels[top:top + size])
+                tiles = [_pad_tile(band[:, left:left + size], size) for left in column_starts]
+                lefts = iter(column_starts)
+                for probabilities in self._tile_batches(tiles, batch_size):
+                    for tile_probabilities in probabilities:
+                        left = next(lefts)
+                        weighted[:, left:left + size] += tile_probabilities * window
+                        weights[:, left:left + size] += window
+                num_tiles += len(tiles)
+
+                # Rows above the next tile row get no more predictions: count and drop them
+                done = (row_starts[r + 1] if r + 1 < len(row_starts) else height) - top
+                blended = weighted[:done, :width] / weights[:done, :width]
+                diseased_pixels += int(np.count_nonzero(blended > self.threshold))
+                weighted[:size - done] = weighted[done:]
+                weighted[size - done:] = 0
+                weights[:size - done] = weights[done:]
+                weights[size - done:] = 0
+
+            total_pixels = height * width
+            latency = time.perf_counter() - start
+            self._record(1, latency)
+            return {
+                "disease_type": "",
+                "disease_percentage": round(diseased_pixels / total_pixels * 100, 2),
+                "diseased_pixels": diseased_pixels,
+                "healthy_pixels": total_pixels - diseased_pixels,
+                "tiles": num_tiles,
+                "latency_ms": round(latency * 1000, 2)
+            }
+
+        except Exception as e:
+            self.logger.error(f"Error running tiled plant health inference: {str(e)}")
+            raise
+
+    async def apredict(self, image: ImageInput) -> Dict[str, Any]:
+        """predict() on the engine's thread, without blocking the event loop"""
+        return await asyncio.get_running_loop().run_in_executor(self._executor, self.predict, image)
+
+    async def apredict_tiled(self, image: ImageInput, overlap: int = 32, batch_size: Optional[int] = None) -> Dict[str, Any]:
+        """predict_tiled() on the engine's thread, without blocking the event loop"""
+        return await asyncio.get_running_loop().run_in_executor(self._executor, self.predict_tiled, image, overlap, batch_size)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return the number of images served and their average latency"""
+        images = self.stats["images"]
+        return {
+            **self.stats,
+            "avg_latency_ms": self.stats["total_latency"] / images * 1000 if images else 0.0
+        }
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=False)
+        self._decode_executor.shutdown(wait=False)
+
+# Engines by weights file, so each file is loaded once per process
+_engines: Dict[str, PlantHealthEngine] = {}
+_engines_lock = threading.Lock()
+
+def get_plant_health_engine(model_weights: str = "unet_model.pth") -> PlantHealthEngine:
+    """
+    Get or create the shared engine for a weights file
+    """
+    with _engines_lock:
+        if model_weights not in _engines:
+            _engines[model_weights] = PlantHealthEngine(model_weights)
+        return _engines[model_weights]
+
 def run_inference(img_path, model_weights="unet_model.pth"):
-    device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-    
-    # Load and transform image
-    transform = transforms.Compose([
-        transforms.Resize((256, 256)),
-        transforms.ToTensor()
-    ])
-    image = Image.open(img_path).convert("RGB")
-    input_tensor = transform(image).unsqueeze(0).to(device)
-
-    # Load model and weights
-    model = UNet().to(device)
-    model.load_state_dict(torch.load(model_weights, map_location=device))
-    model.eval()
-
-    with torch.no_grad():
-        output = model(input_tensor)
-        pred_mask = torch.sigmoid(output).squeeze().cpu().numpy()
-        pred_mask_bin = (pred_mask > 0.5).astype(np.uint8)
-
-    # === Pixel Quantification ===
-    total_pixels = pred_mask_bin.size
-    diseased_pixels = np.sum(pred_mask_bin == 1)
-    healthy_pixels = total_pixels - diseased_pixels
-    disease_percent = (diseased_pixels / total_pixels) * 100
-    disease_type = ""
-    result = {"disease_type": disease_type,
-              "disease_percentage": round(disease_percent, 2)}
-    return json.dumps(result)
-
-
-run_inference("raw_image.png")
+    result = get_plant_health_engine(model_weights).predict(img_path)
+    return json.dumps({"disease_type": result["disease_type"], "disease_percentage": result["disease_percentage"]})
+
+if __name__ == "__main__":
+    print(run_inference("raw_image.png"))
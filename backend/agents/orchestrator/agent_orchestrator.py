@@ -1,19 +1,22 @@
-from typing import Dict, List, Any, Optional, Tuple, TypedDict
+from typing import Dict, List, Any, Optional, Tuple, TypedDict, AsyncIterator, Union
 import asyncio
 from agents.utils.base_agent import BaseAgent
 import logging
 from agents.vector_store.vector_store import VectorStore
+from agents.orchestrator.agent_router import AgentRouter
+from agents.orchestrator.response_cache import SemanticResponseCache
+from agents.orchestrator.prompt_compactor import PromptCompactor
+from agents.orchestrator.satisfaction import SatisfactionStrategy, create_satisfaction_strategy
+from agents.utils.llm_limiter import LLMLimiter, get_llm_limiter
+from agents.utils.metrics import get_metrics_registry, start_trace, track_stage
 from langchain_core.messages import HumanMessage, AIMessage, SystemMessage
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 from langchain_core.output_parsers import JsonOutputParser
 from langchain_openai import ChatOpenAI
 from langgraph.graph import StateGraph, END
-from langchain.tools import Tool
-from langchain.agents import AgentExecutor, create_openai_functions_agent
-from langchain.prompts import ChatPromptTemplate, MessagesPlaceholder
-from langchain.schema import AgentAction, AgentFinish
-from agents.utils.simple_query_agent import SimpleQueryHandler  # Import the simple query handler
-import json
+import copy
+import re
+import time
 
 class AgentState(TypedDict):
     messages: List[Any]
@@ -26,39 +29,138 @@ class AgentState(TypedDict):
     complexity_score: int  # Track query complexity
 
 class AgentOrchestrator:
-    def __init__(self, openai_api_key: str):
+    def __init__(
+        self,
+        openai_api_key: str,
+        routing_margin: float = 0.05,
+        execution_mode: str = "sequential",
+        fan_out_agents: int = 3,
+        agent_timeout: float = 30.0,
+        llm: Optional[Any] = None,
+        vector_store: Optional[VectorStore] = None,
+        llm_limiter: Optional[LLMLimiter] = None,
+        enable_response_cache: bool = False,
+        response_cache_config: Optional[Dict[str, Any]] = None,
+        satisfaction_strategy: Union[str, SatisfactionStrategy] = "llm",
+        satisfaction_config: Optional[Dict[str, Any]] = None,
+        coalesce_requests: bool = True,
+        prompt_token_budget: int = 3000,
+        result_token_budget: int = 800
+    ):
+        if execution_mode not in ("sequential", "fan_out"):
+            raise ValueError(f"Unknown execution mode: {execution_mode}")
+            
         self.agents: Dict[str, BaseAgent] = {}
         self.logger = logging.getLogger("orchestrator")
-        self.llm = ChatOpenAI(
+        self.llm = llm or ChatOpenAI(
             model="gpt-4-turbo-preview",
             temperature=0,
             openai_api_key=openai_api_key
         )
         
+        # All LLM calls are async and share one concurrency limit
+        self.llm_limiter = llm_limiter or get_llm_limiter()
+        
         # Initialize vector store with error handling
-        try:
-            self.vector_store = VectorStore()
-            self.logger.info("Successfully initialized vector store")
-        except Exception as e:
-            self.logger.error(f"Error initializing vector store: {str(e)}")
-            self.vector_store = None
+        self.vector_store = vector_store
+        if self.vector_store is None:
+            try:
+                self.vector_store = VectorStore()
+                self.logger.info("Successfully initialized vector store")
+            except Exception as e:
+                self.logger.error(f"Error initializing vector store: {str(e)}")
+                self.vector_store = None
             
-        # Create and register the simple query handler
-        # self.simple_query_handler = SimpleQueryHandler("simple_query_handler", openai_api_key)
+        # Embedding router; the LLM is only asked when the top-2 margin is below routing_margin
+        self.router = AgentRouter(self.vector_store, margin_threshold=routing_margin)
+        
+        # How execute_agent decides a result answers the query: "llm", "embedding" or "confidence"
+        self.satisfaction_strategy = create_satisfaction_strategy(
+            satisfaction_strategy,
+            self.llm,
+            self.llm_limiter,
+            vector_store=self.vector_store,
+            **(satisfaction_config or {})
+        )
+        
+        # Keeps the finalize prompt within a token budget
+        self.prompt_compactor = PromptCompactor(max_tokens=prompt_token_budget, max_result_tokens=result_token_budget)
+        
+        # Single-flight: concurrent identical queries share one workflow run
+        self.coalesce_requests = coalesce_requests
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self.coalescing_stats = {
+            "requests": 0,
+            "executions": 0,
+            "coalesced": 0
+        }
+        
+        # Fan-out mode runs the top-N agents concurrently instead of one per iteration
+        self.execution_mode = execution_mode
+        self.fan_out_agents = fan_out_agents
+        self.agent_timeout = agent_timeout
+        
+        # Opt-in semantic cache of final results, keyed by query embedding
+        self.response_cache: Optional[SemanticResponseCache] = None
+        if enable_response_cache:
+            if self.vector_store is None:
+                self.logger.warning("Response cache disabled: vector store is unavailable")
+            else:
+                self.response_cache = SemanticResponseCache(self.vector_store, **(response_cache_config or {}))
             
         self.workflow = self._create_workflow()
+        self.fan_out_workflow = self._create_workflow(fan_out=True)
+        
+        # Streaming runs the graphs without the finalize node and streams the final answer itself
+        self.streaming_workflow = self._create_workflow(finalize=False)
+        self.streaming_fan_out_workflow = self._create_workflow(fan_out=True, finalize=False)
+        
+    def _build_final_messages(self, state: AgentState) -> Tuple[List[Any], Dict[str, int]]:
+        """Build the prompt that synthesizes all agent results into one answer, with its token counts"""
+        final_prompt = ChatPromptTemplate.from_messages([
+            ("system", """You are an expert sustainable farming advisor.
+            Analyze the results from various agents and provide comprehensive advice
+            for sustainable farming practices."""),
+            ("human", "Query: {query}"),
+            ("human", "Results: {results}")
+        ])
         
-    def _create_workflow(self) -> StateGraph:
+        results_str, token_usage = self.prompt_compactor.compact(state["tools_results"])
+        messages = final_prompt.format_messages(
+            query=state["messages"][-1].content,
+            results=results_str
+        )
+        token_usage["prompt"] = sum(self.prompt_compactor.count_tokens(message.content) for message in messages)
+        return messages, token_usage
+        
+    def _build_final_result(self, state: AgentState, response_text: str, token_usage: Dict[str, int]) -> Dict[str, Any]:
+        """Assemble the final result returned to callers"""
+        return {
+            "response": response_text,
+            "sources": state["tools_results"],
+            "iterations": state["iteration_count"],
+            "query_satisfied": state["query_satisfied"],
+            "token_usage": token_usage
+        }
+        
+    def _create_workflow(self, fan_out: bool = False, finalize: bool = True) -> StateGraph:
         """Create the LangGraph workflow for agent orchestration"""
         # Create the workflow graph
         workflow = StateGraph(AgentState)
         
         # Define the nodes
-        def route_to_agent(state: AgentState) -> Dict[str, Any]:
+        async def route_to_agent(state: AgentState) -> Dict[str, Any]:
             """Route to appropriate agent based on query"""
             messages = state["messages"]
             last_message = messages[-1].content if messages else ""
             
+            # Try the embedding router first, skipping agents that already answered
+            used_agents = {result["agent"] for result in state["tools_results"]}
+            agent_name = await self.router.route(last_message, exclude=used_agents)
+            if agent_name:
+                state["current_agent"] = agent_name
+                return state
+            
             # Use LLM to determine which agent to use
             routing_prompt = ChatPromptTemplate.from_messages([
                 ("system", """You are an expert at routing queries to the appropriate agent.
@@ -73,7 +175,7 @@ class AgentOrchestrator:
                 ("human", "{query}")
             ])
             
-            response = self.llm.invoke(routing_prompt.format_messages(query=last_message))
+            response = await self.llm_limiter.ainvoke(self.llm, routing_prompt.format_messages(query=last_message), stage="route")
             agent_name = response.content.strip()
             
             # Update state with selected agent
@@ -88,7 +190,8 @@ class AgentOrchestrator:
                 return state
                 
             agent = self.agents[agent_name]
-            result = await agent.process(state["messages"][-1].content)
+            with track_stage("execute", agent=agent_name):
+                result = await agent.process(state["messages"][-1].content)
             
             # Validate result
             if result and isinstance(result, dict) and "status" in result:
@@ -99,19 +202,11 @@ class AgentOrchestrator:
                     })
                     
                     # Check if this result satisfies the query
-                    satisfaction_prompt = ChatPromptTemplate.from_messages([
-                        ("system", """You are an expert at evaluating if a response fully answers a query.
-                        Respond with just 'yes' or 'no'."""),
-                        ("human", "Query: {query}"),
-                        ("human", "Response: {response}")
-                    ])
-                    
-                    satisfaction_response = self.llm.invoke(satisfaction_prompt.format_messages(
-                        query=state["messages"][-1].content,
-                        response=json.dumps(result)
-                    ))
-                    
-                    state["query_satisfied"] = satisfaction_response.content.strip().lower() == "yes"
+                    with track_stage("satisfaction"):
+                        state["query_satisfied"] = await self.satisfaction_strategy.check(
+                            state["messages"][-1].content,
+                            result
+                        )
                 else:
                     state["messages"].append(AIMessage(content=f"Error from {agent_name}: {result.get('error', 'Unknown error')}"))
             else:
@@ -119,6 +214,48 @@ class AgentOrchestrator:
             
             return state
             
+        async def fan_out_agents(state: AgentState) -> AgentState:
+            """Run the top-N candidate agents concurrently with a per-agent timeout"""
+            query = state["messages"][-1].content
+            try:
+                ranked = await self.router.rank(query, top_k=self.fan_out_agents)
+            except Exception as e:
+                self.logger.error(f"Error ranking agents: {str(e)}")
+                ranked = []
+            agent_names = [name for name, _ in ranked if name in self.agents]
+            if not agent_names:
+                agent_names = list(self.agents.keys())[:self.fan_out_agents]
+            else:
+                # Agents whose capabilities couldn't be embedded can't be ranked, so they always run
+                agent_names += [name for name in self.agents if name not in self.router.capability_vectors]
+            
+            async def run_agent(agent_name: str) -> Any:
+                with track_stage("execute", agent=agent_name):
+                    return await asyncio.wait_for(self.agents[agent_name].process(query), timeout=self.agent_timeout)
+                
+            results = await asyncio.gather(*(run_agent(name) for name in agent_names), return_exceptions=True)
+            
+            # Keep whatever finished; slow or failing agents are reported but don't sink the query
+            for agent_name, result in zip(agent_names, results):
+                if isinstance(result, asyncio.TimeoutError):
+                    self.logger.warning(f"Agent {agent_name} timed out after {self.agent_timeout}s")
+                    state["messages"].append(AIMessage(content=f"Error from {agent_name}: timed out"))
+                elif isinstance(result, Exception):
+                    state["messages"].append(AIMessage(content=f"Error from {agent_name}: {str(result)}"))
+                elif isinstance(result, dict) and result.get("status") == "success":
+                    state["tools_results"].append({
+                        "agent": agent_name,
+                        "result": result
+                    })
+                elif isinstance(result, dict) and "status" in result:
+                    state["messages"].append(AIMessage(content=f"Error from {agent_name}: {result.get('error', 'Unknown error')}"))
+                else:
+                    state["messages"].append(AIMessage(content=f"Invalid result from {agent_name}"))
+                    
+            state["iteration_count"] += 1
+            self.logger.info(f"Fan-out ran {len(agent_names)} agents, Results: {len(state['tools_results'])}")
+            return state
+            
         def should_continue(state: AgentState) -> Dict[str, Any]:
             """Determine if we need more agents or can finish"""
             # Increment iteration count
@@ -130,57 +267,47 @@ class AgentOrchestrator:
             # Check iteration limit
             if state["iteration_count"] >= 5:  # Limit to 5 iterations
                 self.logger.info("Reached maximum iterations")
-                return {"next": "end"}
+                return {"next": "end", "iteration_count": state["iteration_count"]}
                 
             # Check if query is satisfied
             if state["query_satisfied"]:
                 self.logger.info("Query satisfied by current results")
-                return {"next": "end"}
+                return {"next": "end", "iteration_count": state["iteration_count"]}
                 
             # Check if we have enough results
             if len(state["tools_results"]) >= 3:  # Limit to 3 agents per query
                 self.logger.info("Reached maximum number of agent results")
-                return {"next": "end"}
+                return {"next": "end", "iteration_count": state["iteration_count"]}
                 
             # Check if we've used all available agents
             used_agents = {result["agent"] for result in state["tools_results"]}
             available_agents = set(self.agents.keys())
             if used_agents == available_agents:
                 self.logger.info("All available agents have been used")
-                return {"next": "end"}
+                return {"next": "end", "iteration_count": state["iteration_count"]}
                 
-            return {"next": "continue"}
+            return {"next": "continue", "iteration_count": state["iteration_count"]}
             
-        def generate_final_response(state: AgentState) -> AgentState:
+        async def generate_final_response(state: AgentState) -> AgentState:
             """Generate final response using all agent results"""
-            final_prompt = ChatPromptTemplate.from_messages([
-                ("system", """You are an expert sustainable farming advisor.
-                Analyze the results from various agents and provide comprehensive advice
-                for sustainable farming practices."""),
-                ("human", "Query: {query}"),
-                ("human", "Results: {results}")
-            ])
+            messages, token_usage = self._build_final_messages(state)
+            response = await self.llm_limiter.ainvoke(self.llm, messages, stage="finalize")
+            state["final_result"] = self._build_final_result(state, response.content, token_usage)
+            return state
             
-            results_str = json.dumps(state["tools_results"], indent=2)
-            response = self.llm.invoke(final_prompt.format_messages(
-                query=state["messages"][-1].content,
-                results=results_str
-            ))
-            
-            state["final_result"] = {
-                "response": response.content,
-                "sources": state["tools_results"],
-                "iterations": state["iteration_count"],
-                "query_satisfied": state["query_satisfied"]
-            }
+        if finalize:
+            workflow.add_node("finalize", self._instrument("finalize", generate_final_response))
             
-            return state
+        if fan_out:
+            workflow.add_node("fan_out", self._instrument("fan_out", fan_out_agents))
+            workflow.add_edge("fan_out", "finalize" if finalize else END)
+            workflow.set_entry_point("fan_out")
+            return workflow.compile()
             
         # Add nodes to the graph
-        workflow.add_node("route", route_to_agent)
-        workflow.add_node("execute", execute_agent)
-        workflow.add_node("decide", should_continue)
-        workflow.add_node("finalize", generate_final_response)
+        workflow.add_node("route", self._instrument("route", route_to_agent))
+        workflow.add_node("execute", self._instrument("execute", execute_agent))
+        workflow.add_node("decide", self._instrument("decide", should_continue))
         
         # Add edges
         workflow.add_edge("route", "execute")
@@ -190,7 +317,7 @@ class AgentOrchestrator:
             lambda x: x["next"],
             {
                 "continue": "route",
-                "end": "finalize"
+                "end": "finalize" if finalize else END
             }
         )
         
@@ -199,38 +326,179 @@ class AgentOrchestrator:
         
         return workflow.compile()
         
+    @staticmethod
+    def _instrument(stage: str, node):
+        """Wrap a workflow node so its duration is recorded under stage"""
+        async def timed_node(state: AgentState) -> Any:
+            with track_stage(stage):
+                result = node(state)
+                if asyncio.iscoroutine(result):
+                    result = await result
+                return result
+        return timed_node
+        
+    def _initial_state(self, query: str) -> AgentState:
+        """Create the workflow state for a new query"""
+        return {
+            "messages": [HumanMessage(content=query)],
+            "current_agent": None,
+            "tools_results": [],
+            "final_result": None,
+            "iteration_count": 0,  # Initialize iteration counter
+            "query_satisfied": False  # Initialize query satisfaction flag
+        }
+        
     async def process_query(self, query: str, context: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """Process a user query using the LangGraph workflow"""
+        trace = start_trace()
+        queries = get_metrics_registry().counter("farmx_queries_total", "Queries processed by outcome")
+        query_duration = get_metrics_registry().histogram("farmx_query_duration_seconds", "End-to-end process_query latency")
         try:
-            # Initialize state
-            initial_state: AgentState = {
-                "messages": [HumanMessage(content=query)],
-                "current_agent": None,
-                "tools_results": [],
-                "final_result": None,
-                "iteration_count": 0,  # Initialize iteration counter
-                "query_satisfied": False  # Initialize query satisfaction flag
-            }
+            query_vector = None
+            if self.response_cache is not None:
+                with track_stage("cache_lookup"):
+                    query_vector = await self.vector_store.get_query_vector(query)
+                    cached_result = await self.response_cache.lookup(query_vector)
+                if cached_result is not None:
+                    timings = trace.to_dict()
+                    queries.inc(status="success", source="cache")
+                    query_duration.observe(timings["total"], source="cache")
+                    return {
+                        "status": "success",
+                        "result": cached_result,
+                        "cached": True,
+                        "timings": timings
+                    }
+                    
+            self.coalescing_stats["requests"] += 1
+            key = self._normalize_query(query)
+            task = self._inflight.get(key) if self.coalesce_requests else None
+            coalesced = task is not None
+            if coalesced:
+                self.coalescing_stats["coalesced"] += 1
+            else:
+                self.coalescing_stats["executions"] += 1
+                task = asyncio.ensure_future(self._run_workflow(query, query_vector))
+                if self.coalesce_requests:
+                    self._inflight[key] = task
+                    task.add_done_callback(lambda done, key=key: self._release_inflight(key, done))
+                    
+            # Shield so a cancelled caller doesn't cancel the run other callers are waiting on
+            final_result, run_timings = await asyncio.shield(task)
             
-            # Run the workflow
-            final_state = await self.workflow.ainvoke(initial_state)
+            # The shared run's breakdown plus this caller's own cache lookup and wait
+            timings = trace.to_dict()
+            timings.update({key: value for key, value in run_timings.items() if key != "total"})
+            timings["stages"] = {**trace.stages, **run_timings["stages"]}
+            source = "coalesced" if coalesced else "workflow"
+            queries.inc(status="success", source=source)
+            query_duration.observe(timings["total"], source=source)
             
             return {
                 "status": "success",
-                "result": final_state["final_result"]
+                "result": copy.deepcopy(final_result) if coalesced else final_result,
+                "cached": False,
+                "coalesced": coalesced,
+                "timings": timings
             }
             
         except Exception as e:
             self.logger.error(f"Error processing query: {str(e)}")
+            queries.inc(status="error", source="workflow")
             return {
                 "status": "error",
                 "error": str(e)
             }
             
+    @staticmethod
+    def _normalize_query(query: str) -> str:
+        """Normalize case, whitespace and trailing punctuation for coalescing"""
+        return re.sub(r"\s+", " ", query).strip().rstrip("?!. ").lower()
+        
+    def _release_inflight(self, key: str, task: asyncio.Task) -> None:
+        """Forget a finished in-flight run"""
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            # Mark the exception retrieved even if every waiter was cancelled
+            task.exception()
+            
+    async def _run_workflow(self, query: str, query_vector: Optional[Any] = None) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """Run the workflow for a query, cache the final result and return it with its timing breakdown"""
+        trace = start_trace()
+        workflow = self.fan_out_workflow if self.execution_mode == "fan_out" else self.workflow
+        final_state = await workflow.ainvoke(self._initial_state(query))
+        
+        if query_vector is not None:
+            await self.response_cache.store(query_vector, final_state["final_result"])
+            
+        return final_state["final_result"], trace.to_dict()
+        
+    async def stream_query(self, query: str) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Process a query, yielding events as soon as they are available:
+        - route: an agent was selected
+        - agent_result: an agent produced a successful result
+        - token: a chunk of the final answer
+        - final: the complete result, same shape as process_query's "result"
+        - error: processing failed
+        """
+        trace = start_trace()
+        try:
+            query_vector = None
+            if self.response_cache is not None:
+                with track_stage("cache_lookup"):
+                    query_vector = await self.vector_store.get_query_vector(query)
+                    cached_result = await self.response_cache.lookup(query_vector)
+                if cached_result is not None:
+                    yield {"event": "final", "result": cached_result, "cached": True, "timings": trace.to_dict()}
+                    return
+                    
+            workflow = self.streaming_fan_out_workflow if self.execution_mode == "fan_out" else self.streaming_workflow
+            state = self._initial_state(query)
+            sent_results = 0
+            
+            async for update in workflow.astream(state, stream_mode="updates"):
+                for node_name, node_state in update.items():
+                    if not isinstance(node_state, dict):
+                        continue
+                    state.update(node_state)
+                    
+                    if node_name == "route" and state["current_agent"]:
+                        yield {"event": "route", "agent": state["current_agent"]}
+                        
+                    for tool_result in state["tools_results"][sent_results:]:
+                        yield {"event": "agent_result", "agent": tool_result["agent"], "result": tool_result["result"]}
+                    sent_results = len(state["tools_results"])
+                    
+            # Stream the synthesis token by token instead of waiting for the whole answer
+            response_chunks = []
+            finalize_start = time.perf_counter()
+            messages, token_usage = self._build_final_messages(state)
+            async for chunk in self.llm_limiter.astream(self.llm, messages, stage="finalize"):
+                if chunk.content:
+                    response_chunks.append(chunk.content)
+                    yield {"event": "token", "content": chunk.content}
+            finalize_duration = time.perf_counter() - finalize_start
+            trace.add_stage("finalize", finalize_duration)
+            get_metrics_registry().histogram("farmx_stage_duration_seconds", "Time spent in each orchestrator stage").observe(finalize_duration, stage="finalize")
+                    
+            final_result = self._build_final_result(state, "".join(response_chunks), token_usage)
+            if query_vector is not None:
+                await self.response_cache.store(query_vector, final_result)
+                
+            yield {"event": "final", "result": final_result, "cached": False, "timings": trace.to_dict()}
+            
+        except Exception as e:
+            self.logger.error(f"Error streaming query: {str(e)}")
+            yield {"event": "error", "error": str(e)}
+            
     async def register_agent(self, agent: BaseAgent) -> None:
         """Register a new agent with the orchestrator"""
         await agent.initialize()
         self.agents[agent.name] = agent
+        await self.router.register(agent)
+        self._invalidate_cache()
         self.logger.info(f"Registered agent: {agent.name}")
         
     async def unregister_agent(self, agent_name: str) -> None:
@@ -238,10 +506,40 @@ class AgentOrchestrator:
         if agent_name in self.agents:
             await self.agents[agent_name].cleanup()
             del self.agents[agent_name]
+            self.router.unregister(agent_name)
+            self._invalidate_cache()
             self.logger.info(f"Unregistered agent: {agent_name}")
             
+    def _invalidate_cache(self) -> None:
+        """Drop cached results, which no longer reflect the registered agents"""
+        if self.response_cache is not None:
+            self.response_cache.clear()
+            
+    def get_cache_stats(self) -> Optional[Dict[str, Any]]:
+        """Return response cache statistics, or None when caching is disabled"""
+        return self.response_cache.get_stats() if self.response_cache is not None else None
+        
+    def get_satisfaction_stats(self) -> Dict[str, Any]:
+        """Return satisfaction-check counters and the LLM latency saved by cheaper strategies"""
+        return self.satisfaction_strategy.get_stats(llm_latency=self.llm_limiter.get_stats()["avg_latency"])
+        
+    def get_coalescing_stats(self) -> Dict[str, Any]:
+        """Return how many queries shared an in-flight workflow run"""
+        requests = self.coalescing_stats["requests"]
+        return {
+            **self.coalescing_stats,
+            "in_flight": len(self._inflight),
+            "coalescing_ratio": self.coalescing_stats["coalesced"] / requests if requests else 0.0
+        }
+        
+    def get_routing_stats(self) -> Dict[str, Any]:
+        """Return how often routing took the embedding fast path vs the LLM"""
+        return self.router.get_stats()
+            
     async def cleanup(self) -> None:
         """Cleanup resources"""
         for agent in self.agents.values():
             await agent.cleanup()
-        self.agents.clear() 
\ No newline at end of file
+            self.router.unregister(agent.name)
+        self.agents.clear()
+        self._invalidate_cache() 
\ No newline at end of file
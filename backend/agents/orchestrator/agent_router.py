@@ -0,0 +1,85 @@
+from typing import Dict, List, Any, Optional, Tuple, Iterable
+import logging
+import numpy as np
+from agents.utils.base_agent import BaseAgent
+from agents.vector_store.vector_store import VectorStore
+
+class AgentRouter:
+    """Routes queries to agents by embedding similarity against their capabilities.
+
+    The capability matrix is built once per agent at registration time. A query is
+    routed on the fast path when the best agent beats the runner-up by at least
+    ``margin_threshold``; otherwise the caller is expected to fall back to the LLM.
+    """
+
+    def __init__(self, vector_store: Optional[VectorStore], margin_threshold: float = 0.05):
+        self.vector_store = vector_store
+        self.margin_threshold = margin_threshold
+        self.capability_vectors: Dict[str, np.ndarray] = {}
+        self.logger = logging.getLogger("agent_router")
+        self.stats = {
+            "fast_path": 0,
+            "llm_fallback": 0
+        }
+
+    @property
+    def enabled(self) -> bool:
+        """Whether embedding routing is available"""
+        return self.vector_store is not None and bool(self.capability_vectors)
+
+    async def register(self, agent: BaseAgent) -> None:
+        """Embed the agent's capabilities and add them to the capability matrix"""
+        if self.vector_store is None:
+            return
+
+        try:
+            capabilities = agent.get_capabilities()
+            self.capability_vectors[agent.name] = await self.vector_store.get_capability_vector(capabilities)
+        except Exception as e:
+            # The agent stays routable through the LLM fallback
+            self.logger.warning(f"Could not embed capabilities for {agent.name}: {str(e)}")
+
+    def unregister(self, agent_name: str) -> None:
+        """Remove an agent from the capability matrix"""
+        self.capability_vectors.pop(agent_name, None)
+
+    async def rank(self, query: str, top_k: int = 2, exclude: Optional[Iterable[str]] = None) -> List[Tuple[str, float]]:
+        """Return the ``top_k`` agents most similar to the query with their scores"""
+        if not self.enabled:
+            return []
+
+        excluded = set(exclude or [])
+        candidates = [(name, vector) for name, vector in self.capability_vectors.items() if name not in excluded]
+        if not candidates:
+            return []
+
+        query_vector = await self.vector_store.get_query_vector(query)
+        matches = await self.vector_store.find_similar_vectors(query_vector, candidates, top_k=top_k)
+        return [(name, float(score)) for name, score in matches]
+
+    async def route(self, query: str, exclude: Optional[Iterable[str]] = None) -> Optional[str]:
+        """Return the agent name on the fast path, or None when the LLM should decide"""
+        try:
+            ranked = await self.rank(query, top_k=2, exclude=exclude)
+        except Exception as e:
+            self.logger.error(f"Error ranking agents: {str(e)}")
+            ranked = []
+
+        if ranked:
+            margin = ranked[0][1] - ranked[1][1] if len(ranked) > 1 else float("inf")
+            if margin >= self.margin_threshold:
+                self.stats["fast_path"] += 1
+                self.logger.info(f"Fast-path routed to {ranked[0][0]} (margin {margin:.3f})")
+                return ranked[0][0]
+
+        self.stats["llm_fallback"] += 1
+        return None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return routing counters and the fast-path ratio"""
+        total = self.stats["fast_path"] + self.stats["llm_fallback"]
+        return {
+            **self.stats,
+            "total": total,
+            "fast_path_ratio": self.stats["fast_path"] / total if total else 0.0
+        }
@@ -0,0 +1,141 @@
+from typing import Dict, List, Any, Optional, Tuple
+import json
+import logging
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+TRUNCATION_MARKER = "...[truncated]"
+
+class PromptCompactor:
+    """Shrinks agent results to fit a token budget before they are sent to the LLM.
+
+    Redundant fields are dropped, JSON is serialized without whitespace, and
+    oversized results have their long strings and lists truncated so that each
+    result stays within ``max_result_tokens`` and all of them within ``max_tokens``.
+    """
+
+    def __init__(
+        self,
+        max_tokens: int = 3000,
+        max_result_tokens: int = 800,
+        drop_fields: Tuple[str, ...] = ("status", "agent"),
+        max_list_items: int = 5,
+        model: str = "gpt-4-turbo-preview"
+    ):
+        self.max_tokens = max_tokens
+        self.max_result_tokens = max_result_tokens
+        self.drop_fields = set(drop_fields)
+        self.max_list_items = max_list_items
+        self.logger = logging.getLogger("prompt_compactor")
+        self.encoding = None
+        if tiktoken is not None:
+            try:
+                encoding_name = tiktoken.encoding_name_for_model(model)
+            except KeyError:
+                encoding_name = "cl100k_base"
+            self.encoding = self._load_encoding(encoding_name)
+
+    def _load_encoding(self, name: str) -> Optional[Any]:
+        """Load a tiktoken encoding, or None when it is unavailable"""
+        try:
+            return tiktoken.get_encoding(name)
+        except Exception as e:
+            # tiktoken downloads its BPE files on first use, which fails offline
+            self.logger.warning(f"Could not load tiktoken encoding, estimating token counts: {str(e)}")
+            return None
+
+    def count_tokens(self, text: str) -> int:
+        """Count tokens with tiktoken, or estimate at ~4 characters per token"""
+        if self.encoding is not None:
+            return len(self.encoding.encode(text, disallowed_special=()))
+        return (len(text) + 3) // 4
+
+    def truncate_text(self, text: str, max_tokens: int) -> str:
+        """Cut text down to at most max_tokens tokens"""
+        if self.count_tokens(text) <= max_tokens:
+            return text
+        keep = max(0, max_tokens - self.count_tokens(TRUNCATION_MARKER))
+        if self.encoding is not None:
+            return self.encoding.decode(self.encoding.encode(text, disallowed_special=())[:keep]) + TRUNCATION_MARKER
+        return text[:keep * 4] + TRUNCATION_MARKER
+
+    @staticmethod
+    def _dumps(value: Any) -> str:
+        return json.dumps(value, separators=(",", ":"), ensure_ascii=False, default=str)
+
+    def _clean(self, value: Any, depth: int = 0) -> Any:
+        """Drop redundant and empty fields"""
+        if isinstance(value, dict):
+            cleaned = {}
+            for key, item in value.items():
+                if depth == 0 and key in self.drop_fields:
+                    continue
+                item = self._clean(item, depth + 1)
+                if item is None or item == "" or item == [] or item == {}:
+                    continue
+                cleaned[key] = item
+            return cleaned
+        if isinstance(value, list):
+            return [self._clean(item, depth + 1) for item in value]
+        return value
+
+    def _shrink(self, value: Any, scale: float) -> Any:
+        """Truncate strings and lists proportionally to scale"""
+        if isinstance(value, str):
+            tokens = self.count_tokens(value)
+            if tokens > 16:
+                return self.truncate_text(value, max(16, int(tokens * scale)))
+            return value
+        if isinstance(value, dict):
+            return {key: self._shrink(item, scale) for key, item in value.items()}
+        if isinstance(value, list):
+            items = [self._shrink(item, scale) for item in value[:self.max_list_items]]
+            if len(value) > self.max_list_items:
+                items.append(f"... {len(value) - self.max_list_items} more items")
+            return items
+        return value
+
+    def _fit(self, entry: Dict[str, Any], budget: int) -> str:
+        """Serialize one result within budget tokens"""
+        serialized = self._dumps(entry)
+        tokens = self.count_tokens(serialized)
+        if tokens <= budget:
+            return serialized
+
+        scale = budget / tokens
+        for _ in range(3):
+            serialized = self._dumps(self._shrink(entry, scale))
+            if self.count_tokens(serialized) <= budget:
+                return serialized
+            scale /= 2
+
+        # Still too large (e.g. many small fields): hard-cut the serialized form
+        return self.truncate_text(serialized, budget)
+
+    def compact(self, tools_results: List[Dict[str, Any]]) -> Tuple[str, Dict[str, int]]:
+        """Return the compacted results string and token counts before and after"""
+        raw_tokens = self.count_tokens(json.dumps(tools_results, indent=2, default=str))
+        if not tools_results:
+            return "[]", {"results_raw": raw_tokens, "results_compacted": 1}
+
+        entries = []
+        for tool_result in tools_results:
+            result = tool_result.get("result")
+            cleaned = self._clean(result) if isinstance(result, dict) else result
+            entries.append({"agent": tool_result.get("agent"), "result": cleaned})
+
+        budget = min(self.max_result_tokens, max(1, self.max_tokens // len(entries)))
+        compacted = "[" + ",".join(self._fit(entry, budget) for entry in entries) + "]"
+        compacted_tokens = self.count_tokens(compacted)
+
+        if compacted_tokens > self.max_tokens:
+            compacted = self.truncate_text(compacted, self.max_tokens)
+            compacted_tokens = self.count_tokens(compacted)
+
+        if compacted_tokens < raw_tokens:
+            self.logger.debug(f"Compacted agent results from {raw_tokens} to {compacted_tokens} tokens")
+
+        return compacted, {"results_raw": raw_tokens, "results_compacted": compacted_tokens}
@@ -0,0 +1,88 @@
+from typing import Dict, List, Any, Optional, Tuple
+from collections import OrderedDict
+import copy
+import logging
+import time
+import numpy as np
+from agents.vector_store.vector_store import VectorStore
+
+class SemanticResponseCache:
+    """LRU + TTL cache of orchestrator results keyed by query embedding.
+
+    A lookup hits when a cached query's embedding has cosine similarity of at
+    least ``similarity_threshold`` with the new query.
+    """
+
+    def __init__(
+        self,
+        vector_store: VectorStore,
+        similarity_threshold: float = 0.92,
+        ttl_seconds: float = 3600.0,
+        max_entries: int = 1024
+    ):
+        self.vector_store = vector_store
+        self.similarity_threshold = similarity_threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.logger = logging.getLogger("response_cache")
+        # entry id -> (query vector, result, expiry time); ordered from least to most recently used
+        self._entries: "OrderedDict[int, Tuple[np.ndarray, Dict[str, Any], float]]" = OrderedDict()
+        self._next_id = 0
+        self.stats = {
+            "hits": 0,
+            "misses": 0,
+            "evictions": 0,
+            "expirations": 0
+        }
+
+    def _purge_expired(self) -> None:
+        """Drop entries whose TTL has passed"""
+        now = time.monotonic()
+        expired = [entry_id for entry_id, (_, _, expires_at) in self._entries.items() if expires_at <= now]
+        for entry_id in expired:
+            del self._entries[entry_id]
+        self.stats["expirations"] += len(expired)
+
+    async def lookup(self, query_vector: np.ndarray) -> Optional[Dict[str, Any]]:
+        """Return a copy of the closest cached result above the threshold, if any"""
+        self._purge_expired()
+        if not self._entries:
+            self.stats["misses"] += 1
+            return None
+
+        candidates = [(entry_id, vector) for entry_id, (vector, _, _) in self._entries.items()]
+        matches = await self.vector_store.find_similar_vectors(query_vector, candidates, top_k=1)
+        if matches and matches[0][1] >= self.similarity_threshold:
+            entry_id = matches[0][0]
+            self._entries.move_to_end(entry_id)
+            self.stats["hits"] += 1
+            return copy.deepcopy(self._entries[entry_id][1])
+
+        self.stats["misses"] += 1
+        return None
+
+    async def store(self, query_vector: np.ndarray, result: Dict[str, Any]) -> None:
+        """Cache a result, evicting the least recently used entry when full"""
+        self._entries[self._next_id] = (
+            np.asarray(query_vector, dtype="float32"),
+            copy.deepcopy(result),
+            time.monotonic() + self.ttl_seconds
+        )
+        self._next_id += 1
+
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    def clear(self) -> None:
+        """Remove all cached results"""
+        self._entries.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters, the hit rate and the current size"""
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return {
+            **self.stats,
+            "size": len(self._entries),
+            "hit_rate": self.stats["hits"] / lookups if lookups else 0.0
+        }
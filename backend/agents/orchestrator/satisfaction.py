@@ -0,0 +1,139 @@
+from abc import ABC, abstractmethod
+from typing import Dict, Any, Optional, Union
+import json
+import logging
+import time
+from langchain_core.prompts import ChatPromptTemplate
+from agents.utils.llm_limiter import LLMLimiter
+from agents.vector_store.vector_store import VectorStore
+
+class SatisfactionStrategy(ABC):
+    """Decides whether an agent result fully answers the query"""
+
+    name = "base"
+    uses_llm = False
+
+    def __init__(self):
+        self.logger = logging.getLogger(f"satisfaction.{self.name}")
+        self.stats = {
+            "evaluations": 0,
+            "satisfied": 0,
+            "total_latency": 0.0
+        }
+
+    @abstractmethod
+    async def evaluate(self, query: str, result: Dict[str, Any]) -> bool:
+        """Return True when the result satisfies the query"""
+        pass
+
+    async def check(self, query: str, result: Dict[str, Any]) -> bool:
+        """Evaluate the result and record latency"""
+        start = time.perf_counter()
+        try:
+            satisfied = await self.evaluate(query, result)
+        finally:
+            self.stats["evaluations"] += 1
+            self.stats["total_latency"] += time.perf_counter() - start
+        if satisfied:
+            self.stats["satisfied"] += 1
+        return satisfied
+
+    def get_stats(self, llm_latency: float = 0.0) -> Dict[str, Any]:
+        """
+        Return evaluation counters. Strategies that avoid the LLM judge also report
+        the latency saved, estimated from the average LLM call latency ``llm_latency``.
+        """
+        evaluations = self.stats["evaluations"]
+        stats = {
+            "strategy": self.name,
+            **self.stats,
+            "avg_latency": self.stats["total_latency"] / evaluations if evaluations else 0.0
+        }
+        if not self.uses_llm:
+            stats["llm_calls_avoided"] = evaluations
+            stats["estimated_latency_saved"] = max(0.0, evaluations * llm_latency - self.stats["total_latency"])
+        return stats
+
+def _result_text(result: Dict[str, Any]) -> str:
+    """Extract the answer text from an agent result"""
+    for field in ("result", "response"):
+        if isinstance(result.get(field), str):
+            return result[field]
+    return json.dumps(result, default=str)
+
+class LLMJudgeStrategy(SatisfactionStrategy):
+    """Asks the LLM for a yes/no verdict (one extra round trip per result)"""
+
+    name = "llm"
+    uses_llm = True
+
+    def __init__(self, llm: Any, llm_limiter: LLMLimiter):
+        super().__init__()
+        self.llm = llm
+        self.llm_limiter = llm_limiter
+
+    async def evaluate(self, query: str, result: Dict[str, Any]) -> bool:
+        satisfaction_prompt = ChatPromptTemplate.from_messages([
+            ("system", """You are an expert at evaluating if a response fully answers a query.
+            Respond with just 'yes' or 'no'."""),
+            ("human", "Query: {query}"),
+            ("human", "Response: {response}")
+        ])
+
+        satisfaction_response = await self.llm_limiter.ainvoke(self.llm, satisfaction_prompt.format_messages(
+            query=query,
+            response=json.dumps(result)
+        ), stage="satisfaction")
+
+        return satisfaction_response.content.strip().lower() == "yes"
+
+class EmbeddingSimilarityStrategy(SatisfactionStrategy):
+    """Satisfied when the answer embedding is close enough to the query embedding"""
+
+    name = "embedding"
+
+    def __init__(self, vector_store: VectorStore, threshold: float = 0.6):
+        super().__init__()
+        self.vector_store = vector_store
+        self.threshold = threshold
+
+    async def evaluate(self, query: str, result: Dict[str, Any]) -> bool:
+        query_vector, result_vector = await self.vector_store.get_query_vectors([query, _result_text(result)])
+        matches = await self.vector_store.find_similar_vectors(query_vector, [("result", result_vector)], top_k=1)
+        return bool(matches) and matches[0][1] >= self.threshold
+
+class ConfidenceStrategy(SatisfactionStrategy):
+    """Satisfied when the agent reports a confidence at or above the threshold"""
+
+    name = "confidence"
+
+    def __init__(self, threshold: float = 0.8, field: str = "confidence"):
+        super().__init__()
+        self.threshold = threshold
+        self.field = field
+
+    async def evaluate(self, query: str, result: Dict[str, Any]) -> bool:
+        try:
+            return float(result.get(self.field)) >= self.threshold
+        except (TypeError, ValueError):
+            return False
+
+def create_satisfaction_strategy(
+    strategy: Union[str, SatisfactionStrategy],
+    llm: Any,
+    llm_limiter: LLMLimiter,
+    vector_store: Optional[VectorStore] = None,
+    **kwargs
+) -> SatisfactionStrategy:
+    """Build a strategy from its name ("llm", "embedding" or "confidence")"""
+    if isinstance(strategy, SatisfactionStrategy):
+        return strategy
+    if strategy == "llm":
+        return LLMJudgeStrategy(llm, llm_limiter)
+    if strategy == "embedding":
+        if vector_store is None:
+            raise ValueError("The embedding satisfaction strategy requires a vector store")
+        return EmbeddingSimilarityStrategy(vector_store, **kwargs)
+    if strategy == "confidence":
+        return ConfidenceStrategy(**kwargs)
+    raise ValueError(f"Unknown satisfaction strategy: {strategy}")
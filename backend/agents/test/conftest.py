@@ -0,0 +1,25 @@
+import pytest
+from ..orchestrator.agent_orchestrator import AgentOrchestrator
+from ..utils.llm_limiter import LLMLimiter
+from .test_agent import TestAgent
+from .test_concurrency import SlowLLM, StaticVectorStore
+
+@pytest.fixture
+def make_orchestrator():
+    """
+    Factory for orchestrators on a fake LLM and vector store (SlowLLM and
+    StaticVectorStore unless given), with a TestAgent registered per name in agents.
+    """
+    async def make(llm=None, vector_store=None, agents=(), **kwargs) -> AgentOrchestrator:
+        orchestrator = AgentOrchestrator(
+            "test-key",
+            llm=llm or SlowLLM(),
+            vector_store=vector_store or StaticVectorStore(),
+            llm_limiter=LLMLimiter(),
+            **kwargs
+        )
+        for name in agents:
+            await orchestrator.register_agent(TestAgent(name, {"capabilities": [name]}))
+        return orchestrator
+
+    return make
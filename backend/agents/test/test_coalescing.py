@@ -0,0 +1,60 @@
+import asyncio
+import pytest
+from .test_concurrency import SlowLLM
+
+class FailingLLM:
+    """Fake LLM whose calls fail after a short delay"""
+
+    async def ainvoke(self, messages):
+        await asyncio.sleep(0.1)
+        raise RuntimeError("LLM unavailable")
+
+def test_identical_queries_share_one_run(make_orchestrator):
+    """Concurrent queries that differ only in case, spacing and punctuation run the workflow once"""
+    async def run():
+        orchestrator = await make_orchestrator(SlowLLM(), agents=["soil_analyzer"])
+        results = await asyncio.gather(
+            orchestrator.process_query("How do I fix acidic soil?"),
+            orchestrator.process_query("how do I  fix acidic soil"),
+            orchestrator.process_query("HOW DO I FIX ACIDIC SOIL?!")
+        )
+        return orchestrator, results
+
+    orchestrator, results = asyncio.run(run())
+
+    assert orchestrator.coalescing_stats == {"requests": 3, "executions": 1, "coalesced": 2}
+    assert [result["coalesced"] for result in results] == [False, True, True]
+    assert results[1]["result"] == results[2]["result"] == results[0]["result"]
+    # Each waiter gets its own copy
+    assert results[1]["result"] is not results[0]["result"]
+
+def test_error_reaches_every_waiter(make_orchestrator):
+    async def run():
+        orchestrator = await make_orchestrator(FailingLLM(), agents=["soil_analyzer"])
+        results = await asyncio.gather(*(orchestrator.process_query("How do I fix acidic soil?") for _ in range(3)))
+        return orchestrator, results
+
+    orchestrator, results = asyncio.run(run())
+
+    assert orchestrator.coalescing_stats["executions"] == 1
+    assert [result["status"] for result in results] == ["error"] * 3
+    assert all("LLM unavailable" in result["error"] for result in results)
+    assert orchestrator._inflight == {}
+
+def test_cancelled_leader_does_not_cancel_followers(make_orchestrator):
+    async def run():
+        orchestrator = await make_orchestrator(SlowLLM(), agents=["soil_analyzer"])
+        leader = asyncio.ensure_future(orchestrator.process_query("How do I fix acidic soil?"))
+        await asyncio.sleep(0.05)
+        follower = asyncio.ensure_future(orchestrator.process_query("How do I fix acidic soil?"))
+        await asyncio.sleep(0.05)
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return orchestrator, await follower
+
+    orchestrator, result = asyncio.run(run())
+
+    assert result["status"] == "success"
+    assert result["coalesced"] is True
+    assert orchestrator.coalescing_stats == {"requests": 2, "executions": 1, "coalesced": 1}
@@ -0,0 +1,69 @@
+import asyncio
+import time
+from types import SimpleNamespace
+import numpy as np
+from ..orchestrator.agent_orchestrator import AgentOrchestrator
+from ..utils.llm_limiter import LLMLimiter
+from ..vector_store.vector_store import VectorStore
+from .test_agent import TestAgent
+
+LLM_DELAY = 0.2
+
+class SlowLLM:
+    """Stand-in for ChatOpenAI whose async calls take LLM_DELAY seconds"""
+
+    async def ainvoke(self, messages):
+        await asyncio.sleep(LLM_DELAY)
+        return SimpleNamespace(content="yes")
+
+class StaticVectorStore:
+    """Vector store returning fixed vectors so routing needs no embedding model"""
+
+    async def get_capability_vector(self, capabilities):
+        return np.array([1.0, 0.0])
+
+    async def get_query_vector(self, query):
+        return np.array([1.0, 0.0])
+
+    find_similar_vectors = VectorStore.find_similar_vectors
+
+def test_concurrent_queries_overlap():
+    """N concurrent process_query calls should take about as long as one, not N times as long"""
+    num_queries = 5
+    limiter = LLMLimiter(max_concurrency=num_queries)
+
+    async def run():
+        orchestrator = AgentOrchestrator(
+            "test-key",
+            llm=SlowLLM(),
+            vector_store=StaticVectorStore(),
+            llm_limiter=limiter
+        )
+        await orchestrator.register_agent(TestAgent("soil_analyzer", {"capabilities": ["soil analysis"]}))
+
+        start = time.perf_counter()
+        results = await asyncio.gather(*(
+            orchestrator.process_query(f"How do I fix acidic soil in field {i}?")
+            for i in range(num_queries)
+        ))
+        return results, time.perf_counter() - start
+
+    results, elapsed = asyncio.run(run())
+
+    assert all(result["status"] == "success" for result in results)
+    # Each query makes two LLM calls (satisfaction + final answer)
+    serialized = num_queries * 2 * LLM_DELAY
+    assert elapsed < serialized / 2
+    assert limiter.stats["max_in_flight"] > 1
+
+def test_limiter_caps_in_flight_calls():
+    """The shared limiter never lets more than max_concurrency calls run at once"""
+    limiter = LLMLimiter(max_concurrency=2)
+
+    async def run():
+        await asyncio.gather(*(limiter.ainvoke(SlowLLM(), []) for _ in range(6)))
+
+    asyncio.run(run())
+
+    assert limiter.stats["calls"] == 6
+    assert limiter.stats["max_in_flight"] == 2
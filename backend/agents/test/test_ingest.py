@@ -0,0 +1,74 @@
+import json
+import os
+import signal
+import pytest
+from data.ingest import CHECKPOINT_FILE, ingest
+from ..vector_store.vector_store import VectorStore
+from .test_vector_store import make_store
+
+def write_files(root, contents):
+    for name, text in contents.items():
+        with open(os.path.join(root, name), "w", encoding="utf-8") as f:
+            f.write(text)
+
+def test_interrupted_ingest_resumes_from_checkpoint(monkeypatch, tmp_path):
+    """Ctrl-C saves progress at the next batch boundary; the next run skips checkpointed files and re-embeds nothing unchanged"""
+    root, store_path = tmp_path / "files", str(tmp_path / "store")
+    root.mkdir()
+    write_files(root, {"a.txt": "wheat rust advisory", "b.txt": "rice blast advisory", "c.txt": "maize borer advisory"})
+
+    store = make_store(monkeypatch)
+    upsert = store.upsert_documents
+    calls = []
+
+    def interrupt_third_batch(documents):
+        calls.append(documents)
+        if len(calls) == 3:
+            # Arrives mid-upsert; the upsert must still run to completion
+            os.kill(os.getpid(), signal.SIGINT)
+        return upsert(documents)
+
+    monkeypatch.setattr(store, "upsert_documents", interrupt_third_batch)
+    with pytest.raises(KeyboardInterrupt):
+        ingest(str(root), store_path, batch_size=1, store=store)
+
+    with open(os.path.join(store_path, CHECKPOINT_FILE), encoding="utf-8") as f:
+        assert sorted(json.load(f)["files"]) == ["a.txt", "b.txt"]
+
+    stats = ingest(str(root), store_path, batch_size=1)
+    assert stats["skipped"] == 2
+    assert stats["files"] == 1
+    # c.txt's batch finished before the interrupt was acted on
+    assert stats["embedded"] == 0
+
+    write_files(root, {"b.txt": "rice blast and sheath blight advisory"})
+    os.remove(root / "a.txt")
+    stats = ingest(str(root), store_path, batch_size=1)
+    assert (stats["skipped"], stats["files"], stats["embedded"], stats["removed"]) == (1, 1, 1, 1)
+
+    loaded = VectorStore.load(store_path, mmap=False)
+    assert sorted(loaded.labels_by_id) == ["b.txt#0", "c.txt#0"]
+    assert loaded.keyword_search("sheath", k=1)[0]["source"] == "b.txt"
+
+def test_interrupt_inside_an_upsert_saves_nothing(monkeypatch, tmp_path):
+    """A KeyboardInterrupt raised mid-mutation may leave the store inconsistent, so it isn't saved"""
+    root, store_path = tmp_path / "files", str(tmp_path / "store")
+    root.mkdir()
+    write_files(root, {"a.txt": "wheat rust advisory", "b.txt": "rice blast advisory"})
+
+    store = make_store(monkeypatch)
+    upsert = store.upsert_documents
+    calls = []
+
+    def fail_second_batch(documents):
+        calls.append(documents)
+        if len(calls) == 2:
+            raise KeyboardInterrupt
+        return upsert(documents)
+
+    monkeypatch.setattr(store, "upsert_documents", fail_second_batch)
+    with pytest.raises(KeyboardInterrupt):
+        ingest(str(root), store_path, batch_size=1, store=store)
+
+    assert not os.path.exists(os.path.join(store_path, CHECKPOINT_FILE))
+    assert signal.getsignal(signal.SIGINT) is signal.default_int_handler
@@ -0,0 +1,33 @@
+from fastapi.testclient import TestClient
+from api.dependencies import get_orchestrator
+from api.main import app
+from ..orchestrator.agent_orchestrator import AgentOrchestrator
+from ..utils.llm_limiter import LLMLimiter
+from .test_agent import TestAgent
+from .test_concurrency import SlowLLM, StaticVectorStore
+
+def test_metrics_endpoint_reports_query_stages():
+    """A query served by the API shows up in the stage histograms at /metrics"""
+    orchestrators = []
+
+    async def test_orchestrator() -> AgentOrchestrator:
+        # Built on the app's event loop, which the limiter's semaphore binds to
+        if not orchestrators:
+            orchestrator = AgentOrchestrator("test-key", llm=SlowLLM(), vector_store=StaticVectorStore(), llm_limiter=LLMLimiter())
+            await orchestrator.register_agent(TestAgent("soil_analyzer", {"capabilities": ["soil analysis"]}))
+            orchestrators.append(orchestrator)
+        return orchestrators[0]
+
+    app.dependency_overrides[get_orchestrator] = test_orchestrator
+    try:
+        with TestClient(app) as client:
+            response = client.post("/api/ai/query", json={"text": "How do I fix acidic soil?"})
+            assert response.status_code == 200
+            assert response.json()["status"] == "success"
+            metrics = client.get("/metrics").text
+    finally:
+        app.dependency_overrides.clear()
+
+    assert 'farmx_stage_duration_seconds_count{stage="finalize"}' in metrics
+    assert 'farmx_agent_duration_seconds_count{agent="soil_analyzer"}' in metrics
+    assert "farmx_queries_total" in metrics
@@ -0,0 +1,92 @@
+import asyncio
+import time
+from types import SimpleNamespace
+import numpy as np
+from ..orchestrator.agent_orchestrator import AgentOrchestrator
+from ..orchestrator.response_cache import SemanticResponseCache
+from ..utils.llm_limiter import LLMLimiter
+from .test_agent import TestAgent
+from .test_concurrency import StaticVectorStore
+
+def unit(angle: float) -> np.ndarray:
+    """2-d unit vector; cosine similarity between two of them is cos(angle difference)"""
+    return np.array([np.cos(angle), np.sin(angle)])
+
+def test_similarity_threshold():
+    """Only queries with cosine similarity of at least similarity_threshold to a cached one hit"""
+    cache = SemanticResponseCache(StaticVectorStore(), similarity_threshold=0.9)
+
+    async def run():
+        await cache.store(unit(0.0), {"response": "lime"})
+        # cos(0.3) ~ 0.955, cos(0.6) ~ 0.825
+        return await cache.lookup(unit(0.3)), await cache.lookup(unit(0.6))
+
+    close, far = asyncio.run(run())
+
+    assert close == {"response": "lime"}
+    assert far is None
+    assert (cache.stats["hits"], cache.stats["misses"]) == (1, 1)
+
+def test_entries_expire_after_ttl():
+    cache = SemanticResponseCache(StaticVectorStore(), ttl_seconds=0.05)
+
+    async def run():
+        await cache.store(unit(0.0), {"response": "lime"})
+        fresh = await cache.lookup(unit(0.0))
+        time.sleep(0.1)
+        return fresh, await cache.lookup(unit(0.0))
+
+    fresh, stale = asyncio.run(run())
+
+    assert fresh == {"response": "lime"}
+    assert stale is None
+    assert cache.stats["expirations"] == 1
+    assert cache.get_stats()["size"] == 0
+
+def test_least_recently_used_entry_is_evicted():
+    """A lookup hit refreshes an entry, so the other one is evicted first"""
+    cache = SemanticResponseCache(StaticVectorStore(), max_entries=2)
+
+    async def run():
+        await cache.store(unit(0.0), {"response": "soil"})
+        await cache.store(unit(1.5), {"response": "weather"})
+        await cache.lookup(unit(0.0))
+        await cache.store(unit(3.0), {"response": "market"})
+        return [await cache.lookup(unit(angle)) for angle in (0.0, 1.5, 3.0)]
+
+    soil, weather, market = asyncio.run(run())
+
+    assert soil == {"response": "soil"}
+    assert weather is None
+    assert market == {"response": "market"}
+    assert cache.stats["evictions"] == 1
+
+def test_process_query_serves_repeats_from_cache():
+    """A repeated query is answered from the cache without running the workflow or the LLM"""
+    class CountingLLM:
+        calls = 0
+
+        async def ainvoke(self, messages):
+            CountingLLM.calls += 1
+            return SimpleNamespace(content="yes")
+
+    async def run():
+        orchestrator = AgentOrchestrator(
+            "test-key",
+            llm=CountingLLM(),
+            vector_store=StaticVectorStore(),
+            llm_limiter=LLMLimiter(),
+            enable_response_cache=True
+        )
+        await orchestrator.register_agent(TestAgent("soil_analyzer", {"capabilities": ["soil analysis"]}))
+        first = await orchestrator.process_query("How do I fix acidic soil?")
+        calls = CountingLLM.calls
+        second = await orchestrator.process_query("How do I fix acidic soil?")
+        return first, second, calls
+
+    first, second, calls = asyncio.run(run())
+
+    assert first["cached"] is False
+    assert second["cached"] is True
+    assert second["result"] == first["result"]
+    assert CountingLLM.calls == calls
@@ -0,0 +1,98 @@
+import asyncio
+from types import SimpleNamespace
+import numpy as np
+from ..orchestrator.agent_router import AgentRouter
+from .test_agent import TestAgent
+from .test_concurrency import StaticVectorStore
+
+class CapabilityVectorStore(StaticVectorStore):
+    """Gives agents their own capability vectors; agents named "opaque*" can't be embedded"""
+
+    def __init__(self, vectors):
+        self.vectors = vectors
+        self.fail_queries = False
+
+    async def get_capability_vector(self, capabilities):
+        if capabilities["name"].startswith("opaque"):
+            raise RuntimeError("embedding service unavailable")
+        return np.array(self.vectors[capabilities["name"]])
+
+    async def get_query_vector(self, query):
+        if self.fail_queries:
+            raise RuntimeError("embedding service unavailable")
+        return np.array([1.0, 0.0])
+
+class RoutingLLM:
+    """Fake LLM that names an agent when asked to route and says "yes" otherwise"""
+
+    def __init__(self, agent_name):
+        self.agent_name = agent_name
+        self.routing_calls = 0
+
+    async def ainvoke(self, messages):
+        if "routing queries" in messages[0].content:
+            self.routing_calls += 1
+            return SimpleNamespace(content=self.agent_name)
+        return SimpleNamespace(content="yes")
+
+def test_fan_out_survives_ranking_errors_and_runs_unranked_agents(make_orchestrator):
+    """Fan-out falls back to the registered agents when ranking fails, and never drops agents it can't rank"""
+    vector_store = CapabilityVectorStore({"soil": [1.0, 0.0], "weather": [0.8, 0.6], "market": [0.0, 1.0]})
+
+    async def run():
+        orchestrator = await make_orchestrator(
+            vector_store=vector_store,
+            agents=("soil", "weather", "market", "opaque_pests"),
+            execution_mode="fan_out",
+            fan_out_agents=2
+        )
+
+        ranked = await orchestrator.process_query("Is my soil too acidic?")
+        vector_store.fail_queries = True
+        fallback = await orchestrator.process_query("Will it rain this week?")
+        return ranked, fallback
+
+    ranked, fallback = asyncio.run(run())
+
+    assert ranked["status"] == fallback["status"] == "success"
+    assert [source["agent"] for source in ranked["result"]["sources"]] == ["soil", "weather", "opaque_pests"]
+    assert [source["agent"] for source in fallback["result"]["sources"]] == ["soil", "weather"]
+
+def test_router_fast_path_needs_a_clear_margin():
+    """The top agent is picked without the LLM only when it beats the runner-up by the margin"""
+    vector_store = CapabilityVectorStore({"soil": [1.0, 0.0], "weather": [0.0, 1.0], "climate": [0.02, 1.0]})
+
+    async def run():
+        router = AgentRouter(vector_store, margin_threshold=0.05)
+        for name in ("soil", "weather", "climate"):
+            await router.register(TestAgent(name, {"capabilities": [name]}))
+        clear = await router.route("Is my soil too acidic?")
+        # Without soil, weather and climate are nearly tied
+        ambiguous = await router.route("Is my soil too acidic?", exclude={"soil"})
+        vector_store.fail_queries = True
+        failed = await router.route("Is my soil too acidic?")
+        return router, clear, ambiguous, failed
+
+    router, clear, ambiguous, failed = asyncio.run(run())
+
+    assert clear == "soil"
+    assert ambiguous is None
+    assert failed is None
+    assert router.get_stats()["fast_path"] == 1
+    assert router.get_stats()["llm_fallback"] == 2
+
+def test_orchestrator_asks_llm_only_when_routing_is_ambiguous(make_orchestrator):
+    """A clear match skips the routing LLM call; a near-tie is decided by the LLM"""
+    async def run(vectors):
+        llm = RoutingLLM("weather")
+        orchestrator = await make_orchestrator(llm=llm, vector_store=CapabilityVectorStore(vectors), agents=vectors)
+        result = await orchestrator.process_query("Is my soil too acidic?")
+        return llm, result
+
+    llm, clear = asyncio.run(run({"soil": [1.0, 0.0], "weather": [0.0, 1.0]}))
+    assert llm.routing_calls == 0
+    assert clear["result"]["sources"][0]["agent"] == "soil"
+
+    llm, tied = asyncio.run(run({"soil": [1.0, 0.0], "weather": [1.0, 0.01]}))
+    assert llm.routing_calls == 1
+    assert tied["result"]["sources"][0]["agent"] == "weather"
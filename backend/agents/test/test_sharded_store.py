@@ -0,0 +1,56 @@
+import pickle
+import numpy as np
+import pytest
+from ..vector_store.sharded_store import ShardedVectorStore
+
+DIMENSION = 8
+
+def embed(ids) -> np.ndarray:
+    """Distinct, deterministic unit vectors per id"""
+    vectors = np.stack([np.random.default_rng(i).standard_normal(DIMENSION) for i in ids]).astype('float32')
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+@pytest.fixture
+def store():
+    store = ShardedVectorStore(model_name=None, num_shards=2, dimension=DIMENSION, embedding_cache_size=0)
+    yield store
+    store.close()
+
+def test_add_search_remove_and_reload(store, tmp_path):
+    ids = list(range(20))
+    store.add_embeddings([{"id": i, "text": f"field {i}"} for i in ids], embed(ids))
+    # Both shards got a share of the documents
+    assert len({store._shard_for({"id": i}) for i in ids}) == 2
+
+    found = store.search_embeddings(embed([3, 14]), k=3)
+    assert [results[0]["id"] for results in found] == [3, 14]
+    assert found[0][0]["text"] == "field 3"
+
+    assert store.remove_documents([3, 99]) == 1
+    assert 3 not in [doc["id"] for doc in store.search_embeddings(embed([3]), k=20)[0]]
+
+    store.save(str(tmp_path))
+    reloaded = ShardedVectorStore.load(str(tmp_path), embedding_cache_size=0)
+    try:
+        assert reloaded.search_embeddings(embed([14]), k=3) == store.search_embeddings(embed([14]), k=3)
+        assert len(reloaded.search_embeddings(embed([0]), k=20)[0]) == 19
+    finally:
+        reloaded.close()
+
+def test_failed_call_leaves_store_usable(store):
+    """A batch that can't be sent to every shard doesn't leave stale replies in the pipes"""
+    ids = list(range(10))
+    store.add_embeddings([{"id": i, "text": f"field {i}"} for i in ids], embed(ids))
+
+    # The unpicklable document goes to the second shard messaged, after the first was sent its part
+    bad_id = next(i for i in range(100, 200) if store._shard_for({"id": i}) != store._shard_for({"id": 0}))
+    with pytest.raises((pickle.PicklingError, AttributeError, TypeError)):
+        store.add_embeddings([{"id": 50}, {"id": bad_id, "callback": lambda: None}], embed([50, bad_id]))
+
+    found = store.search_embeddings(embed([4]), k=2)
+    assert found[0][0]["id"] == 4
+
+    # Errors raised inside a shard come back as a picklable description
+    with pytest.raises(RuntimeError, match="shard"):
+        store.search_embeddings(np.zeros((1, DIMENSION), dtype='float32'), k=2, filter={"id": {"$bogus": 1}})
+    assert store.search_embeddings(embed([7]), k=1)[0][0]["id"] == 7
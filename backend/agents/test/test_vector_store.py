@@ -0,0 +1,195 @@
+import asyncio
+import hashlib
+import threading
+import time
+import numpy as np
+from ..vector_store import vector_store as vector_store_module
+from ..vector_store.vector_store import VectorStore
+
+DIMENSION = 32
+
+class FakeEncoder:
+    """Stand-in for SentenceTransformer: hashes words into a bag-of-words vector.
+
+    Encoding a text containing "slow" waits for ``release`` to be set, which
+    holds an add in its embedding phase for as long as a test needs.
+    """
+
+    release = threading.Event()
+
+    def __init__(self, model_name, device=None):
+        pass
+
+    def get_sentence_embedding_dimension(self):
+        return DIMENSION
+
+    def encode(self, texts, show_progress_bar=False):
+        if any("slow" in text for text in texts):
+            assert self.release.wait(timeout=10)
+        vectors = np.zeros((len(texts), DIMENSION), dtype='float32')
+        for i, text in enumerate(texts):
+            for word in text.lower().split():
+                vectors[i, int(hashlib.md5(word.encode()).hexdigest(), 16) % DIMENSION] += 1
+        # Stand in for model compute that releases the GIL
+        time.sleep(0.001)
+        return vectors
+
+def make_store(monkeypatch, **kwargs) -> VectorStore:
+    monkeypatch.setattr(vector_store_module, "SentenceTransformer", FakeEncoder)
+    FakeEncoder.release.clear()
+    return VectorStore(**kwargs)
+
+def test_mixed_add_and_search_load(monkeypatch):
+    """Concurrent adds and searches all succeed and every added document is searchable"""
+    store = make_store(monkeypatch, max_workers=8)
+    store.add_documents([{"id": f"seed-{i}", "text": f"seed document number{i}"} for i in range(20)])
+
+    async def run():
+        adds = [
+            store.aadd_documents([{"id": f"doc-{i}-{j}", "text": f"batch{i} item{j} crop"} for j in range(10)])
+            for i in range(20)
+        ]
+        searches = [store.asearch(f"item{i % 10} crop", k=3) for i in range(60)]
+        hybrid = [store.ahybrid_search(f"batch{i} crop", k=3) for i in range(20)]
+        return await asyncio.gather(*adds, *searches, *hybrid)
+
+    results = asyncio.run(run())
+
+    assert len(store.documents) == 220
+    assert store.index.ntotal == 220
+    for found in results[20:]:
+        assert 0 < len(found) <= 3
+        assert all(doc["id"] in store.labels_by_id for doc in found)
+    assert store.keyword_search("batch7 item3", k=1)[0]["id"] == "doc-7-3"
+    # Hashed test vectors can collide, so check for an exact match rather than the id
+    assert store.search("batch7 item3 crop", k=1)[0]["score"] == 1.0
+
+def test_search_proceeds_while_add_is_embedding(monkeypatch):
+    """A search is not blocked by an add that is still encoding, nor is the event loop"""
+    store = make_store(monkeypatch)
+    store.add_documents([{"id": "wheat", "text": "wheat rust"}])
+
+    async def run():
+        add = asyncio.ensure_future(store.aadd_documents([{"id": "late", "text": "slow maize"}]))
+        await asyncio.sleep(0.05)
+        # The add is stuck in encode; the loop still runs and so does a search
+        results = await asyncio.wait_for(store.asearch("wheat rust", k=5), timeout=5)
+        assert not add.done()
+        FakeEncoder.release.set()
+        await add
+        return results
+
+    results = asyncio.run(run())
+
+    assert [doc["id"] for doc in results] == ["wheat"]
+    assert store.search("slow maize", k=1)[0]["id"] == "late"
+
+def test_add_vector_and_async_encoding(monkeypatch):
+    store = make_store(monkeypatch)
+
+    async def run():
+        vector = await store.get_query_vector("soil acidity lime")
+        await store.add_vector(vector, {"id": "lime", "text": "soil acidity lime"})
+        capability = await store.get_capability_vector({"name": "soil", "capabilities": ["soil acidity"]})
+        return vector, capability
+
+    vector, capability = asyncio.run(run())
+
+    assert vector.shape == capability.shape == (DIMENSION,)
+    assert store.search("soil acidity lime", k=1)[0]["id"] == "lime"
+
+def test_remove_and_upsert_document_without_text(monkeypatch):
+    """Documents added from bare embeddings have no text for BM25 but can still be replaced"""
+    store = make_store(monkeypatch)
+    store.add_documents([{"id": "wheat", "text": "wheat rust"}])
+    store.add_embeddings([{"id": "probe", "crop": "rice"}], np.ones((1, DIMENSION), dtype='float32'))
+
+    assert store.remove_documents(["probe"]) == 1
+    assert "probe" not in store.labels_by_id
+    store.add_embeddings([{"id": "probe", "crop": "rice"}], np.ones((1, DIMENSION), dtype='float32'))
+    assert store.upsert_documents([{"id": "probe", "text": "rice blast"}]) == {"added": 0, "updated": 1, "unchanged": 0}
+
+    assert len(store.documents) == 2
+    assert store.index.ntotal == 2
+    assert store.keyword_search("blast", k=5)[0]["id"] == "probe"
+
+def test_hnsw_tombstones_upsert_remove_and_round_trip(monkeypatch, tmp_path):
+    """Deleted HNSW entries are never returned and survive save/load until compaction"""
+    store = make_store(monkeypatch, index_type="hnsw", compaction_threshold=0.5)
+    store.add_documents([{"id": f"doc-{i}", "text": f"field{i} wheat", "plot": i} for i in range(20)])
+
+    assert store.remove_documents(["doc-3", "doc-4"]) == 2
+    assert store.upsert_documents([{"id": "doc-5", "text": "field5 rice", "plot": 5}])["updated"] == 1
+    assert len(store.tombstones) == 3
+    found = [doc["id"] for doc in store.search("wheat", k=20)]
+    assert len(found) == 18
+    assert not {"doc-3", "doc-4"} & set(found)
+
+    store.save(str(tmp_path))
+    for loaded in (VectorStore.load(str(tmp_path), mmap=False), VectorStore.load(str(tmp_path))):
+        assert loaded.tombstones == store.tombstones
+        assert [doc["id"] for doc in loaded.search("wheat", k=20)] == found
+        assert loaded.keyword_search("field5", k=1)[0]["text"] == "field5 rice"
+
+def test_compaction_drops_deleted_documents(monkeypatch, tmp_path):
+    """Past the threshold, deleted rows leave the index, metadata and keyword index"""
+    store = make_store(monkeypatch, index_type="hnsw", compaction_threshold=0.25)
+    store.add_documents([{"id": f"doc-{i}", "text": f"field{i} wheat", "plot": i} for i in range(20)])
+
+    store.remove_documents([f"doc-{i}" for i in range(6)])
+    assert store.generation == 1
+    assert store.tombstones == set()
+    assert store.index.ntotal == store.documents.num_rows == len(store.documents) == 14
+    assert sorted(store.labels_by_id.values()) == list(range(14))
+    assert store.documents.get(store.labels_by_id["doc-10"]) == {"id": "doc-10", "text": "field10 wheat", "plot": 10}
+    assert store.keyword_search("field10", k=1)[0]["id"] == "doc-10"
+    assert store.keyword_search("field2", k=5) == []
+    assert sorted(doc["plot"] for doc in store.search("wheat", k=20, filter={"plot": {"$lt": 8}})) == [6, 7]
+
+    assert store.upsert_documents([{"id": "doc-2", "text": "field2 maize"}, {"id": "doc-7", "text": "field7 maize"}]) == \
+        {"added": 1, "updated": 1, "unchanged": 0}
+    store.save(str(tmp_path))
+    loaded = VectorStore.load(str(tmp_path), mmap=False)
+    assert len(loaded.documents) == 15
+    assert {doc["id"] for doc in loaded.keyword_search("maize", k=5)} == {"doc-2", "doc-7"}
+    assert loaded.search("field7 maize", k=1)[0]["id"] == "doc-7"
+
+def test_results_are_snapshots(monkeypatch):
+    """Results are decoded under the lock, so later writes don't change documents already returned"""
+    store = make_store(monkeypatch)
+    store.add_documents([{"id": f"doc-{i}", "text": f"field{i} wheat", "plot": i} for i in range(4)])
+
+    results = store.search("field1 wheat", k=4)
+    hybrid = store.hybrid_search("field1 wheat", k=4)
+    # A float and then a string force the plot column to be re-encoded in place
+    store.upsert_documents([{"id": "doc-1", "text": "field1 wheat", "plot": 1.5}, {"id": "doc-2", "text": "field2 wheat", "plot": "north"}])
+
+    assert all(type(doc) is dict for doc in results + hybrid)
+    assert sorted(doc["plot"] for doc in results) == sorted(doc["plot"] for doc in hybrid) == [0, 1, 2, 3]
+    assert {doc["id"]: doc["plot"] for doc in store.search("wheat", k=4)}["doc-2"] == "north"
+
+def test_mixed_numeric_metadata_round_trips(monkeypatch, tmp_path):
+    """Ints stay ints next to floats, large ints keep every digit, and 1 -> True is a real update"""
+    store = make_store(monkeypatch)
+    store.add_documents([
+        {"id": "a", "text": "wheat", "year": 2023, "yield": 3, "flag": 1},
+        {"id": "b", "text": "rice", "year": 2 ** 62 + 1, "yield": 4.5, "flag": 1}
+    ])
+    store.upsert_documents([{"id": "a", "text": "wheat", "year": 2023, "yield": 3, "flag": True}])
+
+    store.save(str(tmp_path))
+    for current in (store, VectorStore.load(str(tmp_path), mmap=False)):
+        docs = {doc["id"]: doc for doc in current.keyword_search("wheat rice", k=2)}
+        assert [(type(docs["a"][key]), docs["a"][key]) for key in ("year", "yield", "flag")] == [(int, 2023), (int, 3), (bool, True)]
+        assert [(type(docs["b"][key]), docs["b"][key]) for key in ("year", "yield", "flag")] == [(int, 2 ** 62 + 1), (float, 4.5), (int, 1)]
+        assert [doc["id"] for doc in current.keyword_search("wheat rice", k=2, filter={"yield": {"$gt": 3.5}})] == ["b"]
+
+def test_add_below_the_ivf_training_minimum_stays_staged(monkeypatch):
+    """An add that can't train the index yet succeeds once, instead of raising after storing the documents"""
+    store = make_store(monkeypatch, index_type="ivf_flat", nlist=40, train_threshold=10)
+    store.add_documents([{"id": f"doc-{i}", "text": f"field{i} wheat"} for i in range(20)])
+    assert (len(store.documents), store.staging) == (20, True)
+
+    store.add_documents([{"id": f"doc-{i}", "text": f"field{i} rice"} for i in range(20, 60)])
+    assert (len(store.documents), store.index.ntotal, store.staging) == (60, 60, False)
+    assert store.search("field33 rice", k=1)[0]["id"] == "doc-33"
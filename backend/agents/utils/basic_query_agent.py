@@ -1,5 +1,6 @@
 from typing import Dict, List, Any, Optional
 from agents.utils.base_agent import BaseAgent
+from agents.utils.llm_limiter import get_llm_limiter
 from langchain_openai import ChatOpenAI
 from langchain_core.prompts import ChatPromptTemplate
 
@@ -13,6 +14,7 @@ class BasicQueryAgent(BaseAgent):
             temperature=0,
             openai_api_key=openai_api_key
         )
+        self.llm_limiter = get_llm_limiter()
         
     async def initialize(self) -> None:
         """Initialize the agent."""
@@ -41,7 +43,7 @@ class BasicQueryAgent(BaseAgent):
                 ("human", "{query}")
             ])
             
-            response = self.llm.invoke(answer_prompt.format_messages(query=query))
+            response = await self.llm_limiter.ainvoke(self.llm, answer_prompt.format_messages(query=query), stage=f"agent.{self.name}")
             
             return {
                 "status": "success",
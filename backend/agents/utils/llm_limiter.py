@@ -0,0 +1,105 @@
+from typing import Any, AsyncIterator, Dict, List, Optional
+import asyncio
+import logging
+import os
+import time
+from agents.utils.metrics import record_llm_call
+
+class LLMLimiter:
+    """Caps the number of outbound LLM calls in flight across all agents.
+
+    Calls go through ``ainvoke`` so they never block the event loop and never
+    exceed ``max_concurrency`` concurrent requests to the provider.
+    """
+
+    def __init__(self, max_concurrency: int = 8):
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency must be at least 1")
+        self.max_concurrency = max_concurrency
+        self.logger = logging.getLogger("llm_limiter")
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.stats = {
+            "calls": 0,
+            "errors": 0,
+            "in_flight": 0,
+            "max_in_flight": 0,
+            "total_latency": 0.0
+        }
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        """Return a semaphore bound to the running event loop"""
+        loop = asyncio.get_running_loop()
+        if self._semaphore is None or self._loop is not loop:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._loop = loop
+        return self._semaphore
+
+    async def ainvoke(self, llm: Any, messages: List[Any], stage: str = "other") -> Any:
+        """Invoke the LLM asynchronously once a concurrency slot is free"""
+        async with self._get_semaphore():
+            self.stats["in_flight"] += 1
+            self.stats["max_in_flight"] = max(self.stats["max_in_flight"], self.stats["in_flight"])
+            start = time.perf_counter()
+            response = None
+            failed = False
+            try:
+                response = await llm.ainvoke(messages)
+                return response
+            except Exception:
+                failed = True
+                self.stats["errors"] += 1
+                raise
+            finally:
+                duration = time.perf_counter() - start
+                self.stats["in_flight"] -= 1
+                self.stats["calls"] += 1
+                self.stats["total_latency"] += duration
+                record_llm_call(stage, duration, getattr(response, "usage_metadata", None), error=failed)
+
+    async def astream(self, llm: Any, messages: List[Any], stage: str = "other") -> AsyncIterator[Any]:
+        """Stream LLM chunks, holding a concurrency slot until the stream ends"""
+        async with self._get_semaphore():
+            self.stats["in_flight"] += 1
+            self.stats["max_in_flight"] = max(self.stats["max_in_flight"], self.stats["in_flight"])
+            start = time.perf_counter()
+            usage = {"input_tokens": 0, "output_tokens": 0}
+            failed = False
+            try:
+                async for chunk in llm.astream(messages):
+                    chunk_usage = getattr(chunk, "usage_metadata", None) or {}
+                    for key in usage:
+                        usage[key] += chunk_usage.get(key, 0) or 0
+                    yield chunk
+            except Exception:
+                failed = True
+                self.stats["errors"] += 1
+                raise
+            finally:
+                duration = time.perf_counter() - start
+                self.stats["in_flight"] -= 1
+                self.stats["calls"] += 1
+                self.stats["total_latency"] += duration
+                record_llm_call(stage, duration, usage, error=failed)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return call counters and the average call latency"""
+        calls = self.stats["calls"]
+        return {
+            **self.stats,
+            "avg_latency": self.stats["total_latency"] / calls if calls else 0.0
+        }
+
+# Global limiter shared by the orchestrator and every agent
+_llm_limiter: Optional[LLMLimiter] = None
+
+def get_llm_limiter() -> LLMLimiter:
+    """
+    Get or create the shared LLM limiter, sized by LLM_MAX_CONCURRENCY
+    """
+    global _llm_limiter
+
+    if _llm_limiter is None:
+        _llm_limiter = LLMLimiter(int(os.getenv("LLM_MAX_CONCURRENCY", "8")))
+
+    return _llm_limiter
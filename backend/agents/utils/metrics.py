@@ -0,0 +1,193 @@
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from contextlib import contextmanager
+from contextvars import ContextVar
+import threading
+import time
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+def _label_key(labels: Dict[str, Any]) -> LabelKey:
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+def _format_labels(key: LabelKey, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(key) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    escaped = (value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n") for _, value in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+class Counter:
+    """Monotonic counter with optional labels"""
+
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help_text = help_text
+        self._values: Dict[LabelKey, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(key)} {value}")
+        return lines
+
+class Histogram:
+    """Cumulative-bucket histogram with optional labels"""
+
+    def __init__(self, name: str, help_text: str, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = tuple(sorted(buckets))
+        # label key -> (per-bucket counts, sum, count)
+        self._values: Dict[LabelKey, List[Any]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            entry = self._values.setdefault(key, [[0] * len(self.buckets), 0.0, 0])
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry[0][i] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, (bucket_counts, total, count) in sorted(self._values.items()):
+                for bound, bucket_count in zip(self.buckets, bucket_counts):
+                    lines.append(f"{self.name}_bucket{_format_labels(key, ('le', str(bound)))} {bucket_count}")
+                lines.append(f"{self.name}_bucket{_format_labels(key, ('le', '+Inf'))} {count}")
+                lines.append(f"{self.name}_sum{_format_labels(key)} {total}")
+                lines.append(f"{self.name}_count{_format_labels(key)} {count}")
+        return lines
+
+class MetricsRegistry:
+    """Holds counters and histograms and renders them in the Prometheus text format"""
+
+    def __init__(self):
+        self._metrics: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def counter(self, name: str, help_text: str) -> Counter:
+        with self._lock:
+            if name not in self._metrics:
+                self._metrics[name] = Counter(name, help_text)
+            return self._metrics[name]
+
+    def histogram(self, name: str, help_text: str, buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        with self._lock:
+            if name not in self._metrics:
+                self._metrics[name] = Histogram(name, help_text, buckets)
+            return self._metrics[name]
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+# Global registry exposed on /metrics
+_metrics_registry: Optional[MetricsRegistry] = None
+
+def get_metrics_registry() -> MetricsRegistry:
+    """
+    Get or create the process-wide metrics registry
+    """
+    global _metrics_registry
+
+    if _metrics_registry is None:
+        _metrics_registry = MetricsRegistry()
+
+    return _metrics_registry
+
+class QueryTrace:
+    """Per-query timing and LLM usage breakdown"""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.stages: Dict[str, float] = {}
+        self.agents: Dict[str, float] = {}
+        self.llm_calls: Dict[str, int] = {}
+        self.input_tokens = 0
+        self.output_tokens = 0
+
+    def add_stage(self, stage: str, duration: float) -> None:
+        self.stages[stage] = self.stages.get(stage, 0.0) + duration
+
+    def add_llm_call(self, stage: str, input_tokens: int, output_tokens: int) -> None:
+        self.llm_calls[stage] = self.llm_calls.get(stage, 0) + 1
+        self.input_tokens += input_tokens
+        self.output_tokens += output_tokens
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "total": time.perf_counter() - self.start,
+            "stages": dict(self.stages),
+            "agents": dict(self.agents),
+            "llm_calls": dict(self.llm_calls),
+            "input_tokens": self.input_tokens,
+            "output_tokens": self.output_tokens
+        }
+
+# Trace of the query being processed; workflow tasks inherit it from process_query
+_current_trace: ContextVar[Optional[QueryTrace]] = ContextVar("current_trace", default=None)
+
+def start_trace() -> QueryTrace:
+    """Start a new trace for the current query"""
+    trace = QueryTrace()
+    _current_trace.set(trace)
+    return trace
+
+def get_current_trace() -> Optional[QueryTrace]:
+    """Return the trace of the query being processed, if any"""
+    return _current_trace.get()
+
+@contextmanager
+def track_stage(stage: str, agent: Optional[str] = None) -> Iterator[None]:
+    """Time a workflow stage into the stage histogram and the current query's trace"""
+    registry = get_metrics_registry()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        duration = time.perf_counter() - start
+        trace = get_current_trace()
+        if agent is not None:
+            registry.histogram("farmx_agent_duration_seconds", "Time spent in each agent's process()").observe(duration, agent=agent)
+            if trace is not None:
+                trace.agents[agent] = trace.agents.get(agent, 0.0) + duration
+        else:
+            registry.histogram("farmx_stage_duration_seconds", "Time spent in each orchestrator stage").observe(duration, stage=stage)
+            if trace is not None:
+                trace.add_stage(stage, duration)
+
+def record_llm_call(stage: str, duration: float, usage: Optional[Dict[str, Any]] = None, error: bool = False) -> None:
+    """Record an LLM call's latency and token usage (LangChain usage_metadata)"""
+    registry = get_metrics_registry()
+    registry.counter("farmx_llm_calls_total", "LLM calls by stage").inc(stage=stage, status="error" if error else "success")
+    registry.histogram("farmx_llm_call_duration_seconds", "LLM call latency by stage").observe(duration, stage=stage)
+
+    usage = usage or {}
+    input_tokens = int(usage.get("input_tokens", 0) or 0)
+    output_tokens = int(usage.get("output_tokens", 0) or 0)
+    tokens = registry.counter("farmx_llm_tokens_total", "LLM tokens by stage and direction")
+    if input_tokens:
+        tokens.inc(input_tokens, stage=stage, type="input")
+    if output_tokens:
+        tokens.inc(output_tokens, stage=stage, type="output")
+
+    trace = get_current_trace()
+    if trace is not None:
+        trace.add_llm_call(stage, input_tokens, output_tokens)
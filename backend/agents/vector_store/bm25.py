@@ -0,0 +1,172 @@
+from typing import Dict, List, Optional, Tuple
+import json
+import math
+import os
+import re
+import numpy as np
+from agents.vector_store.metadata_store import GrowableArray
+
+# Words, numbers and hyphenated codes such as cultivar names ("HD-2967") or "2,4-D"
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:[-.,/][a-z0-9]+)*")
+VOCABULARY_FILE = "bm25_vocabulary.json"
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase terms; compound codes are indexed whole and by their parts"""
+    if not isinstance(text, str):
+        # Documents added without text (e.g. via add_embeddings) have no terms
+        return []
+    tokens = []
+    for match in TOKEN_PATTERN.finditer(text.lower()):
+        token = match.group()
+        tokens.append(token)
+        if not token.isalnum():
+            tokens.extend(part for part in re.split(r"[-.,/]", token) if part)
+    return tokens
+
+class BM25Index:
+    """
+    Inverted index with Okapi BM25 scoring, updated incrementally.
+
+    Postings are label-sorted arrays of (label, term frequency) per term; labels are
+    the VectorStore's stable document labels, which only grow between compactions.
+    Removing a document zeroes its length and decrements document frequencies, and
+    its postings are skipped at query time until compact() drops them.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.postings: Dict[str, Tuple[GrowableArray, GrowableArray]] = {}
+        self.doc_freq: Dict[str, int] = {}
+        self.doc_lengths = GrowableArray(np.int32)
+        self.num_docs = 0
+        self.total_length = 0
+
+    def add(self, labels: List[int], texts: List[str]) -> None:
+        """Index documents under their labels"""
+        for label, text in zip(labels, texts):
+            self.doc_lengths.resize(label + 1)
+            counts: Dict[str, int] = {}
+            tokens = tokenize(text)
+            for token in tokens:
+                counts[token] = counts.get(token, 0) + 1
+            for term, count in counts.items():
+                entry = self.postings.get(term)
+                if entry is None:
+                    entry = self.postings[term] = (GrowableArray(np.int32), GrowableArray(np.int32))
+                entry[0].append(label)
+                entry[1].append(count)
+                self.doc_freq[term] = self.doc_freq.get(term, 0) + 1
+            self.doc_lengths.data[label] = len(tokens)
+            self.num_docs += 1
+            self.total_length += len(tokens)
+
+    def remove(self, label: int, text: str) -> None:
+        """Forget a document; text must be what it was indexed with"""
+        if label >= self.doc_lengths.size:
+            return
+        for term in set(tokenize(text)):
+            if term in self.doc_freq:
+                self.doc_freq[term] -= 1
+        self.total_length -= int(self.doc_lengths.data[label])
+        self.doc_lengths.data[label] = 0
+        self.num_docs -= 1
+
+    def compact(self, new_labels: np.ndarray) -> None:
+        """
+        Drop the postings of removed documents and renumber the rest; new_labels maps
+        each old label to its new one, or -1 for removed documents, preserving order.
+        """
+        for term, (labels, tfs) in list(self.postings.items()):
+            renumbered = new_labels[labels.view()]
+            keep = renumbered >= 0
+            if not keep.any():
+                del self.postings[term]
+                self.doc_freq.pop(term, None)
+                continue
+            self.postings[term] = (GrowableArray(np.int32, data=renumbered[keep].astype(np.int32)), GrowableArray(np.int32, data=tfs.view()[keep]))
+        doc_lengths = self.doc_lengths.view()
+        self.doc_lengths = GrowableArray(np.int32, data=doc_lengths[new_labels[:len(doc_lengths)] >= 0])
+
+    def search(self, query: str, k: int, mask: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Return (scores, labels) of the k best documents, best first. mask, indexed
+        by label, restricts the documents that can match.
+        """
+        if self.num_docs == 0:
+            return np.zeros(0, dtype='float32'), np.zeros(0, dtype='int64')
+
+        doc_lengths = self.doc_lengths.view()
+        average_length = self.total_length / self.num_docs
+        all_labels = []
+        all_scores = []
+        for term in set(tokenize(query)):
+            entry = self.postings.get(term)
+            if entry is None or self.doc_freq.get(term, 0) <= 0:
+                continue
+            labels = entry[0].view()
+            tfs = entry[1].view().astype('float32')
+            lengths = doc_lengths[labels]
+            # Removed documents have length 0
+            keep = lengths > 0
+            if mask is not None:
+                keep &= mask[labels]
+            labels, tfs, lengths = labels[keep], tfs[keep], lengths[keep]
+
+            df = self.doc_freq[term]
+            idf = math.log(1 + (self.num_docs - df + 0.5) / (df + 0.5))
+            all_labels.append(labels)
+            all_scores.append(idf * tfs * (self.k1 + 1) / (tfs + self.k1 * (1 - self.b + self.b * lengths / average_length)))
+
+        if not all_labels:
+            return np.zeros(0, dtype='float32'), np.zeros(0, dtype='int64')
+
+        # Sum the per-term contributions of each document
+        unique_labels, inverse = np.unique(np.concatenate(all_labels), return_inverse=True)
+        scores = np.bincount(inverse, weights=np.concatenate(all_scores)).astype('float32')
+        if len(scores) > k:
+            top = np.argpartition(-scores, k)[:k]
+        else:
+            top = np.arange(len(scores))
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return scores[top], unique_labels[top]
+
+    def save(self, path: str) -> None:
+        """Write postings as concatenated arrays with per-term offsets"""
+        terms = list(self.postings)
+        offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([self.postings[term][0].size for term in terms])
+        labels = np.concatenate([self.postings[term][0].view() for term in terms]) if terms else np.zeros(0, dtype=np.int32)
+        tfs = np.concatenate([self.postings[term][1].view() for term in terms]) if terms else np.zeros(0, dtype=np.int32)
+        np.save(os.path.join(path, "bm25_offsets.npy"), offsets)
+        np.save(os.path.join(path, "bm25_labels.npy"), labels)
+        np.save(os.path.join(path, "bm25_tfs.npy"), tfs)
+        np.save(os.path.join(path, "bm25_doc_lengths.npy"), self.doc_lengths.view())
+        with open(os.path.join(path, VOCABULARY_FILE), "w", encoding="utf-8") as f:
+            json.dump({
+                "k1": self.k1,
+                "b": self.b,
+                "terms": terms,
+                "doc_freq": [self.doc_freq[term] for term in terms],
+                "num_docs": self.num_docs,
+                "total_length": self.total_length
+            }, f, ensure_ascii=False)
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True) -> "BM25Index":
+        """Load an index written by save(); with mmap=True postings are memory-mapped"""
+        with open(os.path.join(path, VOCABULARY_FILE), encoding="utf-8") as f:
+            vocabulary = json.load(f)
+        mmap_mode = "r" if mmap else None
+        index = cls(vocabulary["k1"], vocabulary["b"])
+        offsets = np.load(os.path.join(path, "bm25_offsets.npy"))
+        labels = np.load(os.path.join(path, "bm25_labels.npy"), mmap_mode=mmap_mode)
+        tfs = np.load(os.path.join(path, "bm25_tfs.npy"), mmap_mode=mmap_mode)
+        for i, term in enumerate(vocabulary["terms"]):
+            start, end = offsets[i], offsets[i + 1]
+            index.postings[term] = (GrowableArray(np.int32, data=labels[start:end]), GrowableArray(np.int32, data=tfs[start:end]))
+        index.doc_freq = dict(zip(vocabulary["terms"], vocabulary["doc_freq"]))
+        index.doc_lengths = GrowableArray(np.int32, data=np.load(os.path.join(path, "bm25_doc_lengths.npy"), mmap_mode=mmap_mode))
+        index.num_docs = vocabulary["num_docs"]
+        index.total_length = vocabulary["total_length"]
+        return index
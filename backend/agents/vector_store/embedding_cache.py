@@ -0,0 +1,144 @@
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import numpy as np
+
+class EmbeddingCache:
+    """
+    Two-tier cache of text embeddings keyed by a hash of the model name and text.
+
+    The memory tier is an LRU of at most ``max_entries`` vectors. When ``cache_dir``
+    is set, embeddings are also written to a SQLite file there so they survive
+    restarts and can be shared between processes using the same model.
+    """
+
+    def __init__(self, model_name: str, max_entries: int = 10000, cache_dir: Optional[str] = None):
+        self.logger = logging.getLogger("embedding_cache")
+        self.model_name = model_name
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        self.stats = {
+            "hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "evictions": 0
+        }
+
+        if cache_dir:
+            try:
+                os.makedirs(cache_dir, exist_ok=True)
+                self._db = sqlite3.connect(os.path.join(cache_dir, "embeddings.sqlite"), check_same_thread=False)
+                self._db.execute("CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL)")
+                self._db.commit()
+            except Exception as e:
+                self.logger.error(f"Error opening embedding cache in {cache_dir}: {str(e)}")
+                raise
+
+    def key(self, text: str) -> str:
+        """Cache key for a text under this cache's model"""
+        return hashlib.sha256(f"{self.model_name}\0{text}".encode("utf-8")).hexdigest()
+
+    def _remember(self, key: str, vector: np.ndarray) -> None:
+        """Insert into the memory tier, evicting the least recently used entries"""
+        self._entries[key] = vector
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    def _lookup(self, keys: List[str]) -> Dict[str, np.ndarray]:
+        """Return cached vectors for the given keys from either tier"""
+        found = {}
+        with self._lock:
+            for key in keys:
+                if key in self._entries:
+                    self._entries.move_to_end(key)
+                    found[key] = self._entries[key]
+
+            missing = [key for key in keys if key not in found]
+            if self._db is not None and missing:
+                # SQLite limits the number of bound parameters per statement
+                for start in range(0, len(missing), 500):
+                    batch = missing[start:start + 500]
+                    rows = self._db.execute(
+                        f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(batch))})", batch
+                    ).fetchall()
+                    for key, blob in rows:
+                        vector = np.frombuffer(blob, dtype='float32')
+                        found[key] = vector
+                        self._remember(key, vector)
+                        self.stats["disk_hits"] += 1
+        return found
+
+    def _store(self, items: Dict[str, np.ndarray]) -> None:
+        with self._lock:
+            for key, vector in items.items():
+                self._remember(key, vector)
+            if self._db is not None and items:
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)",
+                    [(key, vector.tobytes()) for key, vector in items.items()]
+                )
+                self._db.commit()
+
+    def encode(self, texts: List[str], encoder: Callable[[List[str]], Any]) -> np.ndarray:
+        """
+        Return float32 embeddings for texts, in order. Only texts missing from both
+        tiers are passed to ``encoder``, deduplicated, in a single batch.
+        """
+        keys = [self.key(text) for text in texts]
+        found = self._lookup(list(dict.fromkeys(keys)))
+
+        misses: Dict[str, str] = {}
+        for key, text in zip(keys, texts):
+            if key not in found and key not in misses:
+                misses[key] = text
+
+        with self._lock:
+            # Repeats of a text within the batch are served by its single encode
+            self.stats["hits"] += len(keys) - len(misses)
+            self.stats["misses"] += len(misses)
+
+        if misses:
+            encoded = np.asarray(encoder(list(misses.values())), dtype='float32')
+            # Copies, so cached rows don't keep the whole batch array alive
+            new_entries = {key: vector.copy() for key, vector in zip(misses.keys(), encoded)}
+            self._store(new_entries)
+            found.update(new_entries)
+
+        if not keys:
+            return np.empty((0, 0), dtype='float32')
+        return np.stack([found[key] for key in keys])
+
+    def clear(self) -> None:
+        """Drop all cached embeddings from both tiers"""
+        with self._lock:
+            self._entries.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM embeddings")
+                self._db.commit()
+
+    def close(self) -> None:
+        """Close the on-disk tier"""
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and the hit rate"""
+        with self._lock:
+            lookups = self.stats["hits"] + self.stats["misses"]
+            return {
+                **self.stats,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "disk": self._db is not None,
+                "hit_rate": self.stats["hits"] / lookups if lookups else 0.0
+            }
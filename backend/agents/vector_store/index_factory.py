@@ -0,0 +1,86 @@
+from typing import Optional
+import math
+import faiss
+
+# Index types selectable on VectorStore
+INDEX_TYPES = ("flat", "ivf_flat", "ivf_pq", "hnsw")
+
+# Storage precisions for the vectors held by flat, HNSW and IVF-Flat indexes
+PRECISIONS = ("float32", "float16", "int8", "pq")
+
+_SQ_TYPES = {"float16": "QT_fp16", "int8": "QT_8bit"}
+
+def needs_training(index_type: str, precision: str = "float32") -> bool:
+    """Whether the index type must be trained on sample vectors before use"""
+    return index_type in ("ivf_flat", "ivf_pq") or precision in ("int8", "pq")
+
+def bytes_per_vector(dimension: int, precision: str = "float32", pq_m: int = 48) -> int:
+    """Storage size of one encoded vector"""
+    return {"float32": 4 * dimension, "float16": 2 * dimension, "int8": dimension, "pq": pq_m}[precision]
+
+def default_nlist(num_vectors: int) -> int:
+    """Pick an IVF list count for a corpus size (~4*sqrt(n), with >= 39 points per list)"""
+    return max(1, min(int(4 * math.sqrt(num_vectors)), num_vectors // 39))
+
+def build_index(
+    index_type: str,
+    dimension: int,
+    num_vectors: int = 0,
+    nlist: Optional[int] = None,
+    pq_m: int = 48,
+    hnsw_m: int = 32,
+    precision: str = "float32"
+) -> faiss.Index:
+    """
+    Create an empty L2 index of the given type storing vectors at the given
+    precision. Indexes for which needs_training() is true are returned untrained;
+    IVF indexes must be trained on at least ``nlist`` vectors.
+    """
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"Unknown index type: {index_type}. Expected one of {', '.join(INDEX_TYPES)}")
+    if precision not in PRECISIONS:
+        raise ValueError(f"Unknown precision: {precision}. Expected one of {', '.join(PRECISIONS)}")
+    if index_type == "ivf_pq" and precision != "float32":
+        raise ValueError("ivf_pq already stores PQ codes; use ivf_flat with a reduced precision instead")
+    if (index_type == "ivf_pq" or precision == "pq") and dimension % pq_m != 0:
+        raise ValueError(f"pq_m ({pq_m}) must divide the embedding dimension ({dimension})")
+
+    sq_type = getattr(faiss.ScalarQuantizer, _SQ_TYPES[precision]) if precision in _SQ_TYPES else None
+
+    if index_type == "flat":
+        if sq_type is not None:
+            return faiss.IndexScalarQuantizer(dimension, sq_type, faiss.METRIC_L2)
+        if precision == "pq":
+            return faiss.IndexPQ(dimension, pq_m, 8)
+        return faiss.IndexFlatL2(dimension)
+
+    if index_type == "hnsw":
+        if sq_type is not None:
+            return faiss.IndexHNSWSQ(dimension, sq_type, hnsw_m)
+        if precision == "pq":
+            return faiss.IndexHNSWPQ(dimension, pq_m, hnsw_m)
+        return faiss.IndexHNSWFlat(dimension, hnsw_m)
+
+    nlist = nlist or default_nlist(num_vectors)
+    quantizer = faiss.IndexFlatL2(dimension)
+    if index_type == "ivf_pq" or precision == "pq":
+        return faiss.IndexIVFPQ(quantizer, dimension, nlist, pq_m, 8)
+    if sq_type is not None:
+        return faiss.IndexIVFScalarQuantizer(quantizer, dimension, nlist, sq_type, faiss.METRIC_L2)
+    return faiss.IndexIVFFlat(quantizer, dimension, nlist, faiss.METRIC_L2)
+
+def set_search_params(index: faiss.Index, nprobe: Optional[int] = None, ef_search: Optional[int] = None) -> None:
+    """Apply nprobe (IVF) and efSearch (HNSW) to an index, ignoring ones that don't apply"""
+    if nprobe is not None:
+        try:
+            faiss.extract_index_ivf(index).nprobe = nprobe
+        except RuntimeError:
+            pass
+
+    if ef_search is not None:
+        base = faiss.downcast_index(index)
+        if hasattr(base, "index"):
+            # Unwrap ID maps and refinement wrappers
+            base = faiss.downcast_index(base.index)
+        if hasattr(base, "hnsw"):
+            base.hnsw.efSearch = ef_search
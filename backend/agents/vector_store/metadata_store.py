@@ -0,0 +1,467 @@
+from collections.abc import Mapping
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+import json
+import os
+import numpy as np
+
+# Files written by MetadataStore.save inside its directory
+COLUMNS_FILE = "columns.json"
+MISSING = object()
+
+class GrowableArray:
+    """Numpy array with amortized appends; ``data`` may be a read-only memmap after load"""
+
+    def __init__(self, dtype: Any, shape: Tuple[int, ...] = (), data: Optional[np.ndarray] = None):
+        self.dtype = np.dtype(dtype)
+        self.shape = shape
+        self.data = data if data is not None else np.zeros((16,) + shape, dtype=self.dtype)
+        self.size = len(data) if data is not None else 0
+
+    def reserve(self, size: int) -> None:
+        if size > len(self.data):
+            capacity = max(size, 2 * len(self.data), 16)
+            grown = np.zeros((capacity,) + self.shape, dtype=self.dtype)
+            grown[:self.size] = self.data[:self.size]
+            self.data = grown
+
+    def resize(self, size: int) -> None:
+        """Grow to size elements, zero-filling new ones"""
+        self.reserve(size)
+        self.size = max(self.size, size)
+
+    def append(self, value: Any) -> None:
+        self.reserve(self.size + 1)
+        self.data[self.size] = value
+        self.size += 1
+
+    def extend(self, values: np.ndarray) -> None:
+        """Append a batch of elements"""
+        self.reserve(self.size + len(values))
+        self.data[self.size:self.size + len(values)] = values
+        self.size += len(values)
+
+    def extend_bytes(self, value: bytes) -> int:
+        """Append raw bytes to a uint8 array, returning their start offset"""
+        start = self.size
+        self.reserve(start + len(value))
+        self.data[start:start + len(value)] = np.frombuffer(value, dtype=np.uint8)
+        self.size += len(value)
+        return start
+
+    def view(self) -> np.ndarray:
+        return self.data[:self.size]
+
+def _value_kind(value: Any) -> str:
+    """Column kind a Python value is stored in"""
+    if isinstance(value, (bool, np.bool_)):
+        return "bool"
+    if isinstance(value, (int, np.integer)) and -2 ** 63 <= value < 2 ** 63:
+        return "int"
+    if isinstance(value, (float, np.floating)):
+        return "float"
+    if isinstance(value, str):
+        return "category"
+    return "json"
+
+# Filter operators understood by MetadataStore.match
+FILTER_OPERATORS = ("$eq", "$ne", "$in", "$nin", "$gt", "$gte", "$lt", "$lte")
+_NUMPY_COMPARISONS = {"$gt": np.greater, "$gte": np.greater_equal, "$lt": np.less, "$lte": np.less_equal}
+
+def _compare(op: str, value: Any, operand: Any) -> bool:
+    """Evaluate one filter operator on a decoded value; missing fields only match $ne/$nin"""
+    if op in ("$ne", "$nin"):
+        return not _compare("$eq" if op == "$ne" else "$in", value, operand)
+    if value is MISSING:
+        return False
+    if op == "$eq":
+        return value == operand
+    if op == "$in":
+        return value in operand
+    try:
+        return bool(_NUMPY_COMPARISONS[op](value, operand))
+    except TypeError:
+        return False
+
+def _is_number(value: Any) -> bool:
+    return isinstance(value, (int, float, np.integer, np.floating)) and not isinstance(value, (bool, np.bool_))
+
+def _same_value(old: Any, new: Any) -> bool:
+    return type(old) is type(new) and old == new
+
+def _pad(array: np.ndarray, size: int) -> np.ndarray:
+    """Extend a column array that has not been written up to the last row"""
+    if len(array) >= size:
+        return array[:size]
+    padded = np.zeros(size, dtype=array.dtype)
+    padded[:len(array)] = array
+    return padded
+
+def _take_bytes(blob: np.ndarray, starts: np.ndarray, lengths: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Gather byte ranges of a blob into a new blob, returning it and the ranges' new starts"""
+    new_starts = np.zeros(len(lengths), dtype=np.int64)
+    np.cumsum(lengths[:-1], out=new_starts[1:])
+    positions = np.repeat(starts - new_starts, lengths) + np.arange(int(lengths.sum()), dtype=np.int64)
+    return blob[positions], new_starts
+
+_DTYPES = {"int": np.int64, "float": np.float64, "bool": np.bool_, "category": np.int32}
+
+class _Column:
+    """
+    One metadata field. Scalars live in typed arrays, strings are dictionary-encoded
+    while their cardinality stays below ``max_categories``, and anything else is
+    stored as JSON in a byte blob. A column that is given values of more than one
+    kind is re-encoded as JSON.
+    """
+
+    def __init__(self, kind: str, max_categories: int):
+        self.kind = kind
+        self.max_categories = max_categories
+        self.present = GrowableArray(np.bool_)
+        self.categories: List[str] = []
+        self.category_codes: Dict[str, int] = {}
+        if kind == "json":
+            self.values = GrowableArray(np.int64, (2,))  # (start, length) into blob
+            self.blob = GrowableArray(np.uint8)
+        else:
+            self.values = GrowableArray(_DTYPES[kind])
+
+    def __len__(self) -> int:
+        return self.present.size
+
+    def get(self, row: int) -> Any:
+        if row >= self.present.size or not self.present.data[row]:
+            return MISSING
+        value = self.values.data[row]
+        if self.kind == "category":
+            return self.categories[value]
+        if self.kind == "json":
+            start, length = value
+            return json.loads(self.blob.data[start:start + length].tobytes().decode("utf-8"))
+        return value.item()
+
+    def set(self, row: int, value: Any) -> None:
+        kind = _value_kind(value)
+        if kind != self.kind and self.kind != "json":
+            # Mixed kinds, even ints and floats, fall back to JSON so every value keeps its type
+            self._convert("json")
+        if self.kind == "category" and value not in self.category_codes and len(self.categories) >= self.max_categories:
+            # Too many distinct strings for dictionary encoding to pay off
+            self._convert("json")
+
+        self.present.resize(row + 1)
+        self.values.resize(row + 1)
+        self.present.data[row] = True
+        if self.kind == "category":
+            code = self.category_codes.get(value)
+            if code is None:
+                code = self.category_codes[value] = len(self.categories)
+                self.categories.append(value)
+            self.values.data[row] = code
+        elif self.kind == "json":
+            if isinstance(value, np.generic):
+                value = value.item()
+            encoded = json.dumps(value, ensure_ascii=False, default=str).encode("utf-8")
+            self.values.data[row] = (self.blob.extend_bytes(encoded), len(encoded))
+        else:
+            self.values.data[row] = value
+
+    def match(self, op: str, operand: Any, num_rows: int) -> np.ndarray:
+        """Boolean mask of the rows matching one filter operator"""
+        if op in ("$ne", "$nin"):
+            return ~self.match("$eq" if op == "$ne" else "$in", operand, num_rows)
+            
+        present = _pad(self.present.view(), num_rows)
+        operands = list(operand) if op == "$in" else [operand]
+        if self.kind == "category" and op in ("$eq", "$in"):
+            # Look codes up in a per-category table rather than comparing strings
+            table = np.zeros(len(self.categories) + 1, dtype=bool)
+            table[[self.category_codes[value] for value in operands if isinstance(value, str) and value in self.category_codes]] = True
+            return present & table[_pad(self.values.view(), num_rows)]
+        if self.kind in ("int", "float") and all(_is_number(value) for value in operands):
+            values = _pad(self.values.view(), num_rows)
+            if op in ("$eq", "$in"):
+                return present & np.logical_or.reduce([values == value for value in operands] or [np.zeros(num_rows, dtype=bool)])
+            return present & _NUMPY_COMPARISONS[op](values, operand)
+        if self.kind == "bool" and op in ("$eq", "$in") and all(isinstance(value, (bool, np.bool_)) for value in operands):
+            values = _pad(self.values.view(), num_rows)
+            return present & np.logical_or.reduce([values == value for value in operands] or [np.zeros(num_rows, dtype=bool)])
+            
+        # JSON columns and mixed-type operands are decoded row by row
+        return np.fromiter((_compare(op, self.get(row), operand) for row in range(num_rows)), dtype=bool, count=num_rows)
+        
+    def clear(self, row: int) -> None:
+        if row < self.present.size:
+            self.present.data[row] = False
+
+    def take(self, rows: np.ndarray, num_rows: int) -> "_Column":
+        """New column holding just the given rows, renumbered from 0"""
+        column = _Column(self.kind, self.max_categories)
+        column.categories = list(self.categories)
+        column.category_codes = dict(self.category_codes)
+        column.present = GrowableArray(np.bool_, data=_pad(self.present.view(), num_rows)[rows])
+        values = self.values.view()
+        if len(values) < num_rows:
+            values = np.concatenate([values, np.zeros((num_rows - len(values),) + self.values.shape, dtype=self.values.dtype)])
+        values = values[rows]
+        if self.kind == "json":
+            # Drop the blob bytes of removed rows and of values since overwritten
+            lengths = np.where(column.present.data, values[:, 1], 0)
+            blob, starts = _take_bytes(self.blob.view(), values[:, 0], lengths)
+            column.blob = GrowableArray(np.uint8, data=blob)
+            values = np.stack([starts, lengths], axis=1)
+        column.values = GrowableArray(self.values.dtype, self.values.shape, data=values)
+        return column
+
+    def _convert(self, kind: str) -> None:
+        """Re-encode existing values into a more general column kind"""
+        rows = [(row, self.get(row)) for row in range(len(self))]
+        self.__init__(kind, self.max_categories)
+        for row, value in rows:
+            if value is not MISSING:
+                self.set(row, value)
+
+    def save(self, path: str, prefix: str) -> Dict[str, Any]:
+        np.save(os.path.join(path, f"{prefix}.present.npy"), self.present.view())
+        np.save(os.path.join(path, f"{prefix}.values.npy"), self.values.view())
+        if self.kind == "json":
+            np.save(os.path.join(path, f"{prefix}.blob.npy"), self.blob.view())
+        return {"kind": self.kind, "file": prefix, "categories": self.categories if self.kind == "category" else None}
+
+    @classmethod
+    def load(cls, path: str, spec: Dict[str, Any], max_categories: int, mmap_mode: Optional[str]) -> "_Column":
+        column = cls(spec["kind"], max_categories)
+        prefix = os.path.join(path, spec["file"])
+        column.present = GrowableArray(np.bool_, data=np.load(f"{prefix}.present.npy", mmap_mode=mmap_mode))
+        column.values = GrowableArray(column.values.dtype, column.values.shape, data=np.load(f"{prefix}.values.npy", mmap_mode=mmap_mode))
+        if column.kind == "json":
+            column.blob = GrowableArray(np.uint8, data=np.load(f"{prefix}.blob.npy", mmap_mode=mmap_mode))
+        if column.kind == "category":
+            column.categories = spec["categories"]
+            column.category_codes = {value: code for code, value in enumerate(column.categories)}
+        return column
+
+class DocumentView(Mapping):
+    """
+    Read-only view of one stored document plus its search score. Fields are decoded
+    from the columns only when accessed; use to_dict() (or copy()) for a plain dict,
+    e.g. before JSON serialization.
+    """
+
+    __slots__ = ("_store", "_row", "_score")
+
+    def __init__(self, store: "MetadataStore", row: int, score: Optional[float] = None):
+        self._store = store
+        self._row = row
+        self._score = score
+
+    def __getitem__(self, key: str) -> Any:
+        if key == "score" and self._score is not None:
+            return self._score
+        value = self._store.get_field(self._row, key)
+        if value is MISSING:
+            raise KeyError(key)
+        return value
+
+    def __iter__(self) -> Iterator[str]:
+        yield from self._store.fields(self._row)
+        if self._score is not None:
+            yield "score"
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {key: self[key] for key in self}
+
+    copy = to_dict
+
+    def __repr__(self) -> str:
+        return f"DocumentView({self.to_dict()!r})"
+
+class MetadataStore:
+    """
+    Columnar storage for document text and metadata, addressed by row number.
+
+    Text is kept in one UTF-8 blob with an offsets array, metadata fields in typed
+    columns (see _Column), and a 16-byte content hash per row. Rows are never
+    reused: deleting one just clears its ``alive`` flag, until compact() copies
+    the live rows into a new store. save() writes plain .npy files, which load()
+    can memory-map read-only.
+    """
+
+    def __init__(self, max_categories: int = 65536):
+        self.max_categories = max_categories
+        self.text_offsets = GrowableArray(np.int64)
+        self.text_offsets.append(0)
+        self.text_blob = GrowableArray(np.uint8)
+        self.has_text = GrowableArray(np.bool_)
+        self.hashes = GrowableArray(np.uint8, (16,))
+        self.alive = GrowableArray(np.bool_)
+        self.columns: Dict[str, _Column] = {}
+        self.num_alive = 0
+
+    def __len__(self) -> int:
+        """Number of live documents"""
+        return self.num_alive
+
+    @property
+    def num_rows(self) -> int:
+        """Number of rows ever allocated, including deleted ones"""
+        return self.alive.size
+
+    def append(self, doc: Dict[str, Any], content_hash: bytes) -> int:
+        """Store a document in a new row and return its row number"""
+        row = self.num_rows
+        text = doc.get("text")
+        encoded = text.encode("utf-8") if isinstance(text, str) else b""
+        self.text_blob.extend_bytes(encoded)
+        self.text_offsets.append(self.text_blob.size)
+        self.has_text.append(isinstance(text, str))
+        self.hashes.append(np.frombuffer(content_hash[:16], dtype=np.uint8))
+        self.alive.append(True)
+        self.num_alive += 1
+        self._set_fields(row, doc)
+        return row
+
+    def update(self, row: int, doc: Dict[str, Any]) -> None:
+        """Replace the metadata of a row whose text is unchanged"""
+        for key, column in self.columns.items():
+            if key not in doc:
+                column.clear(row)
+        # Unchanged values are skipped so daily refreshes don't grow the JSON blobs;
+        # the type check keeps changes like 1 -> True or 1 -> 1.0, which compare equal
+        self._set_fields(row, {key: value for key, value in doc.items() if not _same_value(self.get_field(row, key), value)})
+
+    def _set_fields(self, row: int, doc: Dict[str, Any]) -> None:
+        for key, value in doc.items():
+            if key == "text" and isinstance(value, str):
+                continue
+            column = self.columns.get(key)
+            if column is None:
+                column = self.columns[key] = _Column(_value_kind(value), self.max_categories)
+            column.set(row, value)
+
+    def delete(self, row: int) -> None:
+        if self.alive.data[row]:
+            self.alive.data[row] = False
+            self.num_alive -= 1
+
+    def is_alive(self, row: int) -> bool:
+        return 0 <= row < self.num_rows and bool(self.alive.data[row])
+
+    def rows(self) -> Iterator[int]:
+        """Row numbers of live documents"""
+        return iter(np.flatnonzero(self.alive.view()).tolist())
+
+    def content_hash(self, row: int) -> bytes:
+        return self.hashes.data[row].tobytes()
+
+    def get_text(self, row: int) -> Any:
+        if not self.has_text.data[row]:
+            return MISSING
+        start, end = self.text_offsets.data[row], self.text_offsets.data[row + 1]
+        return self.text_blob.data[start:end].tobytes().decode("utf-8")
+
+    def get_field(self, row: int, key: str) -> Any:
+        """Decode one field of a row, or MISSING"""
+        if key == "text" and self.has_text.data[row]:
+            return self.get_text(row)
+        column = self.columns.get(key)
+        return MISSING if column is None else column.get(row)
+
+    def fields(self, row: int) -> Iterator[str]:
+        """Names of the fields present in a row"""
+        if self.has_text.data[row]:
+            yield "text"
+        for key, column in self.columns.items():
+            if row < len(column) and column.present.data[row]:
+                yield key
+
+    def get(self, row: int, score: Optional[float] = None) -> Dict[str, Any]:
+        """Materialize a row as a plain dict, with a "score" field when given one"""
+        return DocumentView(self, row, score).to_dict()
+
+    def view(self, row: int, score: Optional[float] = None) -> DocumentView:
+        """Lazy view of a row, valid only while the store is not modified"""
+        return DocumentView(self, row, score)
+
+    def column(self, key: str) -> Optional[_Column]:
+        return self.columns.get(key)
+        
+    def match(self, filter: Dict[str, Any]) -> np.ndarray:
+        """
+        Boolean mask over rows of the live documents matching a filter. Filters map
+        field names to a value (equality), a list of values ($in), or a dict of
+        operators, e.g. {"region": "punjab", "crop": ["wheat", "rice"], "year": {"$gte": 2020}}.
+        All conditions must hold.
+        """
+        num_rows = self.num_rows
+        mask = self.alive.view().copy()
+        for key, condition in filter.items():
+            if isinstance(condition, dict):
+                conditions = condition.items()
+            elif isinstance(condition, (list, tuple, set)):
+                conditions = [("$in", condition)]
+            else:
+                conditions = [("$eq", condition)]
+                
+            for op, operand in conditions:
+                if op not in FILTER_OPERATORS:
+                    raise ValueError(f"Unknown filter operator {op}. Expected one of {', '.join(FILTER_OPERATORS)}")
+                column = self.columns.get(key)
+                if column is None and key != "text":
+                    # No document has this field
+                    mask &= _compare(op, MISSING, operand)
+                elif column is None:
+                    mask &= np.fromiter(
+                        (_compare(op, self.get_field(row, key), operand) for row in range(num_rows)),
+                        dtype=bool, count=num_rows
+                    )
+                else:
+                    mask &= column.match(op, operand, num_rows)
+        return mask
+
+    def compact(self) -> "MetadataStore":
+        """A new store holding only the live rows, renumbered from 0 in order"""
+        rows = np.flatnonzero(self.alive.view())
+        store = MetadataStore(self.max_categories)
+        offsets = self.text_offsets.view()
+        blob, starts = _take_bytes(self.text_blob.view(), offsets[rows], offsets[rows + 1] - offsets[rows])
+        store.text_blob = GrowableArray(np.uint8, data=blob)
+        store.text_offsets = GrowableArray(np.int64, data=np.append(starts, len(blob)))
+        store.has_text = GrowableArray(np.bool_, data=self.has_text.view()[rows])
+        store.hashes = GrowableArray(np.uint8, (16,), data=self.hashes.view()[rows])
+        store.alive = GrowableArray(np.bool_, data=np.ones(len(rows), dtype=bool))
+        store.num_alive = len(rows)
+        for key, column in self.columns.items():
+            compacted = column.take(rows, self.num_rows)
+            if compacted.present.view().any():
+                store.columns[key] = compacted
+        return store
+
+    def save(self, path: str) -> None:
+        """Write the store as .npy files plus a columns.json manifest"""
+        os.makedirs(path, exist_ok=True)
+        for name in ("text_offsets", "text_blob", "has_text", "hashes", "alive"):
+            np.save(os.path.join(path, f"{name}.npy"), getattr(self, name).view())
+        columns = {key: column.save(path, f"column{i}") for i, (key, column) in enumerate(self.columns.items())}
+        with open(os.path.join(path, COLUMNS_FILE), "w", encoding="utf-8") as f:
+            json.dump({"max_categories": self.max_categories, "num_alive": self.num_alive, "columns": columns}, f)
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True) -> "MetadataStore":
+        """Load a store written by save(); with mmap=True arrays are memory-mapped read-only"""
+        with open(os.path.join(path, COLUMNS_FILE), encoding="utf-8") as f:
+            manifest = json.load(f)
+        mmap_mode = "r" if mmap else None
+        store = cls(manifest["max_categories"])
+        for name in ("text_offsets", "text_blob", "has_text", "hashes", "alive"):
+            current = getattr(store, name)
+            data = np.load(os.path.join(path, f"{name}.npy"), mmap_mode=mmap_mode)
+            setattr(store, name, GrowableArray(current.dtype, current.shape, data=data))
+        store.columns = {
+            key: _Column.load(path, spec, store.max_categories, mmap_mode)
+            for key, spec in manifest["columns"].items()
+        }
+        store.num_alive = manifest["num_alive"]
+        return store
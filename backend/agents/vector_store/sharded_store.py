@@ -0,0 +1,287 @@
+from itertools import chain
+from multiprocessing.connection import Connection
+from typing import Any, Dict, List, Optional, Tuple
+import heapq
+import json
+import logging
+import multiprocessing
+import os
+import threading
+import zlib
+import faiss
+import numpy as np
+import torch
+from sentence_transformers import SentenceTransformer
+from agents.vector_store.embedding_cache import EmbeddingCache
+from agents.vector_store.vector_store import VectorStore
+
+SHARDS_FILE = "shards.json"
+
+def _describe(error: Exception) -> Tuple[str, str]:
+    """Picklable stand-in for an exception; FAISS errors and some exception arguments don't pickle"""
+    return type(error).__name__, str(error)
+
+def _shard_worker(conn: Connection, num_threads: int, store_kwargs: Dict[str, Any], path: Optional[str]) -> None:
+    """Serve one shard: a model-less VectorStore driven by (method, args) messages"""
+    # Shards scan in parallel with each other, so each gets its share of the cores
+    faiss.omp_set_num_threads(num_threads)
+    try:
+        store = VectorStore.load(path, mmap=False) if path else VectorStore(model_name=None, **store_kwargs)
+        conn.send((True, None))
+    except Exception as e:
+        conn.send((False, _describe(e)))
+        return
+
+    while True:
+        try:
+            message = conn.recv()
+        except EOFError:
+            break
+        if message is None:
+            break
+        method, args = message
+        try:
+            result = getattr(store, method)(*args)
+        except Exception as e:
+            conn.send((False, _describe(e)))
+            continue
+        try:
+            conn.send((True, result))
+        except Exception as e:
+            # The result itself couldn't be pickled; report that instead so the pipe stays in step
+            conn.send((False, _describe(e)))
+
+class ShardedVectorStore:
+    """
+    VectorStore partitioned across local worker processes, one shard each.
+
+    Documents are assigned to shards by a hash of their "id" (round-robin without
+    one), so each shard holds about 1/num_shards of the vectors and metadata. Texts
+    and queries are embedded once, here, and searches fan out to every shard in
+    parallel; the per-shard top-k lists are merged by score. Writes are not atomic
+    across shards: if one shard rejects a batch, the others keep their part.
+    """
+
+    def __init__(
+        self,
+        model_name: Optional[str] = 'all-MiniLM-L6-v2',
+        num_shards: int = 4,
+        dimension: Optional[int] = None,
+        embedding_cache_size: int = 10000,
+        embedding_cache_dir: Optional[str] = None,
+        _paths: Optional[List[str]] = None,
+        **store_kwargs
+    ):
+        """
+        store_kwargs configure each shard's VectorStore (index_type, precision,
+        nprobe, ...). With model_name=None no model is loaded and documents and
+        queries must come with embeddings of the given dimension.
+        """
+        if num_shards < 1:
+            raise ValueError("num_shards must be at least 1")
+
+        self.logger = logging.getLogger("sharded_vector_store")
+        self.model_name = model_name
+        self.num_shards = num_shards
+        # One request in flight per shard pipe
+        self._lock = threading.Lock()
+        self._next_shard = 0
+        self._processes: List[multiprocessing.Process] = []
+        self._connections: List[Connection] = []
+        try:
+            if model_name is None:
+                if dimension is None:
+                    raise ValueError("dimension is required for a store without an embedding model")
+                self.model = None
+                self.dimension = dimension
+            else:
+                device = "cuda" if torch.cuda.is_available() else "cpu"
+                self.model = SentenceTransformer(model_name, device=device)
+                self.dimension = self.model.get_sentence_embedding_dimension()
+            self.embedding_cache = EmbeddingCache(model_name, max_entries=embedding_cache_size, cache_dir=embedding_cache_dir)
+
+            # Spawned rather than forked: forking after torch/OpenMP threads start can deadlock
+            context = multiprocessing.get_context("spawn")
+            num_threads = max(1, (os.cpu_count() or 1) // num_shards)
+            store_kwargs = {"keyword_index": False, **store_kwargs, "dimension": self.dimension}
+            for i in range(num_shards):
+                parent_conn, child_conn = context.Pipe()
+                path = _paths[i] if _paths else None
+                process = context.Process(
+                    target=_shard_worker,
+                    args=(child_conn, num_threads, store_kwargs, path),
+                    name=f"vector-store-shard-{i}",
+                    daemon=True
+                )
+                process.start()
+                child_conn.close()
+                self._processes.append(process)
+                self._connections.append(parent_conn)
+
+            # Shards start up concurrently; wait for all of them
+            for i, conn in enumerate(self._connections):
+                try:
+                    ok, error = conn.recv()
+                except (EOFError, OSError):
+                    raise RuntimeError(f"Shard {i} exited during startup")
+                if not ok:
+                    name, message = error
+                    raise RuntimeError(f"shard {i}: {name}: {message}")
+            self.logger.info(f"Started {num_shards} vector store shards")
+
+        except Exception as e:
+            self.logger.error(f"Error initializing sharded vector store: {str(e)}")
+            self.close()
+            raise
+
+    def _scatter(self, calls: Dict[int, Tuple[str, tuple]]) -> Dict[int, Any]:
+        """Send calls to their shards, then collect every reply; shards work in parallel meanwhile"""
+        replies: Dict[int, Tuple[bool, Any]] = {}
+        with self._lock:
+            if not self._connections:
+                raise RuntimeError("Sharded vector store is closed")
+            sent: List[int] = []
+            try:
+                for shard, message in calls.items():
+                    self._connections[shard].send(message)
+                    sent.append(shard)
+            finally:
+                # Read a reply from every shard that got a message, even if a later send
+                # failed, so that no pipe is left holding a stale reply for the next call
+                for shard in sent:
+                    try:
+                        replies[shard] = self._connections[shard].recv()
+                    except (EOFError, OSError):
+                        replies[shard] = (False, ("ShardExited", "shard process is gone"))
+
+        for shard, (ok, result) in replies.items():
+            if not ok:
+                name, message = result
+                raise RuntimeError(f"shard {shard}: {name}: {message}")
+        return {shard: result for shard, (ok, result) in replies.items()}
+
+    def _shard_for(self, doc: Dict[str, Any]) -> int:
+        if "id" in doc:
+            # crc32 rather than hash(), which is salted per process
+            return zlib.crc32(str(doc["id"]).encode("utf-8")) % self.num_shards
+        shard = self._next_shard
+        self._next_shard = (shard + 1) % self.num_shards
+        return shard
+
+    def _encode(self, texts: List[str]) -> np.ndarray:
+        if self.model is None:
+            raise RuntimeError("This store has no embedding model; use add_embeddings() and search_embeddings()")
+        return self.embedding_cache.encode(texts, lambda misses: self.model.encode(misses, show_progress_bar=False))
+
+    def add_documents(self, documents: List[Dict[str, Any]]) -> None:
+        """Embed documents and add them to their shards"""
+        try:
+            if not documents:
+                return
+            self.add_embeddings(documents, self._encode([doc.get("text", "") for doc in documents]))
+            self.logger.info(f"Successfully added {len(documents)} documents to sharded vector store")
+
+        except Exception as e:
+            self.logger.error(f"Error adding documents to sharded vector store: {str(e)}")
+            raise
+
+    def add_embeddings(self, documents: List[Dict[str, Any]], embeddings: np.ndarray) -> None:
+        """Add documents with embeddings computed elsewhere, one row per document"""
+        embeddings = np.asarray(embeddings, dtype='float32')
+        positions: Dict[int, List[int]] = {}
+        for i, doc in enumerate(documents):
+            positions.setdefault(self._shard_for(doc), []).append(i)
+        self._scatter({
+            shard: ("add_embeddings", ([documents[i] for i in rows], embeddings[rows]))
+            for shard, rows in positions.items()
+        })
+
+    def remove_documents(self, ids: List[Any]) -> int:
+        """Remove documents by id, returning how many were removed"""
+        try:
+            by_shard: Dict[int, List[Any]] = {}
+            for doc_id in ids:
+                by_shard.setdefault(self._shard_for({"id": doc_id}), []).append(doc_id)
+            removed = sum(self._scatter({shard: ("remove_documents", (shard_ids,)) for shard, shard_ids in by_shard.items()}).values())
+            self.logger.info(f"Removed {removed} documents from sharded vector store")
+            return removed
+
+        except Exception as e:
+            self.logger.error(f"Error removing documents from sharded vector store: {str(e)}")
+            raise
+
+    def search(self, query: str, k: int = 5, filter: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """Search every shard for similar documents, optionally restricted by a metadata filter"""
+        return self.search_many([query], k, filter)[0]
+
+    def search_many(self, queries: List[str], k: int = 5, filter: Optional[Dict[str, Any]] = None) -> List[List[Dict[str, Any]]]:
+        """Search for several queries with one batched encode and one round trip per shard"""
+        try:
+            if not queries:
+                return []
+            return self.search_embeddings(self._encode(queries), k, filter)
+
+        except Exception as e:
+            self.logger.error(f"Error searching sharded vector store: {str(e)}")
+            raise
+
+    def search_embeddings(self, query_embeddings: np.ndarray, k: int = 5, filter: Optional[Dict[str, Any]] = None) -> List[List[Dict[str, Any]]]:
+        """Search with query embeddings computed elsewhere, merging each shard's top k"""
+        query_embeddings = np.asarray(query_embeddings, dtype='float32').reshape(-1, self.dimension)
+        replies = self._scatter({shard: ("search_embeddings", (query_embeddings, k, filter)) for shard in range(self.num_shards)})
+
+        # Every shard scores with the same metric, so scores compare across shards
+        return [
+            heapq.nlargest(k, chain.from_iterable(replies[shard][i] for shard in range(self.num_shards)), key=lambda doc: doc["score"])
+            for i in range(len(query_embeddings))
+        ]
+
+    def save(self, path: str) -> None:
+        """Save each shard into its own subdirectory of path"""
+        try:
+            os.makedirs(path, exist_ok=True)
+            self._scatter({shard: ("save", (os.path.join(path, f"shard-{shard}"),)) for shard in range(self.num_shards)})
+            meta = {"model_name": self.model_name, "dimension": self.dimension, "num_shards": self.num_shards}
+            with open(os.path.join(path, SHARDS_FILE + ".tmp"), "w", encoding="utf-8") as f:
+                json.dump(meta, f, indent=2)
+            os.replace(os.path.join(path, SHARDS_FILE + ".tmp"), os.path.join(path, SHARDS_FILE))
+            self.logger.info(f"Saved {self.num_shards} shards to {path}")
+
+        except Exception as e:
+            self.logger.error(f"Error saving sharded vector store: {str(e)}")
+            raise
+
+    @classmethod
+    def load(cls, path: str, **kwargs) -> "ShardedVectorStore":
+        """Start shard processes on the shards saved under path"""
+        with open(os.path.join(path, SHARDS_FILE), encoding="utf-8") as f:
+            meta = json.load(f)
+        return cls(
+            model_name=meta["model_name"],
+            num_shards=meta["num_shards"],
+            dimension=meta["dimension"],
+            _paths=[os.path.join(path, f"shard-{shard}") for shard in range(meta["num_shards"])],
+            **kwargs
+        )
+
+    def close(self) -> None:
+        """Stop the shard processes"""
+        for conn in self._connections:
+            try:
+                conn.send(None)
+            except (BrokenPipeError, OSError):
+                pass
+        for process in self._processes:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+        for conn in self._connections:
+            conn.close()
+        self._processes = []
+        self._connections = []
+        if hasattr(self, "embedding_cache"):
+            self.embedding_cache.close()
+
+    async def cleanup(self) -> None:
+        """Cleanup resources"""
+        self.close()
@@ -1,32 +1,173 @@
-from typing import List, Tuple, Dict, Any
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Tuple, Dict, Any, Optional
 import numpy as np
 from sentence_transformers import SentenceTransformer
 import faiss
+import asyncio
+import functools
+import hashlib
+import json
 import logging
+import os
+import shutil
+import threading
 import torch
+from agents.utils.rw_lock import ReadWriteLock
+from agents.vector_store.bm25 import BM25Index
+from agents.vector_store.embedding_cache import EmbeddingCache
+from agents.vector_store.metadata_store import MISSING, GrowableArray, MetadataStore
+from agents.vector_store.index_factory import INDEX_TYPES, PRECISIONS, build_index, default_nlist, needs_training, set_search_params
 
+# On-disk layout written by VectorStore.save
+INDEX_FILE = "index.faiss"
+DOCUMENTS_DIR = "documents"
+KEYWORDS_DIR = "keywords"
+VECTORS_FILE = "vectors.npy"
+META_FILE = "meta.json"
+FORMAT_VERSION = 3
+
+# find_similar_vectors scores up to this many vectors on the event loop itself
+INLINE_SIMILARITY_LIMIT = 1024
+
+# Extra neighbours fetched past the expected share of HNSW tombstones in a result list
+TOMBSTONE_MARGIN = 16
+
+def _content_hash(doc: Dict[str, Any]) -> bytes:
+    """Hash of the text a document is embedded from (16 bytes are plenty to detect changes)"""
+    return hashlib.sha256(doc.get("text", "").encode("utf-8")).digest()[:16]
+
+def _top_similar(query_vector: np.ndarray, vectors: List[Tuple[Any, np.ndarray]], top_k: int) -> List[Tuple[Any, float]]:
+    """The top_k (key, cosine similarity) pairs of vectors, best first"""
+    # Convert vectors to numpy array
+    vector_array = np.array([v for _, v in vectors]).astype('float32')
+    
+    # Calculate cosine similarity
+    similarities = np.dot(vector_array, query_vector) / (
+        np.linalg.norm(vector_array, axis=1) * np.linalg.norm(query_vector)
+    )
+    
+    # Get top k results
+    top_indices = np.argsort(similarities)[-top_k:][::-1]
+    
+    return [(vectors[i][0], similarities[i]) for i in top_indices]
+    
 class VectorStore:
-    def __init__(self):
+    def __init__(
+        self,
+        model_name: Optional[str] = 'all-MiniLM-L6-v2',
+        index_type: str = "flat",
+        train_threshold: int = 10000,
+        nlist: Optional[int] = None,
+        pq_m: int = 48,
+        hnsw_m: int = 32,
+        nprobe: int = 8,
+        ef_search: int = 64,
+        embedding_cache_size: int = 10000,
+        embedding_cache_dir: Optional[str] = None,
+        filter_exact_threshold: int = 10000,
+        filter_cache_size: int = 256,
+        precision: str = "float32",
+        rerank_factor: int = 0,
+        keyword_index: bool = True,
+        max_workers: int = 4,
+        dimension: Optional[int] = None,
+        compaction_threshold: float = 0.25
+    ):
+        """
+        index_type selects the FAISS index: "flat" (exact), "ivf_flat", "ivf_pq" or "hnsw".
+        IVF indexes need training, so documents are kept in a flat index until
+        train_threshold documents have been added, then moved into the trained index.
+        nprobe (IVF) and ef_search (HNSW) trade recall for query latency.
+        Embeddings are cached in memory (embedding_cache_size entries) and, when
+        embedding_cache_dir is set, on disk.
+        
+        Documents are stored under stable integer labels rather than list positions,
+        in a columnar MetadataStore; search results are plain dicts decoded from it.
+        Documents carrying an "id" field can later be changed with upsert_documents()
+        and deleted with remove_documents() without rebuilding the index. Deleted
+        documents keep their rows (and, in HNSW indexes, their graph entries) until
+        they exceed compaction_threshold of all rows; the store is then compacted,
+        which renumbers the labels. compact() does so on demand.
+        
+        Searches can be filtered on metadata. Filters matching at most
+        filter_exact_threshold documents are answered by an exact scan of just those
+        vectors; larger ones restrict the index search with an ID selector. The
+        documents matching recent filters are cached until the store next changes.
+        
+        precision sets how the index stores vectors: "float32", "float16", "int8"
+        (scalar quantization) or "pq" (pq_m bytes per vector). int8 and pq need
+        training like IVF. With rerank_factor > 0, k * rerank_factor candidates are
+        fetched and re-scored against float32 copies of the vectors, which save()
+        writes beside the index and load(mmap=True) maps instead of reading into memory.
+        
+        With keyword_index, a BM25 inverted index over the document texts is kept in
+        step with the vector index, for keyword_search() and hybrid_search().
+        
+        The store is thread-safe: searches share a reader-writer lock and writes take
+        it exclusively, but only after embedding, so searches keep running while
+        documents are being encoded. Results are decoded before the lock is released,
+        so a concurrent write never changes a document under a caller. The async
+        methods run on a pool of max_workers threads so encoding and search never
+        block the event loop.
+        
+        With model_name=None the store loads no model and holds embeddings of the
+        given dimension computed elsewhere, via add_embeddings() and search_embeddings().
+        """
+        if index_type not in INDEX_TYPES:
+            raise ValueError(f"Unknown index type: {index_type}. Expected one of {', '.join(INDEX_TYPES)}")
+        if precision not in PRECISIONS:
+            raise ValueError(f"Unknown precision: {precision}. Expected one of {', '.join(PRECISIONS)}")
+            
         self.logger = logging.getLogger("vector_store")
+        self.model_name = model_name
+        self.read_only = False
+        self.index_type = index_type
+        self.train_threshold = train_threshold
+        self.precision = precision
+        self.rerank_factor = rerank_factor
+        self.keyword_index = keyword_index
+        self.index_params = {"nlist": nlist, "pq_m": pq_m, "hnsw_m": hnsw_m, "precision": precision}
+        self.search_params = {"nprobe": nprobe, "ef_search": ef_search}
+        self.filter_exact_threshold = filter_exact_threshold
+        self.filter_cache_size = filter_cache_size
+        self.compaction_threshold = compaction_threshold
+        # Bumped by every compaction, which renumbers labels
+        self.generation = 0
+        self._lock = ReadWriteLock()
+        # Searches share the read lock but all update the filter cache
+        self._filter_cache_lock = threading.Lock()
         try:
-            # Check if CUDA is available
-            device = "cuda" if torch.cuda.is_available() else "cpu"
-            self.logger.info(f"Using device: {device}")
-            
-            # Initialize the model with error handling
-            try:
-                self.model = SentenceTransformer('all-MiniLM-L6-v2', device=device)
-                self.logger.info("Successfully loaded sentence transformer model")
-            except Exception as e:
-                self.logger.error(f"Error loading sentence transformer model: {str(e)}")
-                raise
+            if model_name is None:
+                if dimension is None:
+                    raise ValueError("dimension is required for a store without an embedding model")
+                self.model = None
+                self.dimension = dimension
+            else:
+                # Check if CUDA is available
+                device = "cuda" if torch.cuda.is_available() else "cpu"
+                self.logger.info(f"Using device: {device}")
+                
+                # Initialize the model with error handling
+                try:
+                    self.model = SentenceTransformer(model_name, device=device)
+                    self.logger.info("Successfully loaded sentence transformer model")
+                except Exception as e:
+                    self.logger.error(f"Error loading sentence transformer model: {str(e)}")
+                    raise
+                self.dimension = self.model.get_sentence_embedding_dimension()
                 
             # Initialize FAISS index
-            self.dimension = self.model.get_sentence_embedding_dimension()
-            self.index = faiss.IndexFlatL2(self.dimension)
-            self.documents: List[Dict[str, Any]] = []
+            self.index = self._new_index()
+            self._reset_documents()
             self.logger.info("Successfully initialized FAISS index")
             
+            self.embedding_cache = EmbeddingCache(model_name, max_entries=embedding_cache_size, cache_dir=embedding_cache_dir)
+            # Bounded pool for the async API
+            self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="vector_store")
+            # Runs the dense retriever of a hybrid search beside the keyword one
+            self._hybrid_executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="vector_store_hybrid")
+            
         except Exception as e:
             self.logger.error(f"Error initializing vector store: {str(e)}")
             raise
@@ -36,79 +177,708 @@ class VectorStore:
         try:
             if not documents:
                 return
+            self._check_writable()
+            
+            # Embed before taking the lock, so searches keep running during the slow part
+            embeddings = self._encode([doc.get("text", "") for doc in documents])
+            self._add_new(documents, embeddings)
+            self.logger.info(f"Successfully added {len(documents)} documents to vector store")
+            
+        except Exception as e:
+            self.logger.error(f"Error adding documents to vector store: {str(e)}")
+            raise
+            
+    def add_embeddings(self, documents: List[Dict[str, Any]], embeddings: np.ndarray) -> None:
+        """Add documents with embeddings computed elsewhere, one row per document"""
+        try:
+            if not documents:
+                return
+            self._check_writable()
+            embeddings = np.asarray(embeddings, dtype='float32')
+            if embeddings.shape != (len(documents), self.dimension):
+                raise ValueError(f"Expected embeddings of shape {(len(documents), self.dimension)}, got {embeddings.shape}")
                 
-            # Extract text from documents
-            texts = [doc.get("text", "") for doc in documents]
+            self._add_new(documents, embeddings)
             
-            # Generate embeddings
-            embeddings = self.model.encode(texts, show_progress_bar=False)
+        except Exception as e:
+            self.logger.error(f"Error adding embeddings to vector store: {str(e)}")
+            raise
             
-            # Add to FAISS index
-            self.index.add(np.array(embeddings).astype('float32'))
+    def _add_new(self, documents: List[Dict[str, Any]], embeddings: np.ndarray) -> None:
+        """Add documents whose ids must not exist yet"""
+        with self._lock.write():
+            ids = [doc["id"] for doc in documents if "id" in doc]
+            duplicates = [doc_id for doc_id in ids if doc_id in self.labels_by_id]
+            if duplicates or len(set(ids)) != len(ids):
+                raise ValueError(f"Documents with these ids already exist, use upsert_documents: {duplicates or ids}")
+                
+            self._add(documents, embeddings)
             
-            # Store documents
-            self.documents.extend(documents)
+    def upsert_documents(self, documents: List[Dict[str, Any]]) -> Dict[str, int]:
+        """
+        Insert or update documents by their "id" field. Only new documents and
+        documents whose text changed are embedded; metadata-only changes are
+        applied in place. Returns counts of added, updated and unchanged documents.
+        """
+        try:
+            self._check_writable()
             
-            self.logger.info(f"Successfully added {len(documents)} documents to vector store")
+            # The last version of a document wins when an id repeats within the batch
+            latest: Dict[Any, Dict[str, Any]] = {}
+            for doc in documents:
+                if "id" not in doc:
+                    raise ValueError("upsert_documents requires every document to have an 'id'")
+                latest[doc["id"]] = doc
+                
+            # Embed new and changed texts before taking the lock
+            with self._lock.read():
+                changed = [doc for doc in latest.values() if not self._is_current(doc)]
+            embedded = self._embed(changed)
+            
+            with self._lock.write():
+                counts = {"added": 0, "updated": 0, "unchanged": 0}
+                to_embed = []
+                stale_labels = []
+                for doc_id, doc in latest.items():
+                    label = self.labels_by_id.get(doc_id)
+                    if label is None:
+                        counts["added"] += 1
+                        to_embed.append(doc)
+                    elif self._is_current(doc):
+                        counts["unchanged"] += 1
+                        self._filter_cache.clear()
+                        self.documents.update(label, doc)
+                    else:
+                        counts["updated"] += 1
+                        stale_labels.append(label)
+                        to_embed.append(doc)
+                        
+                self._remove_labels(stale_labels)
+                # Documents changed by another writer since embedding are encoded here
+                missing = [doc for doc in to_embed if _content_hash(doc) not in embedded]
+                embedded.update(self._embed(missing))
+                self._add(to_embed, np.array([embedded[_content_hash(doc)] for doc in to_embed]))
+            
+            self.logger.info(f"Upserted documents: {counts}")
+            return counts
             
         except Exception as e:
-            self.logger.error(f"Error adding documents to vector store: {str(e)}")
+            self.logger.error(f"Error upserting documents in vector store: {str(e)}")
             raise
             
-    def search(self, query: str, k: int = 5) -> List[Dict[str, Any]]:
-        """Search for similar documents"""
+    def remove_documents(self, ids: List[Any]) -> int:
+        """Remove documents by id, returning how many were removed"""
         try:
-            # Generate query embedding
-            query_embedding = self.model.encode([query], show_progress_bar=False)
+            self._check_writable()
+            with self._lock.write():
+                labels = [self.labels_by_id[doc_id] for doc_id in dict.fromkeys(ids) if doc_id in self.labels_by_id]
+                self._remove_labels(labels)
+            self.logger.info(f"Removed {len(labels)} documents from vector store")
+            return len(labels)
             
-            # Search in FAISS index
-            distances, indices = self.index.search(
-                np.array(query_embedding).astype('float32'), k
-            )
+        except Exception as e:
+            self.logger.error(f"Error removing documents from vector store: {str(e)}")
+            raise
+            
+    def _is_current(self, doc: Dict[str, Any]) -> bool:
+        """Whether the store holds the document's id with the same text"""
+        label = self.labels_by_id.get(doc["id"])
+        return label is not None and self.documents.content_hash(label) == _content_hash(doc)
+        
+    def _embed(self, documents: List[Dict[str, Any]]) -> Dict[bytes, np.ndarray]:
+        """Embeddings of the documents' texts by content hash; called without holding the lock"""
+        if not documents:
+            return {}
+        embeddings = np.asarray(self._encode([doc.get("text", "") for doc in documents]), dtype='float32')
+        return dict(zip((_content_hash(doc) for doc in documents), embeddings))
+        
+    def _add(self, documents: List[Dict[str, Any]], embeddings: np.ndarray) -> None:
+        """Add embedded documents under fresh labels; needs the write lock"""
+        if not documents:
+            return
+            
+        # Extract text from documents
+        texts = [doc.get("text", "") for doc in documents]
+        
+        # Add to FAISS index under new labels
+        # Labels are metadata store rows, which are never reused
+        embeddings = np.asarray(embeddings, dtype='float32')
+        labels = np.arange(self.documents.num_rows, self.documents.num_rows + len(documents), dtype='int64')
+        self.index.add_with_ids(embeddings, labels)
+        if self.full_vectors is not None:
+            self.full_vectors.extend(embeddings)
+        
+        # Store documents
+        self._filter_cache.clear()
+        for label, doc in zip(labels.tolist(), documents):
+            self.documents.append(doc, _content_hash(doc))
+            if "id" in doc:
+                self.labels_by_id[doc["id"]] = label
+        if self.bm25 is not None:
+            self.bm25.add(labels.tolist(), texts)
+                
+        # Move to the trained index once there is enough data to train it. The documents
+        # are already stored, so a failed training leaves them staged rather than raising
+        if self.staging and self.index.ntotal >= max(self.train_threshold, self._training_minimum()):
+            try:
+                self._train_index()
+            except Exception as e:
+                self.logger.warning(f"Could not train {self.index_type} index yet, keeping vectors staged: {str(e)}")
+            
+    def _remove_labels(self, labels: List[int]) -> None:
+        """Drop documents and their vectors from the index"""
+        if not labels:
+            return
+            
+        self._filter_cache.clear()
+        try:
+            self.index.remove_ids(np.array(labels, dtype='int64'))
+        except RuntimeError:
+            # HNSW graphs cannot delete; the vectors stay in the index and are filtered from results
+            self.tombstones.update(labels)
+
+        # Ids are unmapped last, so a failure above leaves every document reachable by id
+        doc_ids = [self.documents.get_field(label, "id") for label in labels]
+        for label in labels:
+            if self.bm25 is not None:
+                self.bm25.remove(label, self.documents.get_text(label))
+            self.documents.delete(label)
+        for doc_id in doc_ids:
+            if doc_id is not MISSING:
+                del self.labels_by_id[doc_id]
+                
+        if self.documents.num_rows - len(self.documents) > self.compaction_threshold * self.documents.num_rows:
+            self._compact()
+            
+    def compact(self) -> None:
+        """Drop deleted documents from the index, metadata rows and keyword index"""
+        try:
+            self._check_writable()
+            with self._lock.write():
+                self._compact()
+                
+        except Exception as e:
+            self.logger.error(f"Error compacting vector store: {str(e)}")
+            raise
+            
+    def _compact(self) -> None:
+        """Rebuild everything from the live documents under labels 0..n-1; needs the write lock"""
+        live = np.flatnonzero(self.documents.alive.view())
+        removed = self.documents.num_rows - len(live)
+        if removed == 0:
+            return
+            
+        new_labels = np.full(self.documents.num_rows, -1, dtype='int64')
+        new_labels[live] = np.arange(len(live))
+        if self.full_vectors is not None:
+            vectors = self.full_vectors.data[live]
+        else:
+            # Quantized indexes give back approximations, which re-encode to the same codes
+            vectors = self.index.reconstruct_batch(live) if len(live) else np.zeros((0, self.dimension), dtype='float32')
+            
+        # reset() keeps any training, so the index is refilled rather than retrained
+        self.index.reset()
+        self.index.add_with_ids(vectors, np.arange(len(live), dtype='int64'))
+        if self.full_vectors is not None:
+            self.full_vectors = GrowableArray(np.float32, (self.dimension,), data=vectors)
+        self.documents = self.documents.compact()
+        if self.bm25 is not None:
+            self.bm25.compact(new_labels)
+        self.labels_by_id = {doc_id: int(new_labels[label]) for doc_id, label in self.labels_by_id.items()}
+        self.tombstones = set()
+        self._filter_cache.clear()
+        self.generation += 1
+        self.logger.info(f"Compacted vector store: dropped {removed} deleted documents, kept {len(live)}")
+            
+    def _reset_documents(self) -> None:
+        self.documents = MetadataStore()
+        self.labels_by_id: Dict[Any, int] = {}
+        self.tombstones = set()
+        self._filter_cache: "OrderedDict[str, Tuple[np.ndarray, np.ndarray]]" = OrderedDict()
+        # Full-precision copies of the vectors by label, for re-ranking
+        self.full_vectors = GrowableArray(np.float32, (self.dimension,)) if self.rerank_factor > 0 else None
+        self.bm25 = BM25Index() if self.keyword_index else None
+        
+    def search(self, query: str, k: int = 5, filter: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """Search for similar documents, optionally restricted by a metadata filter"""
+        try:
+            return self.search_many([query], k, filter)[0]
+            
+        except Exception as e:
+            self.logger.error(f"Error searching vector store: {str(e)}")
+            raise
+            
+    def search_many(self, queries: List[str], k: int = 5, filter: Optional[Dict[str, Any]] = None) -> List[List[Dict[str, Any]]]:
+        """
+        Search for several queries with one batched encode and one index search.
+        See MetadataStore.match for the filter syntax.
+        """
+        try:
+            if not queries:
+                return []
+                
+            # Generate all query embeddings in one batch
+            query_embeddings = np.array(self._encode(queries)).astype('float32')
+            return self.search_embeddings(query_embeddings, k, filter)
+            
+        except Exception as e:
+            self.logger.error(f"Error searching vector store: {str(e)}")
+            raise
+            
+    def search_embeddings(self, query_embeddings: np.ndarray, k: int = 5, filter: Optional[Dict[str, Any]] = None) -> List[List[Dict[str, Any]]]:
+        """Search with query embeddings computed elsewhere, one row per query"""
+        query_embeddings = np.asarray(query_embeddings, dtype='float32').reshape(-1, self.dimension)
+        with self._lock.read():
+            distances, indices = self._dense_search(query_embeddings, k, filter)
             
-            # Return matching documents
-            results = []
-            for idx, distance in zip(indices[0], distances[0]):
-                if idx < len(self.documents):
-                    doc = self.documents[idx].copy()
-                    doc["score"] = float(1 / (1 + distance))  # Convert distance to similarity score
-                    results.append(doc)
+            # Return matching documents per query
+            return [self._collect_results(row_indices, row_distances, k) for row_indices, row_distances in zip(indices, distances)]
+            
+    def keyword_search(self, query: str, k: int = 5, filter: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """Search by BM25 keyword relevance; scores are BM25 scores"""
+        try:
+            with self._lock.read():
+                scores, labels = self._keyword_search(query, k, filter)
+                return [self.documents.get(label, score) for label, score in zip(labels.tolist(), scores.tolist())]
+            
+        except Exception as e:
+            self.logger.error(f"Error searching vector store: {str(e)}")
+            raise
+            
+    def hybrid_search(
+        self,
+        query: str,
+        k: int = 5,
+        filter: Optional[Dict[str, Any]] = None,
+        candidates: Optional[int] = None,
+        rrf_k: int = 60
+    ) -> List[Dict[str, Any]]:
+        """
+        Search with both the embedding index and BM25, run concurrently, and fuse
+        their rankings with reciprocal rank fusion: each document scores
+        sum(1 / (rrf_k + rank)) over the rankings it appears in, taking the top
+        candidates (default 4 * k) of each. Exact terms such as cultivar or product
+        codes are found by BM25 even when the embedding model blurs them.
+        """
+        try:
+            if self.bm25 is None:
+                raise RuntimeError("hybrid_search needs a store created with keyword_index=True")
+            candidates = candidates or 4 * k
+            
+            def dense() -> Tuple[int, np.ndarray]:
+                query_embeddings = np.array(self._encode([query])).astype('float32')
+                with self._lock.read():
+                    return self.generation, self._dense_search(query_embeddings, candidates, filter)[1][0]
                     
-            return results
+            while True:
+                # The lock is not held while waiting, so a queued writer can't deadlock the two
+                dense_future = self._hybrid_executor.submit(dense)
+                with self._lock.read():
+                    keyword_generation = self.generation
+                    keyword_labels = self._keyword_search(query, candidates, filter)[1]
+                dense_generation, dense_labels = dense_future.result()
+                
+                self._lock.acquire_read()
+                if dense_generation == keyword_generation == self.generation:
+                    break
+                # A compaction renumbered the labels in between; rare, so just search again
+                self._lock.release_read()
+                
+            try:
+                fused: Dict[int, float] = {}
+                for ranking in (dense_labels.tolist(), keyword_labels.tolist()):
+                    # Drop padding and documents deleted since, including HNSW tombstones
+                    ranking = [label for label in ranking if self.documents.is_alive(label)][:candidates]
+                    for rank, label in enumerate(ranking, start=1):
+                        fused[label] = fused.get(label, 0.0) + 1 / (rrf_k + rank)
+                        
+                best = sorted(fused.items(), key=lambda item: -item[1])[:k]
+                return [self.documents.get(label, score) for label, score in best]
+            finally:
+                self._lock.release_read()
             
         except Exception as e:
             self.logger.error(f"Error searching vector store: {str(e)}")
             raise
             
+    def _dense_search(self, query_embeddings: np.ndarray, k: int, filter: Optional[Dict[str, Any]]) -> Tuple[np.ndarray, np.ndarray]:
+        """Nearest labels per query embedding; rows may hold padding (-1) and deleted labels"""
+        # Fetch extra candidates when they will be re-ranked at full precision
+        fetch_k = k * self.rerank_factor if self.full_vectors is not None else k
+        if filter:
+            distances, indices = self._filtered_search(query_embeddings, fetch_k, filter)
+        elif self.tombstones:
+            distances, indices = self._search_past_tombstones(query_embeddings, fetch_k)
+        else:
+            # Search in FAISS index
+            distances, indices = self.index.search(query_embeddings, fetch_k)
+        if self.full_vectors is not None:
+            distances, indices = self._rerank(query_embeddings, indices, k)
+        return distances, indices
+        
+    def _search_past_tombstones(self, query_embeddings: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Search an HNSW index holding deleted entries, over-fetching in proportion to them"""
+        ntotal = self.index.ntotal
+        live = len(self.documents)
+        fetch_k = min(ntotal, int(np.ceil(k * ntotal / max(live, 1))) + TOMBSTONE_MARGIN)
+        distances, indices = self.index.search(query_embeddings, fetch_k)
+        found = ((indices >= 0) & self.documents.alive.data[np.maximum(indices, 0)]).sum(axis=1)
+        if fetch_k < ntotal and (found < min(k, live)).any():
+            # Unlucky clustering of deleted entries; fall back to the bound that always suffices
+            distances, indices = self.index.search(query_embeddings, min(ntotal, k + len(self.tombstones)))
+        return distances, indices
+        
+    def _keyword_search(self, query: str, k: int, filter: Optional[Dict[str, Any]]) -> Tuple[np.ndarray, np.ndarray]:
+        """BM25 scores and labels of the best k documents matching filter"""
+        if self.bm25 is None:
+            raise RuntimeError("Keyword search needs a store created with keyword_index=True")
+        mask = self._match_filter(filter)[1] if filter else None
+        return self.bm25.search(query, k, mask)
+            
+    def _filtered_search(self, query_embeddings: np.ndarray, k: int, filter: Dict[str, Any]) -> Tuple[np.ndarray, np.ndarray]:
+        """Search only the documents matching filter"""
+        labels, mask = self._match_filter(filter)
+        if len(labels) == 0:
+            return np.zeros((len(query_embeddings), 0), dtype='float32'), np.zeros((len(query_embeddings), 0), dtype='int64')
+            
+        if len(labels) <= self.filter_exact_threshold:
+            # Scanning a small candidate set directly beats any index traversal
+            if self.full_vectors is not None:
+                candidates = self.full_vectors.data[labels]
+            else:
+                candidates = self.index.reconstruct_batch(labels)
+            distances, positions = faiss.knn(query_embeddings, candidates, min(k, len(labels)))
+            return distances, labels[positions]
+            
+        # Pre-filter inside the index so only matching vectors are scored
+        bitmap = np.packbits(mask, bitorder="little")
+        selector = faiss.IDSelectorBitmap(len(mask), faiss.swig_ptr(bitmap))
+        if self.active_index_type == "hnsw":
+            params = faiss.SearchParametersHNSW(sel=selector, efSearch=self.search_params["ef_search"])
+        elif self.active_index_type in ("ivf_flat", "ivf_pq"):
+            # Probe more lists when few of their entries match, so k results are still found
+            nlist = faiss.extract_index_ivf(self.index).nlist
+            selectivity = len(labels) / max(1, self.index.ntotal)
+            nprobe = min(nlist, int(np.ceil(self.search_params["nprobe"] / selectivity)))
+            params = faiss.SearchParametersIVF(sel=selector, nprobe=nprobe)
+        else:
+            params = faiss.SearchParameters(sel=selector)
+        return self.index.search(query_embeddings, k, params=params)
+        
+    def _rerank(self, query_embeddings: np.ndarray, labels: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Re-score candidate labels against the full-precision vectors and keep the best k"""
+        distances = np.full((len(labels), k), np.inf, dtype='float32')
+        reranked = np.full((len(labels), k), -1, dtype='int64')
+        for i, (query, candidates) in enumerate(zip(query_embeddings, labels)):
+            candidates = candidates[candidates >= 0]
+            candidates = candidates[self.documents.alive.data[candidates]]
+            exact = ((self.full_vectors.data[candidates] - query) ** 2).sum(axis=1)
+            order = np.argsort(exact)[:k]
+            distances[i, :len(order)] = exact[order]
+            reranked[i, :len(order)] = candidates[order]
+        return distances, reranked
+        
+    def _match_filter(self, filter: Dict[str, Any]) -> Tuple[np.ndarray, np.ndarray]:
+        """Labels and row mask of the documents matching filter, cached per filter"""
+        key = json.dumps(filter, sort_keys=True, default=str)
+        with self._filter_cache_lock:
+            cached = self._filter_cache.get(key)
+            if cached is not None:
+                self._filter_cache.move_to_end(key)
+                return cached
+                
+        mask = self.documents.match(filter)
+        cached = (np.flatnonzero(mask), mask)
+        with self._filter_cache_lock:
+            self._filter_cache[key] = cached
+            if len(self._filter_cache) > self.filter_cache_size:
+                self._filter_cache.popitem(last=False)
+        return cached
+        
+    def _encode(self, texts: List[str]) -> np.ndarray:
+        """Embed texts, sending only cache misses to the model"""
+        if self.model is None:
+            raise RuntimeError("This store has no embedding model; use add_embeddings() and search_embeddings()")
+        return self.embedding_cache.encode(texts, lambda misses: self.model.encode(misses, show_progress_bar=False))
+        
+    def get_embedding_cache_stats(self) -> Dict[str, Any]:
+        """Return embedding cache hit/miss statistics"""
+        return self.embedding_cache.get_stats()
+        
+    def _collect_results(self, labels: np.ndarray, distances: np.ndarray, k: int) -> List[Dict[str, Any]]:
+        """Turn one row of FAISS results into at most k scored documents; needs the read lock"""
+        results = []
+        for label, distance in zip(labels.tolist(), distances.tolist()):
+            # ANN indexes pad with -1 when fewer than k neighbours are found; deleted labels are skipped
+            if self.documents.is_alive(label):
+                # Convert distance to similarity score
+                results.append(self.documents.get(label, 1 / (1 + distance)))
+                if len(results) == k:
+                    break
+                    
+        return results
+        
     def clear(self) -> None:
         """Clear the vector store"""
         try:
-            self.index = faiss.IndexFlatL2(self.dimension)
-            self.documents = []
+            with self._lock.write():
+                self.index = self._new_index()
+                self._reset_documents()
+                self.read_only = False
             self.logger.info("Successfully cleared vector store")
             
         except Exception as e:
             self.logger.error(f"Error clearing vector store: {str(e)}")
             raise
         
+    def _new_index(self) -> faiss.Index:
+        """Create the empty index for this store; indexes that need training start out flat"""
+        if needs_training(self.index_type, self.precision):
+            self.active_index_type = "flat"
+            self.staging = True
+            return faiss.IndexIDMap2(faiss.IndexFlatL2(self.dimension))
+            
+        self.active_index_type = self.index_type
+        self.staging = False
+        # Flat and HNSW indexes address vectors by position, so labels are mapped on top
+        index = faiss.IndexIDMap2(build_index(self.index_type, self.dimension, **self.index_params))
+        set_search_params(index, **self.search_params)
+        return index
+        
+    def train_index(self) -> None:
+        """Train the configured index on the stored vectors and move them into it"""
+        try:
+            self._check_writable()
+            with self._lock.write():
+                self._train_index()
+                
+        except Exception as e:
+            self.logger.error(f"Error training vector store index: {str(e)}")
+            raise
+            
+    def _training_minimum(self) -> int:
+        """Fewest staged vectors the configured index can be trained on"""
+        if self.index_type in ("ivf_flat", "ivf_pq"):
+            return max(self.index_params["nlist"] or default_nlist(self.index.ntotal), 1)
+        return 1
+        
+    def _train_index(self) -> None:
+        """Move the staged vectors into a trained index; needs the write lock"""
+        if not self.staging:
+            return
+            
+        num_vectors = self.index.ntotal
+        is_ivf = self.index_type in ("ivf_flat", "ivf_pq")
+        nlist = (self.index_params["nlist"] or default_nlist(num_vectors)) if is_ivf else 0
+        if num_vectors < self._training_minimum():
+            raise ValueError(f"Need at least {self._training_minimum()} documents to train a {self.index_type} index, have {num_vectors}")
+            
+        labels = faiss.vector_to_array(self.index.id_map)
+        vectors = faiss.downcast_index(self.index.index).reconstruct_n(0, num_vectors)
+        index = build_index(self.index_type, self.dimension, num_vectors=num_vectors, **{**self.index_params, "nlist": nlist or None})
+        if is_ivf:
+            # IVF indexes store labels natively; filtered searches reconstruct vectors by label
+            index.set_direct_map_type(faiss.DirectMap.Hashtable)
+        else:
+            index = faiss.IndexIDMap2(index)
+            
+        # Train on a sample; 64 points per list is plenty for k-means, 10k for quantizers
+        sample_size = min(num_vectors, max(64 * nlist, 10000))
+        sample = vectors[np.random.default_rng(0).choice(num_vectors, sample_size, replace=False)]
+        index.train(sample)
+        index.add_with_ids(vectors, labels)
+        set_search_params(index, **self.search_params)
+        
+        self.index = index
+        self.active_index_type = self.index_type
+        self.staging = False
+        self.logger.info(f"Trained {self.index_type} ({self.precision}) index on {sample_size} of {num_vectors} vectors")
+            
+    def set_search_params(self, nprobe: Optional[int] = None, ef_search: Optional[int] = None) -> None:
+        """Tune the recall/latency trade-off of IVF (nprobe) and HNSW (ef_search) searches"""
+        with self._lock.write():
+            if nprobe is not None:
+                self.search_params["nprobe"] = nprobe
+            if ef_search is not None:
+                self.search_params["ef_search"] = ef_search
+            set_search_params(self.index, **self.search_params)
+        
+    def _check_writable(self) -> None:
+        """Refuse to modify an index that is memory-mapped read-only"""
+        if self.read_only:
+            raise RuntimeError("Vector store was loaded memory-mapped and is read-only; load it with mmap=False to modify it")
+            
+    def save(self, path: str) -> None:
+        """Persist the index, document metadata and embedding-model identity to a directory"""
+        try:
+            # A consistent snapshot: writers wait, searches carry on
+            with self._lock.read():
+                os.makedirs(path, exist_ok=True)
+                
+                # Each file is written beside its target and swapped in, so readers never see a partial file
+                index_path = os.path.join(path, INDEX_FILE)
+                faiss.write_index(self.index, index_path + ".tmp")
+                os.replace(index_path + ".tmp", index_path)
+                
+                documents_path = os.path.join(path, DOCUMENTS_DIR)
+                shutil.rmtree(documents_path + ".tmp", ignore_errors=True)
+                self.documents.save(documents_path + ".tmp")
+                # Directories can't be replaced atomically; move the old one aside first
+                if os.path.exists(documents_path):
+                    os.replace(documents_path, documents_path + ".old")
+                os.replace(documents_path + ".tmp", documents_path)
+                shutil.rmtree(documents_path + ".old", ignore_errors=True)
+                
+                if self.bm25 is not None:
+                    keywords_path = os.path.join(path, KEYWORDS_DIR)
+                    shutil.rmtree(keywords_path + ".tmp", ignore_errors=True)
+                    os.makedirs(keywords_path + ".tmp")
+                    self.bm25.save(keywords_path + ".tmp")
+                    if os.path.exists(keywords_path):
+                        os.replace(keywords_path, keywords_path + ".old")
+                    os.replace(keywords_path + ".tmp", keywords_path)
+                    shutil.rmtree(keywords_path + ".old", ignore_errors=True)
+                    
+                if self.full_vectors is not None:
+                    vectors_path = os.path.join(path, VECTORS_FILE)
+                    with open(vectors_path + ".tmp", "wb") as f:
+                        np.save(f, self.full_vectors.view())
+                    os.replace(vectors_path + ".tmp", vectors_path)
+                        
+                meta = {
+                    "format_version": FORMAT_VERSION,
+                    "model_name": self.model_name,
+                    "dimension": self.dimension,
+                    "num_documents": len(self.documents),
+                    "index_type": self.index_type,
+                    "active_index_type": self.active_index_type,
+                    "staging": self.staging,
+                    "rerank_factor": self.rerank_factor,
+                    "keyword_index": self.keyword_index,
+                    "train_threshold": self.train_threshold,
+                    "index_params": self.index_params,
+                    "search_params": self.search_params,
+                    "tombstones": sorted(self.tombstones)
+                }
+                meta_path = os.path.join(path, META_FILE)
+                with open(meta_path + ".tmp", "w", encoding="utf-8") as f:
+                    json.dump(meta, f, indent=2)
+                os.replace(meta_path + ".tmp", meta_path)
+                    
+                self.logger.info(f"Saved {len(self.documents)} documents to {path}")
+            
+        except Exception as e:
+            self.logger.error(f"Error saving vector store: {str(e)}")
+            raise
+            
+    @classmethod
+    def load(cls, path: str, mmap: bool = True) -> "VectorStore":
+        """
+        Load a store written by save(). With mmap=True the index is memory-mapped
+        read-only, so it opens almost instantly and its pages are shared between
+        processes that load the same directory.
+        """
+        with open(os.path.join(path, META_FILE), encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("format_version") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported vector store format version: {meta.get('format_version')}")
+            
+        # The store is rebuilt around the model that produced its embeddings
+        store = cls(
+            model_name=meta["model_name"],
+            index_type=meta.get("index_type", "flat"),
+            train_threshold=meta.get("train_threshold", 10000),
+            rerank_factor=meta.get("rerank_factor", 0),
+            keyword_index=meta.get("keyword_index", False),
+            dimension=meta["dimension"],
+            **meta.get("index_params", {}),
+            **meta.get("search_params", {})
+        )
+        if store.dimension != meta["dimension"]:
+            raise ValueError(
+                f"Model {meta['model_name']} produces {store.dimension}-dimensional embeddings, "
+                f"but the saved index has dimension {meta['dimension']}"
+            )
+            
+        try:
+            flags = 0
+            if mmap:
+                flags = faiss.IO_FLAG_READ_ONLY | getattr(faiss, "IO_FLAG_MMAP_IFC", faiss.IO_FLAG_MMAP)
+            store.index = faiss.read_index(os.path.join(path, INDEX_FILE), flags)
+            store.read_only = mmap
+            store.active_index_type = meta.get("active_index_type", store.index_type)
+            store.staging = meta.get("staging", store.active_index_type != store.index_type)
+            set_search_params(store.index, **store.search_params)
+            
+            store.documents = MetadataStore.load(os.path.join(path, DOCUMENTS_DIR), mmap=mmap)
+            store.tombstones = set(meta["tombstones"])
+            if store.rerank_factor > 0:
+                vectors = np.load(os.path.join(path, VECTORS_FILE), mmap_mode="r" if mmap else None)
+                store.full_vectors = GrowableArray(np.float32, (store.dimension,), data=vectors)
+            if store.keyword_index:
+                store.bm25 = BM25Index.load(os.path.join(path, KEYWORDS_DIR), mmap=mmap)
+            if not mmap:
+                # Only writable stores need the id lookup used by upsert/remove
+                for label in store.documents.rows():
+                    doc_id = store.documents.get_field(label, "id")
+                    if doc_id is not MISSING:
+                        store.labels_by_id[doc_id] = label
+                
+            if store.index.ntotal != len(store.documents) + len(store.tombstones):
+                raise ValueError(f"Index holds {store.index.ntotal} vectors but {len(store.documents)} documents were saved")
+                
+            store.logger.info(f"Loaded {len(store.documents)} documents from {path} (mmap={mmap})")
+            return store
+            
+        except Exception as e:
+            store.logger.error(f"Error loading vector store: {str(e)}")
+            raise
+        
+    async def _run(self, func: Callable[..., Any], *args, **kwargs) -> Any:
+        """Run a blocking call on the store's thread pool without stalling the event loop"""
+        return await asyncio.get_running_loop().run_in_executor(self._executor, functools.partial(func, *args, **kwargs))
+        
+    async def aadd_documents(self, documents: List[Dict[str, Any]]) -> None:
+        """add_documents() on the store's thread pool"""
+        await self._run(self.add_documents, documents)
+        
+    async def aupsert_documents(self, documents: List[Dict[str, Any]]) -> Dict[str, int]:
+        """upsert_documents() on the store's thread pool"""
+        return await self._run(self.upsert_documents, documents)
+        
+    async def aremove_documents(self, ids: List[Any]) -> int:
+        """remove_documents() on the store's thread pool"""
+        return await self._run(self.remove_documents, ids)
+        
+    async def asearch(self, query: str, k: int = 5, filter: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """search() on the store's thread pool"""
+        return await self._run(self.search, query, k, filter)
+        
+    async def asearch_many(self, queries: List[str], k: int = 5, filter: Optional[Dict[str, Any]] = None) -> List[List[Dict[str, Any]]]:
+        """search_many() on the store's thread pool"""
+        return await self._run(self.search_many, queries, k, filter)
+        
+    async def ahybrid_search(self, query: str, k: int = 5, filter: Optional[Dict[str, Any]] = None, **kwargs) -> List[Dict[str, Any]]:
+        """hybrid_search() on the store's thread pool"""
+        return await self._run(self.hybrid_search, query, k, filter, **kwargs)
+        
     async def get_query_vector(self, query: str) -> np.ndarray:
         """Convert a query string to a vector"""
-        return self.model.encode([query])[0]
+        return (await self._run(self._encode, [query]))[0]
+        
+    async def get_query_vectors(self, queries: List[str]) -> np.ndarray:
+        """Convert several query strings to vectors in one batch"""
+        return await self._run(self._encode, queries)
         
     async def get_capability_vector(self, capabilities: Dict[str, Any]) -> np.ndarray:
         """Convert agent capabilities to a vector"""
         # Convert capabilities to a descriptive string
         description = f"{capabilities['name']} capabilities: {', '.join(capabilities['capabilities'])}"
-        return self.model.encode([description])[0]
+        return (await self._run(self._encode, [description]))[0]
         
     async def add_vector(self, vector: np.ndarray, metadata: Dict[str, Any]) -> None:
-        """Add a vector and its metadata to the store"""
-        if self.index is None:
-            await self.initialize()
-            
-        self.index.add(np.array([vector]).astype('float32'))
-        self.vectors.append(vector)
-        self.metadata.append(metadata)
+        """Add a precomputed vector with its metadata as a document"""
+        await self._run(self.add_embeddings, [metadata], np.asarray(vector, dtype='float32').reshape(1, -1))
         
     async def find_similar_vectors(
         self,
@@ -120,21 +890,14 @@ class VectorStore:
         if not vectors:
             return []
             
-        # Convert vectors to numpy array
-        vector_array = np.array([v for _, v in vectors]).astype('float32')
-        
-        # Calculate cosine similarity
-        similarities = np.dot(vector_array, query_vector) / (
-            np.linalg.norm(vector_array, axis=1) * np.linalg.norm(query_vector)
-        )
-        
-        # Get top k results
-        top_indices = np.argsort(similarities)[-top_k:][::-1]
-        
-        return [(vectors[i][0], similarities[i]) for i in top_indices]
+        # A thread hop costs more than scoring a handful of vectors (e.g. agent capabilities)
+        if len(vectors) <= INLINE_SIMILARITY_LIMIT:
+            return _top_similar(query_vector, vectors, top_k)
+        return await self._run(_top_similar, query_vector, vectors, top_k)
         
     async def cleanup(self) -> None:
         """Cleanup resources"""
+        self.embedding_cache.close()
+        self._executor.shutdown(wait=False)
+        self._hybrid_executor.shutdown(wait=False)
         self.index = None
-        self.vectors = []
-        self.metadata = [] 
\ No newline at end of file
@@ -1,5 +1,5 @@
 from fastapi import Depends
-from ..agents.orchestrator.agent_orchestrator import AgentOrchestrator
+from agents.orchestrator.agent_orchestrator import AgentOrchestrator
 import os
 from dotenv import load_dotenv
 
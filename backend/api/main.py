@@ -1,6 +1,8 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 from .routes import ai_routes
+from agents.utils.metrics import get_metrics_registry
 
 app = FastAPI(title="FarmX API")
 
@@ -14,4 +16,11 @@ app.add_middleware(
 )
 
 # Include routers
-app.include_router(ai_routes.router, prefix="/api/ai", tags=["ai"]) 
\ No newline at end of file
+app.include_router(ai_routes.router, prefix="/api/ai", tags=["ai"])
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics() -> PlainTextResponse:
+    """
+    Expose orchestrator latency, LLM call and token metrics in the Prometheus text format
+    """
+    return PlainTextResponse(get_metrics_registry().render(), media_type="text/plain; version=0.0.4")
@@ -1,7 +1,9 @@
 from fastapi import APIRouter, HTTPException, Depends
-from typing import Dict, Any
+from fastapi.responses import StreamingResponse
+from typing import Dict, Any, AsyncIterator
 from ..dependencies import get_orchestrator
-from ...agents.orchestrator.agent_orchestrator import AgentOrchestrator
+from agents.orchestrator.agent_orchestrator import AgentOrchestrator
+import json
 import logging
 
 router = APIRouter()
@@ -24,4 +26,25 @@ async def process_ai_query(
         
     except Exception as e:
         logger.error(f"Error processing AI query: {str(e)}")
-        raise HTTPException(status_code=500, detail=str(e)) 
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e)) 
+
+@router.post("/query/stream")
+async def stream_ai_query(
+    query: Dict[str, str],
+    orchestrator: AgentOrchestrator = Depends(get_orchestrator)
+) -> StreamingResponse:
+    """
+    Process a query using the AI orchestrator, streaming progress as server-sent events
+    """
+    if not query.get("text"):
+        raise HTTPException(status_code=400, detail="Query text is required")
+        
+    async def event_stream() -> AsyncIterator[str]:
+        async for event in orchestrator.stream_query(query["text"]):
+            yield f"event: {event['event']}\ndata: {json.dumps(event, default=str)}\n\n"
+            
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
@@ -0,0 +1 @@
+# Benchmark scripts for the backend
\ No newline at end of file
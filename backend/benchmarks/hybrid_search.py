@@ -0,0 +1,96 @@
+"""
+Quality/latency benchmark of VectorStore.hybrid_search against dense search alone.
+
+Builds a synthetic advisory corpus in which many documents share crop, disease
+and region vocabulary and differ mainly in an exact cultivar or product code.
+Each query names one code, so the relevant document is known; the benchmark
+reports hit rate@k, MRR and per-query latency of search, keyword_search and
+hybrid_search. It loads the real embedding model.
+
+    python -m benchmarks.hybrid_search --documents 20000 --queries 500
+"""
+from typing import Callable, Dict, List, Mapping, Tuple
+import argparse
+import random
+import time
+from agents.vector_store.vector_store import VectorStore
+
+CROPS = ["wheat", "rice", "maize", "cotton", "soybean", "mustard", "chickpea", "sugarcane"]
+PROBLEMS = ["yellow rust", "leaf blast", "stem borer", "bollworm", "powdery mildew", "aphids", "wilt", "root rot"]
+REGIONS = ["Punjab", "Haryana", "Bihar", "Maharashtra", "Karnataka", "Gujarat", "Madhya Pradesh", "Tamil Nadu"]
+PREFIXES = ["HD", "PBW", "DBW", "IR", "PR", "NK", "JS", "RH", "GNG", "CO"]
+
+def make_corpus(num_documents: int, seed: int = 0) -> List[Dict[str, str]]:
+    """Advisory snippets that are near-identical apart from their cultivar code"""
+    rng = random.Random(seed)
+    codes = set()
+    documents = []
+    while len(documents) < num_documents:
+        code = f"{rng.choice(PREFIXES)}-{rng.randint(100, 9999)}"
+        if code in codes:
+            continue
+        codes.add(code)
+        crop, problem, region = rng.choice(CROPS), rng.choice(PROBLEMS), rng.choice(REGIONS)
+        documents.append({
+            "id": code,
+            "text": (
+                f"{crop.capitalize()} cultivar {code} shows moderate tolerance to {problem} in {region}. "
+                f"Sow in the recommended window, apply balanced fertilizer and scout weekly for {problem}."
+            )
+        })
+    return documents
+
+def make_queries(documents: List[Dict[str, str]], num_queries: int, seed: int = 1) -> List[Tuple[str, str]]:
+    """(query, relevant document id) pairs asking about one code each"""
+    rng = random.Random(seed)
+    templates = [
+        "How does {code} handle disease pressure?",
+        "Sowing advice for {code}",
+        "Is {code} suitable for my farm?"
+    ]
+    picked = rng.sample(documents, min(num_queries, len(documents)))
+    return [(rng.choice(templates).format(code=doc["id"]), doc["id"]) for doc in picked]
+
+def evaluate(search: Callable[[str, int], List[Mapping]], queries: List[Tuple[str, str]], k: int) -> Dict[str, float]:
+    hits = 0
+    reciprocal_ranks = 0.0
+    start = time.perf_counter()
+    for query, relevant in queries:
+        ids = [doc["id"] for doc in search(query, k)]
+        if relevant in ids:
+            hits += 1
+            reciprocal_ranks += 1 / (ids.index(relevant) + 1)
+    elapsed = time.perf_counter() - start
+    return {
+        "hit_rate": hits / len(queries),
+        "mrr": reciprocal_ranks / len(queries),
+        "ms_per_query": elapsed / len(queries) * 1000
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark hybrid (dense + BM25) search against dense search")
+    parser.add_argument("--documents", type=int, default=20000)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--index-type", default="flat")
+    parser.add_argument("--model", default="all-MiniLM-L6-v2")
+    args = parser.parse_args()
+
+    documents = make_corpus(args.documents)
+    queries = make_queries(documents, args.queries)
+
+    # No embedding cache, so every method pays for encoding its queries
+    store = VectorStore(model_name=args.model, index_type=args.index_type, train_threshold=min(10000, args.documents), embedding_cache_size=0)
+    start = time.perf_counter()
+    for i in range(0, len(documents), 1000):
+        store.add_documents(documents[i:i + 1000])
+    print(f"Indexed {args.documents} documents in {time.perf_counter() - start:.1f}s ({args.index_type} + BM25)")
+
+    print(f"{len(queries)} queries, k={args.k}")
+    print(f"{'method':>15} {'hit@k':>7} {'MRR':>7} {'ms/query':>9}")
+    for name in ("search", "keyword_search", "hybrid_search"):
+        row = evaluate(getattr(store, name), queries, args.k)
+        print(f"{name:>15} {row['hit_rate']:>7.3f} {row['mrr']:>7.3f} {row['ms_per_query']:>9.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Memory benchmark: VectorStore document metadata as a list of dicts versus the
+columnar MetadataStore.
+
+Reports resident bytes of each representation (via tracemalloc), the cost of
+building k=10 search results per query, and the size and load time of the
+saved store when memory-mapped.
+
+    python -m benchmarks.metadata_store_memory --documents 1000000
+"""
+from typing import Any, Dict, Iterator
+import argparse
+import random
+import tempfile
+import time
+import tracemalloc
+import numpy as np
+from agents.vector_store.metadata_store import MetadataStore
+
+REGIONS = ["punjab", "haryana", "uttar pradesh", "maharashtra", "karnataka", "tamil nadu", "bihar", "gujarat"]
+CROPS = ["wheat", "rice", "maize", "cotton", "sugarcane", "soybean", "mustard", "chickpea"]
+WORDS = "soil moisture nitrogen yield irrigation pest blight rust fertilizer harvest sowing mandi price rainfall".split()
+
+def make_documents(count: int, seed: int = 0) -> Iterator[Dict[str, Any]]:
+    """Advisory-style documents with ~200 characters of text and a few typed fields"""
+    rng = random.Random(seed)
+    for i in range(count):
+        yield {
+            "id": f"doc-{i}",
+            "text": " ".join(rng.choices(WORDS, k=28)),
+            "region": rng.choice(REGIONS),
+            "crop": rng.choice(CROPS),
+            "year": rng.randint(2015, 2025),
+            "price": round(rng.uniform(1000, 5000), 2)
+        }
+
+def measure(build) -> Any:
+    """Return (object, bytes allocated while building it, seconds)"""
+    tracemalloc.start()
+    start = time.perf_counter()
+    value = build()
+    elapsed = time.perf_counter() - start
+    allocated, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return value, allocated, elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare document metadata memory use")
+    parser.add_argument("--documents", type=int, default=1000000)
+    parser.add_argument("--queries", type=int, default=10000)
+    parser.add_argument("--k", type=int, default=10)
+    args = parser.parse_args()
+
+    hashes = np.random.default_rng(0).integers(0, 256, (args.documents, 16), dtype=np.uint8)
+
+    def build_store():
+        store = MetadataStore()
+        for doc, content_hash in zip(make_documents(args.documents), hashes):
+            store.append(doc, content_hash.tobytes())
+        return store
+
+    documents, list_bytes, list_time = measure(lambda: list(make_documents(args.documents)))
+    store, store_bytes, store_time = measure(build_store)
+
+    hits = np.random.default_rng(1).integers(0, args.documents, (args.queries, args.k)).tolist()
+
+    start = time.perf_counter()
+    for row in hits:
+        results = []
+        for idx in row:
+            doc = documents[idx].copy()
+            doc["score"] = 0.5
+            results.append(doc)
+    list_results = (time.perf_counter() - start) / args.queries
+
+    start = time.perf_counter()
+    for row in hits:
+        results = [store.view(idx, 0.5) for idx in row]
+    store_results = (time.perf_counter() - start) / args.queries
+
+    start = time.perf_counter()
+    for row in hits:
+        texts = [store.view(idx, 0.5)["text"] for idx in row]
+    store_text_results = (time.perf_counter() - start) / args.queries
+
+    with tempfile.TemporaryDirectory() as path:
+        store.save(path)
+        start = time.perf_counter()
+        mapped = MetadataStore.load(path, mmap=True)
+        load_time = time.perf_counter() - start
+
+    mib = 1024 * 1024
+    print(f"documents: {args.documents}")
+    print(f"{'':24} {'list of dicts':>14} {'MetadataStore':>14}")
+    print(f"{'memory (MiB)':24} {list_bytes / mib:>14.1f} {store_bytes / mib:>14.1f}")
+    print(f"{'build (s)':24} {list_time:>14.2f} {store_time:>14.2f}")
+    print(f"{'results/query (us)':24} {list_results * 1e6:>14.1f} {store_results * 1e6:>14.1f}")
+    print(f"{'results+text/query (us)':24} {'':>14} {store_text_results * 1e6:>14.1f}")
+    print(f"memory-mapped load: {load_time * 1000:.1f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+Throughput benchmark for batched plant-health inference.
+
+Writes synthetic JPEG "photos" to a temporary directory and reports images/sec
+for one-at-a-time predict() and for PlantHealthEngine.iter_predictions() at
+several batch sizes. Without --weights a randomly initialised UNet is used,
+which costs the same to run as a trained one.
+
+    python -m benchmarks.plant_health_batch --images 128 --batch-sizes 1 4 8 16 32
+"""
+import argparse
+import os
+import tempfile
+import time
+import numpy as np
+import torch
+from PIL import Image
+from agents.ml_models.model.model import PlantHealthEngine, UNet
+
+def write_images(directory: str, count: int, width: int, height: int) -> None:
+    """Smooth random images, which compress (and decode) like real photos"""
+    rng = np.random.default_rng(0)
+    for i in range(count):
+        small = rng.integers(0, 256, (height // 32, width // 32, 3), dtype=np.uint8)
+        Image.fromarray(small).resize((width, height), Image.BILINEAR).save(os.path.join(directory, f"photo_{i:05d}.jpg"), quality=90)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark batched plant-health inference on CPU")
+    parser.add_argument("--images", type=int, default=128)
+    parser.add_argument("--width", type=int, default=1024)
+    parser.add_argument("--height", type=int, default=768)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32])
+    parser.add_argument("--decode-workers", type=int, default=4)
+    parser.add_argument("--weights", help="UNet weights; a random model is used when omitted")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        weights = args.weights
+        if weights is None:
+            weights = os.path.join(directory, "unet_random.pth")
+            torch.save(UNet().state_dict(), weights)
+        images_dir = os.path.join(directory, "images")
+        os.makedirs(images_dir)
+        write_images(images_dir, args.images, args.width, args.height)
+        paths = [os.path.join(images_dir, name) for name in sorted(os.listdir(images_dir))]
+
+        engine = PlantHealthEngine(weights, device="cpu", decode_workers=args.decode_workers)
+        print(f"{args.images} images of {args.width}x{args.height}, {torch.get_num_threads()} torch threads, {args.decode_workers} decode workers")
+        print(f"{'mode':>16} {'images/s':>9} {'speedup':>8}")
+
+        start = time.perf_counter()
+        for path in paths:
+            engine.predict(path)
+        baseline = len(paths) / (time.perf_counter() - start)
+        print(f"{'predict()':>16} {baseline:>9.2f} {1.0:>8.2f}")
+
+        for batch_size in args.batch_sizes:
+            start = time.perf_counter()
+            for _ in engine.iter_predictions(paths, batch_size=batch_size):
+                pass
+            throughput = len(paths) / (time.perf_counter() - start)
+            print(f"{f'batch {batch_size}':>16} {throughput:>9.2f} {throughput / baseline:>8.2f}")
+        engine.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Throughput benchmark for ShardedVectorStore.
+
+Indexes synthetic embeddings (no model is loaded) in a single in-process
+VectorStore and in sharded stores of increasing shard counts, then reports
+queries/sec for batched searches and per-query latency for single searches.
+Scaling flattens out once shards outnumber the available cores.
+
+    python -m benchmarks.sharded_store --size 1000000 --shards 1 2 4 8
+"""
+import argparse
+import os
+import time
+import numpy as np
+from agents.vector_store.sharded_store import ShardedVectorStore
+from agents.vector_store.vector_store import VectorStore
+from benchmarks.vector_store_ann import make_vectors
+
+def measure(store, queries: np.ndarray, k: int, batch_size: int, single_queries: int):
+    """(queries/sec over batched searches, ms per single-query search)"""
+    store.search_embeddings(queries[:batch_size], k)
+    start = time.perf_counter()
+    for i in range(0, len(queries), batch_size):
+        store.search_embeddings(queries[i:i + batch_size], k)
+    throughput = len(queries) / (time.perf_counter() - start)
+
+    start = time.perf_counter()
+    for query in queries[:single_queries]:
+        store.search_embeddings(query[None], k)
+    latency = (time.perf_counter() - start) / single_queries * 1000
+    return throughput, latency
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark sharded VectorStore search throughput")
+    parser.add_argument("--size", type=int, default=1000000)
+    parser.add_argument("--dimension", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--single-queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--shards", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--index-type", default="flat")
+    args = parser.parse_args()
+
+    vectors = make_vectors(args.size, args.dimension)
+    queries = make_vectors(args.queries, args.dimension, seed=1)
+    documents = [{"id": i} for i in range(args.size)]
+
+    print(f"{args.index_type} index, {args.size} vectors x {args.dimension} dims, {os.cpu_count()} CPUs, k={args.k}")
+    print(f"{'store':>14} {'queries/s':>10} {'speedup':>8} {'ms/query':>9}")
+
+    store = VectorStore(model_name=None, dimension=args.dimension, index_type=args.index_type, keyword_index=False)
+    for i in range(0, args.size, 100000):
+        store.add_embeddings(documents[i:i + 100000], vectors[i:i + 100000])
+    baseline, latency = measure(store, queries, args.k, args.batch_size, args.single_queries)
+    print(f"{'in-process':>14} {baseline:>10.0f} {1.0:>8.2f} {latency:>9.2f}")
+    del store
+
+    for num_shards in args.shards:
+        store = ShardedVectorStore(model_name=None, dimension=args.dimension, num_shards=num_shards, index_type=args.index_type)
+        try:
+            for i in range(0, args.size, 100000):
+                store.add_embeddings(documents[i:i + 100000], vectors[i:i + 100000])
+            throughput, latency = measure(store, queries, args.k, args.batch_size, args.single_queries)
+            print(f"{f'{num_shards} shards':>14} {throughput:>10.0f} {throughput / baseline:>8.2f} {latency:>9.2f}")
+        finally:
+            store.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Recall/latency benchmark for the VectorStore index types.
+
+Builds each index type over synthetic clustered vectors and reports recall@k
+against exact (flat) search together with p50/p99 single-query latency.
+
+    python -m benchmarks.vector_store_ann --sizes 10000 100000 1000000
+"""
+from typing import Dict, List
+import argparse
+import time
+import numpy as np
+import faiss
+from agents.vector_store.index_factory import INDEX_TYPES, build_index, default_nlist, needs_training, set_search_params
+
+def make_vectors(num_vectors: int, dimension: int, latent_dimension: int = 32, num_clusters: int = 256, seed: int = 0) -> np.ndarray:
+    """
+    Clustered vectors on the unit sphere. Like sentence embeddings they have a low
+    intrinsic dimension, so neighbourhoods are meaningful rather than uniform noise.
+    """
+    rng = np.random.default_rng(0)
+    # The projection and clusters are shared so that queries come from the same distribution
+    projection = rng.standard_normal((latent_dimension, dimension)).astype('float32')
+    centers = rng.standard_normal((num_clusters, latent_dimension)).astype('float32')
+
+    rng = np.random.default_rng(seed + 1)
+    vectors = np.empty((num_vectors, dimension), dtype='float32')
+    for start in range(0, num_vectors, 100000):
+        end = min(start + 100000, num_vectors)
+        labels = rng.integers(0, num_clusters, end - start)
+        latent = centers[labels] + 0.5 * rng.standard_normal((end - start, latent_dimension)).astype('float32')
+        vectors[start:end] = latent @ projection + 0.05 * rng.standard_normal((end - start, dimension)).astype('float32')
+    faiss.normalize_L2(vectors)
+    return vectors
+
+def recall_at_k(found: np.ndarray, truth: np.ndarray) -> float:
+    """Fraction of the true top-k neighbours that were returned"""
+    hits = sum(len(set(row[row >= 0]) & set(expected)) for row, expected in zip(found, truth))
+    return hits / truth.size
+
+def run(size: int, dimension: int, num_queries: int, k: int, nprobe: int, ef_search: int, pq_m: int, index_types: List[str]) -> List[Dict[str, float]]:
+    vectors = make_vectors(size, dimension)
+    queries = make_vectors(num_queries, dimension, seed=1)
+
+    results = []
+    truth = None
+    for index_type in index_types:
+        build_start = time.perf_counter()
+        index = build_index(index_type, dimension, num_vectors=size, pq_m=pq_m)
+        if needs_training(index_type):
+            nlist = default_nlist(size)
+            sample = vectors[np.random.default_rng(0).choice(size, min(size, max(64 * nlist, 10000)), replace=False)]
+            index.train(sample)
+        index.add(vectors)
+        set_search_params(index, nprobe=nprobe, ef_search=ef_search)
+        build_time = time.perf_counter() - build_start
+
+        latencies = []
+        found = np.empty((num_queries, k), dtype='int64')
+        for i in range(num_queries):
+            start = time.perf_counter()
+            _, indices = index.search(queries[i:i + 1], k)
+            latencies.append(time.perf_counter() - start)
+            found[i] = indices[0]
+
+        if truth is None:
+            # Exact results are the reference for every other index type
+            truth = found if index_type == "flat" else faiss.knn(queries, vectors, k)[1]
+
+        results.append({
+            "size": size,
+            "index_type": index_type,
+            "build_s": build_time,
+            "recall": recall_at_k(found, truth),
+            "p50_ms": float(np.percentile(latencies, 50)) * 1000,
+            "p99_ms": float(np.percentile(latencies, 99)) * 1000
+        })
+        del index
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark VectorStore index types")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 1000000])
+    parser.add_argument("--dimension", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--nprobe", type=int, default=8)
+    parser.add_argument("--ef-search", type=int, default=64)
+    parser.add_argument("--pq-m", type=int, default=48)
+    parser.add_argument("--index-types", nargs="+", default=list(INDEX_TYPES), choices=INDEX_TYPES)
+    args = parser.parse_args()
+
+    # Flat always runs first so it provides the ground truth
+    index_types = ["flat"] + [t for t in args.index_types if t != "flat"]
+
+    print(f"{'size':>9} {'index':>9} {'build s':>9} {'recall@' + str(args.k):>10} {'p50 ms':>8} {'p99 ms':>8}")
+    for size in args.sizes:
+        for row in run(size, args.dimension, args.queries, args.k, args.nprobe, args.ef_search, args.pq_m, index_types):
+            print(f"{row['size']:>9} {row['index_type']:>9} {row['build_s']:>9.2f} {row['recall']:>10.3f} {row['p50_ms']:>8.3f} {row['p99_ms']:>8.3f}")
+
+if __name__ == "__main__":
+    main()
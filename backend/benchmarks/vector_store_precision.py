@@ -0,0 +1,97 @@
+"""
+Memory/recall benchmark for the VectorStore storage precisions.
+
+For each precision the index is built over synthetic clustered vectors and
+reports its serialized size, the memory saved relative to float32, and
+recall@k against exact search with and without full-precision re-ranking.
+
+    python -m benchmarks.vector_store_precision --size 100000 --index-type flat
+"""
+from typing import Dict, List
+import argparse
+import time
+import numpy as np
+import faiss
+from agents.vector_store.index_factory import INDEX_TYPES, PRECISIONS, build_index, default_nlist, needs_training, set_search_params
+from benchmarks.vector_store_ann import make_vectors, recall_at_k
+
+def rerank(vectors: np.ndarray, queries: np.ndarray, candidates: np.ndarray, k: int) -> np.ndarray:
+    """Re-score candidates against the float32 vectors, as VectorStore does with rerank_factor"""
+    reranked = np.full((len(queries), k), -1, dtype='int64')
+    for i, (query, row) in enumerate(zip(queries, candidates)):
+        row = row[row >= 0]
+        exact = ((vectors[row] - query) ** 2).sum(axis=1)
+        order = np.argsort(exact)[:k]
+        reranked[i, :len(order)] = row[order]
+    return reranked
+
+def run(args: argparse.Namespace) -> List[Dict[str, float]]:
+    vectors = make_vectors(args.size, args.dimension)
+    queries = make_vectors(args.queries, args.dimension, seed=1)
+    truth = faiss.knn(queries, vectors, args.k)[1]
+    labels = np.arange(args.size, dtype='int64')
+
+    results = []
+    for precision in args.precisions:
+        if args.index_type == "ivf_pq" and precision != "float32":
+            continue
+        nlist = default_nlist(args.size) if args.index_type.startswith("ivf") else None
+        index = build_index(args.index_type, args.dimension, num_vectors=args.size, nlist=nlist, pq_m=args.pq_m, precision=precision)
+        if not isinstance(index, faiss.IndexIVF):
+            index = faiss.IndexIDMap2(index)
+        if needs_training(args.index_type, precision):
+            sample_size = min(args.size, max(64 * (nlist or 0), 10000))
+            index.train(vectors[np.random.default_rng(0).choice(args.size, sample_size, replace=False)])
+        index.add_with_ids(vectors, labels)
+        set_search_params(index, nprobe=args.nprobe, ef_search=args.ef_search)
+
+        start = time.perf_counter()
+        _, found = index.search(queries, args.k)
+        search_time = (time.perf_counter() - start) / args.queries
+
+        start = time.perf_counter()
+        _, candidates = index.search(queries, args.k * args.rerank_factor)
+        reranked = rerank(vectors, queries, candidates, args.k)
+        rerank_time = (time.perf_counter() - start) / args.queries
+
+        results.append({
+            "precision": precision,
+            "index_bytes": len(faiss.serialize_index(index)),
+            "recall": recall_at_k(found, truth),
+            "recall_rerank": recall_at_k(reranked, truth),
+            "search_ms": search_time * 1000,
+            "rerank_ms": rerank_time * 1000
+        })
+        del index
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark VectorStore storage precisions")
+    parser.add_argument("--size", type=int, default=100000)
+    parser.add_argument("--dimension", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--index-type", default="flat", choices=INDEX_TYPES)
+    parser.add_argument("--precisions", nargs="+", default=list(PRECISIONS), choices=PRECISIONS)
+    parser.add_argument("--rerank-factor", type=int, default=4)
+    parser.add_argument("--pq-m", type=int, default=48)
+    parser.add_argument("--nprobe", type=int, default=8)
+    parser.add_argument("--ef-search", type=int, default=64)
+    args = parser.parse_args()
+
+    results = run(args)
+    baseline = next((row["index_bytes"] for row in results if row["precision"] == "float32"), None)
+
+    mib = 1024 * 1024
+    print(f"{args.index_type} index, {args.size} vectors x {args.dimension} dims, recall@{args.k}, re-rank x{args.rerank_factor}")
+    print(f"{'precision':>10} {'index MiB':>10} {'saved':>7} {'recall':>7} {'+rerank':>8} {'ms/query':>9} {'+rerank':>8}")
+    for row in results:
+        saved = f"{1 - row['index_bytes'] / baseline:>7.1%}" if baseline else f"{'-':>7}"
+        print(
+            f"{row['precision']:>10} {row['index_bytes'] / mib:>10.1f} {saved} {row['recall']:>7.3f} "
+            f"{row['recall_rerank']:>8.3f} {row['search_ms']:>9.3f} {row['rerank_ms']:>8.3f}"
+        )
+    print(f"Re-ranking reads float32 vectors ({args.size * args.dimension * 4 / mib:.1f} MiB) from a memory-mapped file.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,326 @@
+"""
+Streaming ingestion of a directory of documents into a persistent VectorStore.
+
+Files are walked lazily, parsed (optionally in a process pool) and split into
+overlapping chunks, which are embedded and upserted in fixed-size batches. The
+store and a checkpoint of fully ingested files are saved periodically, so an
+interrupted run resumes where it left off; unchanged files are skipped and
+re-ingesting a file only re-embeds the chunks whose text changed.
+
+    python -m data.ingest ./sample_files --store ./vector_store --workers 4
+"""
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from html.parser import HTMLParser
+from typing import Any, Deque, Dict, Iterator, List, Optional, Sequence, Tuple
+import argparse
+import fnmatch
+import json
+import logging
+import os
+import signal
+import sys
+import threading
+import time
+from agents.vector_store.vector_store import META_FILE, VectorStore
+
+logger = logging.getLogger("ingest")
+
+CHECKPOINT_FILE = "ingest_state.json"
+DEFAULT_PATTERNS = ("*.txt", "*.md", "*.html", "*.htm")
+
+# (relative path, (size, mtime_ns))
+FileEntry = Tuple[str, Tuple[int, int]]
+
+def iter_files(root: str, patterns: Sequence[str] = DEFAULT_PATTERNS) -> Iterator[FileEntry]:
+    """Yield matching files under root one directory at a time, in a stable order"""
+    stack = [root]
+    while stack:
+        directory = stack.pop()
+        try:
+            entries = sorted(os.scandir(directory), key=lambda entry: entry.name)
+        except OSError as e:
+            logger.warning(f"Skipping unreadable directory {directory}: {str(e)}")
+            continue
+        subdirectories = []
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                subdirectories.append(entry.path)
+            elif entry.is_file() and any(fnmatch.fnmatch(entry.name, pattern) for pattern in patterns):
+                stat = entry.stat()
+                relative = os.path.relpath(entry.path, root).replace(os.sep, "/")
+                yield relative, (stat.st_size, stat.st_mtime_ns)
+        # Popped in reverse, so subdirectories are visited in name order
+        stack.extend(reversed(subdirectories))
+
+class _TextExtractor(HTMLParser):
+    def __init__(self):
+        super().__init__()
+        self.parts: List[str] = []
+        self._skip = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in ("script", "style"):
+            self._skip += 1
+
+    def handle_endtag(self, tag):
+        if tag in ("script", "style") and self._skip:
+            self._skip -= 1
+
+    def handle_data(self, data):
+        if not self._skip:
+            self.parts.append(data)
+
+def read_text(path: str) -> str:
+    """Read a file as text, stripping markup from HTML"""
+    with open(path, encoding="utf-8", errors="replace") as f:
+        text = f.read()
+    if path.lower().endswith((".html", ".htm")):
+        extractor = _TextExtractor()
+        extractor.feed(text)
+        text = " ".join(extractor.parts)
+    return text
+
+def chunk_text(text: str, chunk_size: int = 1000, overlap: int = 200) -> Iterator[str]:
+    """Split text into chunks of about chunk_size characters, overlapping by overlap and ending on whitespace"""
+    text = " ".join(text.split())
+    start = 0
+    while start < len(text):
+        end = min(len(text), start + chunk_size)
+        if end < len(text):
+            # Prefer to break between words
+            space = text.rfind(" ", start + chunk_size // 2, end)
+            if space > start:
+                end = space
+        yield text[start:end]
+        if end >= len(text):
+            break
+        start = max(end - overlap, start + 1)
+
+def parse_file(root: str, relative: str, chunk_size: int, overlap: int) -> List[Dict[str, Any]]:
+    """Read one file and return its chunks as documents; runs in pool workers"""
+    text = read_text(os.path.join(root, relative))
+    return [
+        {"id": f"{relative}#{i}", "text": chunk, "source": relative, "chunk": i}
+        for i, chunk in enumerate(chunk_text(text, chunk_size, overlap))
+    ]
+
+def _result(entry: FileEntry, future: Any) -> Optional[List[Dict[str, Any]]]:
+    try:
+        return future.result()
+    except Exception as e:
+        logger.warning(f"Skipping {entry[0]}: {str(e)}")
+        return None
+
+def _parsed_files(
+    root: str,
+    files: Iterator[FileEntry],
+    chunk_size: int,
+    overlap: int,
+    workers: int
+) -> Iterator[Tuple[FileEntry, Optional[List[Dict[str, Any]]]]]:
+    """
+    Parse files in order, keeping at most a few per worker in flight so memory stays
+    bounded. Files that fail to parse are logged and yielded with None.
+    """
+    if workers <= 0:
+        for entry in files:
+            try:
+                yield entry, parse_file(root, entry[0], chunk_size, overlap)
+            except Exception as e:
+                logger.warning(f"Skipping {entry[0]}: {str(e)}")
+                yield entry, None
+        return
+
+    # Ctrl-C is handled by the parent at a batch boundary, so workers ignore it
+    with ProcessPoolExecutor(max_workers=workers, initializer=signal.signal, initargs=(signal.SIGINT, signal.SIG_IGN)) as pool:
+        pending: Deque = deque()
+        for entry in files:
+            pending.append((entry, pool.submit(parse_file, root, entry[0], chunk_size, overlap)))
+            if len(pending) >= 2 * workers:
+                entry, future = pending.popleft()
+                yield entry, _result(entry, future)
+        while pending:
+            entry, future = pending.popleft()
+            yield entry, _result(entry, future)
+
+class Checkpoint:
+    """Fingerprints and chunk counts of the files that are fully written to the store"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.files: Dict[str, Dict[str, Any]] = {}
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                self.files = json.load(f)["files"]
+
+    def is_current(self, relative: str, fingerprint: Tuple[int, int]) -> bool:
+        state = self.files.get(relative)
+        return state is not None and tuple(state["fingerprint"]) == tuple(fingerprint)
+
+    def save(self) -> None:
+        with open(self.path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump({"files": self.files}, f)
+        os.replace(self.path + ".tmp", self.path)
+
+def open_store(path: str, **store_kwargs) -> VectorStore:
+    """Open the store at path for writing, or create a new one"""
+    if os.path.exists(os.path.join(path, META_FILE)):
+        return VectorStore.load(path, mmap=False)
+    return VectorStore(**store_kwargs)
+
+def ingest(
+    root: str,
+    store_path: str,
+    patterns: Sequence[str] = DEFAULT_PATTERNS,
+    chunk_size: int = 1000,
+    overlap: int = 200,
+    batch_size: int = 256,
+    workers: int = 0,
+    checkpoint_interval: float = 300.0,
+    store: Optional[VectorStore] = None,
+    **store_kwargs
+) -> Dict[str, int]:
+    """
+    Ingest every file under root matching patterns into the VectorStore saved at
+    store_path. The store and checkpoint are saved every checkpoint_interval
+    seconds and at the end. Returns counts of what was done.
+
+    Ctrl-C is deferred to the next batch boundary, where progress is saved before
+    KeyboardInterrupt is raised; an interrupt raised any other way saves nothing,
+    since it may have left the store half-updated.
+    """
+    store = store or open_store(store_path, **store_kwargs)
+    checkpoint = Checkpoint(os.path.join(store_path, CHECKPOINT_FILE))
+    stats = {"files": 0, "skipped": 0, "failed": 0, "chunks": 0, "embedded": 0, "removed": 0}
+
+    seen = set()
+    batch: List[Dict[str, Any]] = []
+    # Files whose chunks are (partly) in the unflushed batch, with their checkpoint state
+    buffered: List[Tuple[str, Dict[str, Any]]] = []
+    completed: List[Tuple[str, Dict[str, Any]]] = []
+    last_checkpoint = time.monotonic()
+    start = time.monotonic()
+
+    def flush() -> None:
+        if batch:
+            counts = store.upsert_documents(batch)
+            stats["embedded"] += counts["added"] + counts["updated"]
+            batch.clear()
+        completed.extend(buffered)
+        buffered.clear()
+
+    def save_checkpoint() -> None:
+        # The store is saved first, so the checkpoint never lists files it doesn't hold
+        store.save(store_path)
+        for relative, state in completed:
+            checkpoint.files[relative] = state
+        completed.clear()
+        checkpoint.save()
+        elapsed = time.monotonic() - start
+        logger.info(f"Checkpoint: {stats['files']} files, {stats['chunks']} chunks ({stats['chunks'] / max(elapsed, 1e-9):.0f} chunks/s)")
+
+    interrupted = threading.Event()
+
+    def stop_if_interrupted() -> None:
+        # Only called between upserts, so the store is consistent and safe to save
+        if interrupted.is_set():
+            logger.warning("Ingest interrupted; saving progress")
+            flush()
+            save_checkpoint()
+            raise KeyboardInterrupt
+
+    def pending_files() -> Iterator[FileEntry]:
+        for relative, fingerprint in iter_files(root, patterns):
+            seen.add(relative)
+            if checkpoint.is_current(relative, fingerprint):
+                stats["skipped"] += 1
+                continue
+            yield relative, fingerprint
+
+    # Signal handlers can only be installed from the main thread
+    previous_handler = None
+    if threading.current_thread() is threading.main_thread():
+        previous_handler = signal.signal(signal.SIGINT, lambda signum, frame: interrupted.set())
+
+    try:
+        for (relative, fingerprint), chunks in _parsed_files(root, pending_files(), chunk_size, overlap, workers):
+            if chunks is None:
+                stats["failed"] += 1
+                continue
+
+            # Drop chunks left over from a longer previous version of the file
+            previous = checkpoint.files.get(relative, {}).get("chunks", 0)
+            if previous > len(chunks):
+                stats["removed"] += store.remove_documents([f"{relative}#{i}" for i in range(len(chunks), previous)])
+
+            for chunk in chunks:
+                batch.append(chunk)
+                if len(batch) >= batch_size:
+                    flush()
+                    stop_if_interrupted()
+            buffered.append((relative, {"fingerprint": list(fingerprint), "chunks": len(chunks)}))
+            stats["files"] += 1
+            stats["chunks"] += len(chunks)
+
+            if time.monotonic() - last_checkpoint >= checkpoint_interval:
+                flush()
+                save_checkpoint()
+                last_checkpoint = time.monotonic()
+            stop_if_interrupted()
+
+        # A complete walk also tells us which files were deleted
+        for relative in [relative for relative in checkpoint.files if relative not in seen]:
+            state = checkpoint.files.pop(relative)
+            stats["removed"] += store.remove_documents([f"{relative}#{i}" for i in range(state["chunks"])])
+
+        flush()
+        save_checkpoint()
+        logger.info(f"Ingest finished: {stats}")
+        return stats
+
+    except KeyboardInterrupt:
+        if not interrupted.is_set():
+            # Raised mid-upsert, so the store may be inconsistent; keep the last checkpoint
+            logger.warning("Ingest interrupted; progress since the last checkpoint is not saved")
+        raise
+
+    finally:
+        if previous_handler is not None:
+            signal.signal(signal.SIGINT, previous_handler)
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Stream a directory of documents into a local vector store")
+    parser.add_argument("root", help="Directory to ingest")
+    parser.add_argument("--store", default="vector_store", help="Directory of the persistent VectorStore")
+    parser.add_argument("--patterns", nargs="+", default=list(DEFAULT_PATTERNS), help="File name patterns to ingest")
+    parser.add_argument("--chunk-size", type=int, default=1000, help="Characters per chunk")
+    parser.add_argument("--chunk-overlap", type=int, default=200, help="Characters shared by consecutive chunks")
+    parser.add_argument("--batch-size", type=int, default=256, help="Chunks embedded per batch")
+    parser.add_argument("--workers", type=int, default=0, help="Parser processes (0 parses in this process)")
+    parser.add_argument("--checkpoint-interval", type=float, default=300.0, help="Seconds between checkpoints")
+    parser.add_argument("--index-type", default="flat", help="Index type for a new store")
+    parser.add_argument("--precision", default="float32", help="Vector precision for a new store")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(levelname)s %(message)s")
+    try:
+        stats = ingest(
+            args.root,
+            args.store,
+            patterns=args.patterns,
+            chunk_size=args.chunk_size,
+            overlap=args.chunk_overlap,
+            batch_size=args.batch_size,
+            workers=args.workers,
+            checkpoint_interval=args.checkpoint_interval,
+            index_type=args.index_type,
+            precision=args.precision
+        )
+        print(json.dumps(stats))
+    except KeyboardInterrupt:
+        print("Interrupted; run the same command again to resume", file=sys.stderr)
+        sys.exit(130)
+
+if __name__ == "__main__":
+    main()
@@ -1,28 +1,26 @@
-import key_params
-from pymongo import MongoClient
-from langchain.embeddings import OpenAIEmbeddings
-from langchain.vectorstores import MongoDBAtlasVectorSearch
-from langchain.document_loaders import DirectoryLoader
-from lanchain.llms import OpenAI
-from langchain.chains import RetrievalQA
-import gradio as gr
-from gradio.themes.base import Base
-
-client = MongoClient(key_params.mongo_uri)
-dbName = "langchain_demo"
-collectionName = "collection_of_text_blobs"
-collection = client[dbName][collectionName]
-
-loader = DirectoryLoader("./sample_files",glob="./*.txt", show_progress=True)
-data = loader.load()
-
-embeddings = OpenAIEmbeddings(openai_api_key=key_params.openai_api_key)
-
-vector_store = MongoDBAtlasVectorSearch.from_documents(data, embeddings, collection=collection)    
-
-
-
-
-
-
-
+"""
+Load data/sample_files into the local vector store (data/vector_store).
+
+This used to push the whole directory into MongoDB Atlas in one go; it now runs
+the streaming ingest in data/ingest.py, and extra arguments are passed through
+(e.g. --store, --workers). Paths are resolved against this file, so it can be
+run from anywhere:
+
+    python data/load_data.py
+    python -m data.load_data
+"""
+import os
+import sys
+
+DATA_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Run as a script, only data/ is on the path; the backend packages live one level up
+sys.path.append(os.path.dirname(DATA_DIR))
+from data.ingest import main
+
+if __name__ == "__main__":
+    main([
+        os.path.join(DATA_DIR, "sample_files"),
+        "--store", os.path.join(DATA_DIR, "vector_store"),
+        "--patterns", "*.txt"
+    ] + sys.argv[1:])
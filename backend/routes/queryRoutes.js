@@ -2,6 +2,76 @@ const express = require("express");
 const router = express.Router();
 const { spawn } = require("child_process");
 const path = require("path");
+const readline = require("readline");
+
+// One long-lived orchestrator process shared by all requests
+let worker = null;
+let nextRequestId = 1;
+const pendingRequests = new Map();
+
+function getWorker() {
+  if (worker) {
+    return worker;
+  }
+
+  // Full path to orchestrator_entry.py
+  const scriptPath = path.join(__dirname, "../services/orchestrator_entry.py");
+
+  // Run the Python script in serve mode with proper PYTHONPATH
+  worker = spawn("python3", [scriptPath, "--serve"], {
+    cwd: path.join(__dirname, ".."), // Set working directory to backend root
+    env: {
+      ...process.env,
+      PYTHONPATH: path.join(__dirname, ".."), // Add backend root to Python path
+    },
+  });
+
+  // Each stdout line is a JSON response tagged with the request id
+  readline.createInterface({ input: worker.stdout }).on("line", (line) => {
+    let response;
+    try {
+      response = JSON.parse(line);
+    } catch (err) {
+      console.error("Invalid orchestrator output:", line);
+      return;
+    }
+
+    const pending = pendingRequests.get(response.id);
+    if (!pending) {
+      return;
+    }
+    pendingRequests.delete(response.id);
+
+    if (response.error) {
+      pending.reject(new Error(response.error));
+    } else {
+      pending.resolve(response.result);
+    }
+  });
+
+  worker.stderr.on("data", (data) => {
+    console.error("Python:", data.toString().trim());
+  });
+
+  worker.on("close", (code) => {
+    console.error(`Orchestrator worker exited with code ${code}`);
+    worker = null;
+    for (const pending of pendingRequests.values()) {
+      pending.reject(new Error("Orchestrator worker exited"));
+    }
+    pendingRequests.clear();
+  });
+
+  return worker;
+}
+
+function runQuery(prompt) {
+  return new Promise((resolve, reject) => {
+    const id = nextRequestId++;
+    pendingRequests.set(id, { resolve, reject });
+    getWorker().stdin.write(JSON.stringify({ id, prompt }) + "\n");
+  });
+}
 
 // POST /api/query
 router.post("/query", async (req, res) => {
@@ -12,44 +82,15 @@ router.post("/query", async (req, res) => {
   }
 
   try {
-    // Full path to orchestrator_entry.py
-    const scriptPath = path.join(__dirname, "../services/orchestrator_entry.py");
-
-    // Run the Python script with proper PYTHONPATH
-    const py = spawn("python3", [scriptPath, prompt], {
-      cwd: path.join(__dirname, ".."), // Set working directory to backend root
-      env: {
-        ...process.env,
-        PYTHONPATH: path.join(__dirname, ".."), // Add backend root to Python path
-      },
-    });
-
-    let dataBuffer = "";
-    let errorBuffer = "";
-
-    py.stdout.on("data", (data) => {
-      dataBuffer += data.toString();
-    });
-
-    py.stderr.on("data", (data) => {
-      errorBuffer += data.toString();
-    });
-
-    py.on("close", (code) => {
-      if (code !== 0) {
-        console.error("Python Error:", errorBuffer);
-        return res.status(500).json({
-          error: "Python script failed",
-          details: errorBuffer,
-        });
-      }
-
-      console.log("Python Output:", dataBuffer.trim());
-      res.status(200).json({ result: dataBuffer.trim() });
-    });
+    const result = await runQuery(prompt);
+    console.log("Python Output:", JSON.stringify(result));
+    res.status(200).json({ result });
   } catch (err) {
-    console.error("Server error in /query:", err);
-    res.status(500).json({ error: "Internal server error" });
+    console.error("Python Error:", err.message);
+    res.status(500).json({
+      error: "Python script failed",
+      details: err.message,
+    });
   }
 });
 
@@ -1,15 +1,18 @@
 import sys
 import os
 import asyncio
+import argparse
+import json
+import logging
+import signal
+from typing import Any, Dict, Optional
 from agents.orchestrator.agent_orchestrator import AgentOrchestrator
 from agents.test.test_agent import TestAgent  # Adjust import if needed
 
-async def main(prompt):
-    openai_api_key = os.getenv("OPENAI_API_KEY")
-    if not openai_api_key:
-        print("Missing OPENAI_API_KEY", file=sys.stderr)
-        sys.exit(1)
+logger = logging.getLogger("orchestrator_entry")
 
+async def build_orchestrator(openai_api_key: str) -> AgentOrchestrator:
+    """Create the orchestrator and register its agents"""
     orchestrator = AgentOrchestrator(openai_api_key)
 
     agents = [
@@ -23,6 +26,16 @@ async def main(prompt):
     for agent in agents:
         await orchestrator.register_agent(agent)
 
+    return orchestrator
+
+async def main(prompt):
+    openai_api_key = os.getenv("OPENAI_API_KEY")
+    if not openai_api_key:
+        print("Missing OPENAI_API_KEY", file=sys.stderr)
+        sys.exit(1)
+
+    orchestrator = await build_orchestrator(openai_api_key)
+
     try:
         result = await orchestrator.process_query(prompt)
         print(result)
@@ -30,9 +43,171 @@ async def main(prompt):
         print(f"Error: {str(e)}", file=sys.stderr)
         sys.exit(1)
 
-if __name__ == "__main__":
-    if len(sys.argv) < 2:
-        print("Prompt is required", file=sys.stderr)
+class OrchestratorServer:
+    """
+    Keeps one warm orchestrator and answers newline-delimited JSON requests.
+
+    Each request line is {"id": ..., "prompt": "..."} and gets exactly one
+    response line {"id": ..., "result": {...}} or {"id": ..., "error": "..."}.
+    Requests are handled concurrently, up to max_concurrency at a time.
+    """
+
+    def __init__(self, orchestrator: AgentOrchestrator, max_concurrency: int = 16):
+        self.orchestrator = orchestrator
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.tasks = set()
+        self.stopping = asyncio.Event()
+
+    async def handle_line(self, line: bytes, write_line) -> None:
+        """Process one request line and write its response"""
+        request_id = None
+        try:
+            request = json.loads(line)
+            request_id = request.get("id")
+            prompt = request.get("prompt")
+            if not prompt:
+                response = {"id": request_id, "error": "Prompt is required"}
+            else:
+                async with self.semaphore:
+                    result = await self.orchestrator.process_query(prompt)
+                response = {"id": request_id, "result": result}
+        except asyncio.CancelledError:
+            await write_line({"id": request_id, "error": "Server shutting down"})
+            raise
+        except Exception as e:
+            response = {"id": request_id, "error": str(e)}
+
+        await write_line(response)
+
+    def submit(self, line: bytes, write_line) -> asyncio.Task:
+        """Start handling a request without waiting for it"""
+        task = asyncio.create_task(self.handle_line(line, write_line))
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+        return task
+
+    async def read_requests(self, reader: asyncio.StreamReader, write_line, started: Optional[set] = None) -> None:
+        """Dispatch request lines until EOF or shutdown"""
+        while not self.stopping.is_set():
+            read = asyncio.ensure_future(reader.readline())
+            stop = asyncio.ensure_future(self.stopping.wait())
+            done, _ = await asyncio.wait({read, stop}, return_when=asyncio.FIRST_COMPLETED)
+            if read not in done:
+                read.cancel()
+                return
+            stop.cancel()
+
+            line = read.result()
+            if not line:
+                return
+            if line.strip():
+                task = self.submit(line, write_line)
+                if started is not None:
+                    started.add(task)
+
+    async def serve_stdio(self) -> None:
+        """Serve requests from stdin, writing responses to stdout"""
+        loop = asyncio.get_running_loop()
+        reader = asyncio.StreamReader()
+        await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader), sys.stdin)
+        write_lock = asyncio.Lock()
+
+        async def write_line(response: Dict[str, Any]) -> None:
+            async with write_lock:
+                sys.stdout.write(json.dumps(response, default=str) + "\n")
+                sys.stdout.flush()
+
+        await self.read_requests(reader, write_line)
+
+    async def serve_socket(self, socket_path: str, drain_timeout: Optional[float] = None) -> None:
+        """Serve requests from clients connecting to a Unix socket"""
+        async def handle_client(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+            write_lock = asyncio.Lock()
+
+            async def write_line(response: Dict[str, Any]) -> None:
+                async with write_lock:
+                    if writer.is_closing():
+                        return
+                    writer.write((json.dumps(response, default=str) + "\n").encode())
+                    await writer.drain()
+
+            started = set()
+            try:
+                await self.read_requests(reader, write_line, started)
+            finally:
+                # Let this client's in-flight requests answer before closing
+                pending = [task for task in started if not task.done()]
+                if pending:
+                    await asyncio.gather(*pending, return_exceptions=True)
+                writer.close()
+
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        server = await asyncio.start_unix_server(handle_client, path=socket_path)
+        logger.info(f"Listening on {socket_path}")
+        try:
+            await self.stopping.wait()
+        finally:
+            server.close()
+            # Client handlers wait for their in-flight requests, and since Python 3.12
+            # wait_closed() waits for the handlers, so hung requests are cancelled first
+            await self.drain(timeout=drain_timeout)
+            await server.wait_closed()
+            if os.path.exists(socket_path):
+                os.unlink(socket_path)
+
+    async def drain(self, timeout: Optional[float] = None) -> None:
+        """Wait for in-flight requests to finish, cancelling any still running after the timeout"""
+        pending = [task for task in self.tasks if not task.done()]
+        if not pending:
+            return
+
+        logger.info(f"Waiting for {len(pending)} in-flight requests")
+        _, still_running = await asyncio.wait(pending, timeout=timeout)
+        for task in still_running:
+            task.cancel()
+        if still_running:
+            logger.warning(f"Cancelled {len(still_running)} requests still running at shutdown")
+            await asyncio.gather(*still_running, return_exceptions=True)
+
+async def serve(socket_path: Optional[str], max_concurrency: int, drain_timeout: float) -> None:
+    openai_api_key = os.getenv("OPENAI_API_KEY")
+    if not openai_api_key:
+        print("Missing OPENAI_API_KEY", file=sys.stderr)
         sys.exit(1)
-    prompt = sys.argv[1]
-    asyncio.run(main(prompt))
+
+    orchestrator = await build_orchestrator(openai_api_key)
+    server = OrchestratorServer(orchestrator, max_concurrency=max_concurrency)
+
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, server.stopping.set)
+
+    try:
+        if socket_path:
+            await server.serve_socket(socket_path, drain_timeout=drain_timeout)
+        else:
+            await server.serve_stdio()
+        await server.drain(timeout=drain_timeout)
+    finally:
+        await orchestrator.cleanup()
+        logger.info("Orchestrator server stopped")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the agent orchestrator")
+    parser.add_argument("prompt", nargs="?", help="Prompt to answer once and exit")
+    parser.add_argument("--serve", action="store_true", help="Keep a warm orchestrator and serve newline-delimited JSON requests")
+    parser.add_argument("--socket", help="Serve on this Unix socket instead of stdin/stdout")
+    parser.add_argument("--max-concurrency", type=int, default=16, help="Maximum queries processed at once in serve mode")
+    parser.add_argument("--drain-timeout", type=float, default=30.0, help="Seconds to wait for in-flight queries on shutdown")
+    args = parser.parse_args()
+
+    if args.serve:
+        # stdout carries the protocol, so logs go to stderr
+        logging.basicConfig(level=logging.INFO, stream=sys.stderr)
+        asyncio.run(serve(args.socket, args.max_concurrency, args.drain_timeout))
+    else:
+        if not args.prompt:
+            print("Prompt is required", file=sys.stderr)
+            sys.exit(1)
+        asyncio.run(main(args.prompt))